@@ -0,0 +1,426 @@
+"""
+In-process stand-in for the Supabase REST (PostgREST) and Auth APIs.
+
+FakeSupabase holds tables as lists of dicts and answers the subset of PostgREST the services
+use: column selects, eq/neq/gt/gte/lt/lte/like/ilike/in/is/isdistinct filters (and not.),
+order, limit, offset, insert/upsert/update/delete with Prefer headers, plus read-only views and
+RPCs registered as Python functions. It is mounted as the httpx transport of the shared
+Supabase clients, so requests go through the real supabase-py/postgrest-py code paths - only
+the network and Postgres are fake.
+
+Each call sleeps latency_ms (+/- jitter_ms) to model the round trip to the hosted project.
+"""
+import asyncio
+import csv
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import jwt
+
+_FILTER_RE = re.compile(r"^(not\.)?(eq|neq|gt|gte|lt|lte|like|ilike|in|is|isdistinct)\.(.*)$", re.S)
+_RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _text(value: Any) -> Optional[str]:
+    """PostgREST compares against the text form of a value."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _compare(value: Any, operand: str) -> Optional[int]:
+    if value is None:
+        return None
+    try:
+        left, right = float(value), float(operand)
+    except (TypeError, ValueError):
+        left, right = str(value), operand
+    return (left > right) - (left < right)
+
+
+def _like(pattern: str, flags: int = 0) -> re.Pattern:
+    return re.compile("^" + re.escape(pattern).replace("\\*", ".*").replace("%", ".*") + "$", flags)
+
+
+def _parse_in(operand: str) -> set:
+    return set(next(csv.reader([operand.strip("()")], skipinitialspace=True), []))
+
+
+class FakeDatabaseError(Exception):
+    """Raised by fake RPCs to answer like a Postgres RAISE EXCEPTION ... USING ERRCODE = code."""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class FakeTable:
+    """Rows for one table plus lazily built hash indexes for eq filters."""
+
+    def __init__(self, name: str, rows: Optional[List[dict]] = None, primary_key: str = "id"):
+        self.name = name
+        self.rows: List[dict] = list(rows or [])
+        self.primary_key = primary_key
+        self._indexes: Dict[str, Dict[str, List[dict]]] = {}
+
+    def invalidate(self) -> None:
+        self._indexes.clear()
+
+    def lookup(self, column: str, value: str) -> List[dict]:
+        index = self._indexes.get(column)
+        if index is None:
+            index = defaultdict(list)
+            for row in self.rows:
+                index[_text(row.get(column))].append(row)
+            self._indexes[column] = index
+        return index.get(value, [])
+
+
+class FakeSupabase:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, jwt_secret: str = "benchmark-jwt-secret",
+                 seed: int = 0):
+        self.tables: Dict[str, FakeTable] = {}
+        self.rpcs: Dict[str, Callable[[dict], Any]] = {}
+        self.views: Dict[str, Callable[[], List[dict]]] = {}
+        self._view_tables: Dict[str, Tuple[int, FakeTable]] = {}
+        self._writes = 0
+        self.users: Dict[str, dict] = {}  # email -> {"id", "password", "user_metadata"}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.jwt_secret = jwt_secret
+        self.calls = 0
+        self.calls_by_table: Counter = Counter()
+        self._random = random.Random(seed)
+        # Each request is applied atomically, like a single Postgres statement
+        self._statement_lock = threading.RLock()
+
+    # ---- setup -------------------------------------------------------------------------------
+
+    def add_table(self, name: str, rows: List[dict], primary_key: str = "id") -> FakeTable:
+        self.tables[name] = FakeTable(name, rows, primary_key)
+        return self.tables[name]
+
+    def table(self, name: str) -> FakeTable:
+        if name not in self.tables:
+            self.tables[name] = FakeTable(name)
+        return self.tables[name]
+
+    def add_rpc(self, name: str, fn: Callable[[dict], Any]) -> None:
+        self.rpcs[name] = fn
+
+    def add_view(self, name: str, build_rows: Callable[[], List[dict]]) -> None:
+        """A read-only view; build_rows() is re-run on the first read after any write."""
+        self.views[name] = build_rows
+
+    def add_user(self, email: str, password: str, user_id: str = None, user_metadata: dict = None) -> str:
+        user_id = user_id or str(uuid.uuid4())
+        self.users[email.lower()] = {"id": user_id, "password": password, "user_metadata": user_metadata or {}}
+        return user_id
+
+    def reset_counters(self) -> None:
+        self.calls = 0
+        self.calls_by_table.clear()
+
+    # ---- httpx transports ----------------------------------------------------------------------
+
+    def _delay(self) -> float:
+        if not self.latency_ms and not self.jitter_ms:
+            return 0.0
+        return max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def transport(self) -> httpx.BaseTransport:
+        fake = self
+
+        class _Transport(httpx.BaseTransport):
+            def handle_request(self, request: httpx.Request) -> httpx.Response:
+                delay = fake._delay()
+                if delay:
+                    time.sleep(delay)
+                return fake.handle(request)
+
+        return _Transport()
+
+    def async_transport(self) -> httpx.AsyncBaseTransport:
+        fake = self
+
+        class _AsyncTransport(httpx.AsyncBaseTransport):
+            async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+                delay = fake._delay()
+                if delay:
+                    await asyncio.sleep(delay)
+                return fake.handle(request)
+
+        return _AsyncTransport()
+
+    # ---- request handling -------------------------------------------------------------------
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        with self._statement_lock:
+            return self._handle(request)
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        if request.method not in ("GET", "HEAD"):
+            self._writes += 1
+        path = request.url.path
+        try:
+            if "/auth/v1/" in path:
+                self.calls_by_table["auth"] += 1
+                return self._handle_auth(request, path.split("/auth/v1/", 1)[1])
+            if "/rest/v1/" in path:
+                resource = path.split("/rest/v1/", 1)[1].strip("/")
+                if resource.startswith("rpc/"):
+                    self.calls_by_table[resource] += 1
+                    return self._handle_rpc(request, resource[4:])
+                self.calls_by_table[resource] += 1
+                if resource in self.views:
+                    return self._handle_view(request, resource)
+                return self._handle_table(request, resource)
+        except ValueError as e:
+            return self._error(400, "PGRST100", str(e))
+        return self._error(404, "PGRST000", f"Unknown path {path}")
+
+    @staticmethod
+    def _error(status: int, code: str, message: str) -> httpx.Response:
+        return httpx.Response(status, json={"code": code, "message": message, "details": None, "hint": None})
+
+    # ---- auth -------------------------------------------------------------------------------
+
+    def _handle_auth(self, request: httpx.Request, endpoint: str) -> httpx.Response:
+        if endpoint == "token" and request.url.params.get("grant_type") == "password":
+            body = json.loads(request.content or b"{}")
+            user = self.users.get((body.get("email") or "").lower())
+            if not user or user["password"] != body.get("password"):
+                return httpx.Response(400, json={"error": "invalid_grant", "error_description": "Invalid login credentials",
+                                                 "code": 400, "msg": "Invalid login credentials"})
+            return httpx.Response(200, json=self.session_for(body["email"]))
+        if endpoint == "logout":
+            return httpx.Response(204)
+        return self._error(404, "auth", f"Unsupported auth endpoint {endpoint}")
+
+    def user_payload(self, email: str) -> dict:
+        user = self.users[email.lower()]
+        return {
+            "id": user["id"],
+            "aud": "authenticated",
+            "role": "authenticated",
+            "email": email,
+            "app_metadata": {"provider": "email"},
+            "user_metadata": user["user_metadata"],
+            "created_at": "2025-01-01T00:00:00Z",
+        }
+
+    def session_for(self, email: str, expires_in: int = 3600) -> dict:
+        user = self.user_payload(email)
+        now = datetime.now(timezone.utc)
+        access_token = jwt.encode(
+            {"sub": user["id"], "email": email, "aud": "authenticated", "role": "authenticated",
+             "iat": int(now.timestamp()), "exp": int((now + timedelta(seconds=expires_in)).timestamp())},
+            self.jwt_secret,
+            algorithm="HS256",
+        )
+        return {
+            "access_token": access_token,
+            "refresh_token": uuid.uuid4().hex,
+            "expires_in": expires_in,
+            "expires_at": int(now.timestamp()) + expires_in,
+            "token_type": "bearer",
+            "user": user,
+        }
+
+    # ---- rpc --------------------------------------------------------------------------------
+
+    def _handle_rpc(self, request: httpx.Request, name: str) -> httpx.Response:
+        fn = self.rpcs.get(name)
+        if fn is None:
+            return self._error(404, "PGRST202", f"Could not find the function public.{name}")
+        params = json.loads(request.content or b"{}") if request.method == "POST" else dict(request.url.params)
+        try:
+            return httpx.Response(200, json=fn(params))
+        except FakeDatabaseError as e:
+            return self._error(409 if e.code.startswith("23") else 400, e.code, e.message)
+
+    # ---- tables -----------------------------------------------------------------------------
+
+    def _handle_view(self, request: httpx.Request, name: str) -> httpx.Response:
+        if request.method not in ("GET", "HEAD"):
+            return self._error(405, "PGRST000", f"View {name} is read-only")
+        built_at, table = self._view_tables.get(name, (None, None))
+        if built_at != self._writes:
+            table = FakeTable(name, self.views[name]())
+            self._view_tables[name] = (self._writes, table)
+        return self._handle_table(request, name, table)
+
+    def _handle_table(self, request: httpx.Request, name: str, table: FakeTable = None) -> httpx.Response:
+        table = self.table(name) if table is None else table
+        params = request.url.params
+        prefer = request.headers.get("prefer", "")
+        returning = "return=minimal" not in prefer
+
+        if request.method in ("GET", "HEAD"):
+            rows = self._order(self._filter(table, params), params.get("order"))
+            total = len(rows)
+            offset = int(params.get("offset", 0))
+            limit = params.get("limit")
+            rows = rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+            headers = {}
+            if "count=" in prefer:
+                headers["content-range"] = f"{offset}-{offset + len(rows) - 1}/{total}" if rows else f"*/{total}"
+            body = [] if request.method == "HEAD" else self._project(rows, params.get("select"))
+            return httpx.Response(200, json=body, headers=headers)
+
+        if request.method == "POST":
+            payload = json.loads(request.content or b"[]")
+            payload = payload if isinstance(payload, list) else [payload]
+            if "resolution=" in prefer:
+                written = self._upsert(table, payload, params.get("on_conflict"), "ignore-duplicates" in prefer)
+            else:
+                written = [self._insert(table, row) for row in payload]
+            table.invalidate()
+            return httpx.Response(201, json=self._project(written, params.get("select")) if returning else [])
+
+        if request.method == "PATCH":
+            changes = json.loads(request.content or b"{}")
+            rows = self._filter(table, params)
+            for row in rows:
+                row.update(changes)
+                if "updated_at" in row:
+                    row["updated_at"] = datetime.now(timezone.utc).isoformat()
+            table.invalidate()
+            return httpx.Response(200, json=self._project(rows, params.get("select")) if returning else [])
+
+        if request.method == "DELETE":
+            doomed = {id(row) for row in self._filter(table, params)}
+            deleted = [row for row in table.rows if id(row) in doomed]
+            table.rows = [row for row in table.rows if id(row) not in doomed]
+            table.invalidate()
+            return httpx.Response(200, json=self._project(deleted, params.get("select")) if returning else [])
+
+        return self._error(405, "PGRST000", f"Unsupported method {request.method}")
+
+    def _insert(self, table: FakeTable, row: dict) -> dict:
+        row = dict(row)
+        row.setdefault(table.primary_key, str(uuid.uuid4()))
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        table.rows.append(row)
+        return row
+
+    def _upsert(self, table: FakeTable, payload: List[dict], on_conflict: Optional[str], ignore_duplicates: bool) -> List[dict]:
+        keys = [c.strip() for c in (on_conflict or table.primary_key).split(",")]
+        existing = {tuple(_text(r.get(k)) for k in keys): r for r in table.rows}
+        written = []
+        for row in payload:
+            key = tuple(_text(row.get(k)) for k in keys)
+            current = existing.get(key)
+            if current is None:
+                existing[key] = self._insert(table, row)
+                written.append(existing[key])
+            elif not ignore_duplicates:
+                current.update(row)
+                written.append(current)
+        return written
+
+    def _filter(self, table: FakeTable, params: httpx.QueryParams) -> List[dict]:
+        filters: List[Tuple[str, bool, str, str]] = []
+        for column, value in params.multi_items():
+            if column in _RESERVED_PARAMS:
+                continue
+            match = _FILTER_RE.match(value)
+            if not match:
+                raise ValueError(f"Unsupported filter {column}={value}")
+            negate, op, operand = match.groups()
+            if operand.lower() in ("true", "false"):
+                operand = operand.lower()  # Postgres accepts True/TRUE/true for booleans
+            filters.append((column, bool(negate), op, operand))
+
+        # Start from the smallest indexed eq match instead of scanning the table
+        rows = table.rows
+        for column, negate, op, operand in filters:
+            if negate or op not in ("eq", "in"):
+                continue
+            if op == "eq":
+                candidates = table.lookup(column, operand)
+            else:
+                candidates = [row for value in _parse_in(operand) for row in table.lookup(column, value)]
+            if len(candidates) < len(rows):
+                rows = candidates
+        predicates = [(column, self._predicate(negate, op, operand)) for column, negate, op, operand in filters]
+        return [row for row in rows if all(test(row.get(column)) for column, test in predicates)]
+
+    @staticmethod
+    def _predicate(negate: bool, op: str, operand: str) -> Callable[[Any], bool]:
+        """Compile one filter once per request instead of re-parsing it for every row."""
+        if op == "is":
+            wanted = {"null": None, "true": True, "false": False}.get(operand.lower(), object())
+            test = lambda value: value is wanted
+        elif op == "in":
+            values = _parse_in(operand)
+            test = lambda value: _text(value) in values
+        elif op in ("like", "ilike"):
+            pattern = _like(operand, re.I if op == "ilike" else 0)
+            test = lambda value: value is not None and bool(pattern.match(str(value)))
+        elif op == "eq":
+            test = lambda value: value is not None and _text(value) == operand
+        elif op == "neq":
+            test = lambda value: value is not None and _text(value) != operand
+        elif op == "isdistinct":
+            test = lambda value: _text(value) != operand
+        else:
+            check = {"gt": lambda c: c > 0, "gte": lambda c: c >= 0, "lt": lambda c: c < 0, "lte": lambda c: c <= 0}[op]
+            test = lambda value: (lambda c: c is not None and check(c))(_compare(value, operand))
+        return (lambda value: not test(value)) if negate else test
+
+    @staticmethod
+    def _order(rows: List[dict], order: Optional[str]) -> List[dict]:
+        if not order:
+            return rows
+        rows = list(rows)
+        for term in reversed(order.split(",")):
+            column, _, direction = term.partition(".")
+            descending = direction.startswith("desc")
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: r[column], reverse=descending)
+            rows = missing + present if descending else present + missing
+        return rows
+
+    @staticmethod
+    def _project(rows: List[dict], select: Optional[str]) -> List[dict]:
+        if not select or select.strip() == "*":
+            return [dict(row) for row in rows]
+        columns = []
+        for item in select.split(","):
+            item = item.strip()
+            if "(" in item:
+                raise ValueError(f"Embedded resources are not supported by the fake: {item}")
+            alias, _, column = item.rpartition(":")
+            columns.append((alias or column, column))
+        return [{alias: row.get(column) for alias, column in columns} for row in rows]
+
+
+def install(fake: FakeSupabase) -> None:
+    """Route the shared sync Supabase client (and the async one, once created) through the fake."""
+    import core.supabase_client as supabase_client
+
+    supabase_client.supabase.options.httpx_client._transport = fake.transport()
+    if supabase_client._async_supabase is not None:
+        supabase_client._async_supabase.options.httpx_client._transport = fake.async_transport()
+
+
+async def install_async(fake: FakeSupabase) -> None:
+    """Create the shared async client now and route it through the fake as well."""
+    import core.supabase_client as supabase_client
+
+    client = await supabase_client.get_async_supabase_client()
+    client.options.httpx_client._transport = fake.async_transport()
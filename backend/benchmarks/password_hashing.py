@@ -0,0 +1,87 @@
+"""
+Registration password-hashing throughput: inline bcrypt vs the process pool at 1..N workers.
+
+    cd backend
+    python -m benchmarks.password_hashing                        # 64 hashes, rounds from BCRYPT_ROUNDS
+    python -m benchmarks.password_hashing --hashes 200 --rounds 10 --workers 1 2 4 8
+
+For each configuration, --hashes registrations are hashed concurrently (as a burst of
+POST /register calls would be) and hashes/second is reported. Alongside, a 'probe' coroutine
+measures how late a 10 ms asyncio sleep wakes up - the stall unrelated requests would see.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+async def _probe(stop: asyncio.Event, lags: list) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append((time.perf_counter() - started - 0.01) * 1000)
+
+
+async def _burst(hash_one, hashes: int) -> dict:
+    stop, lags = asyncio.Event(), []
+    probe = asyncio.create_task(_probe(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(hash_one(f"Password#{i}") for i in range(hashes)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    return {
+        "seconds": elapsed,
+        "hashes_per_second": hashes / elapsed,
+        "loop_lag_p50_ms": statistics.median(lags) if lags else float("nan"),
+        "loop_lag_max_ms": max(lags) if lags else float("nan"),
+    }
+
+
+def main(argv=None) -> None:
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hashes", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", "12")))
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, cpus} & set(range(1, cpus + 1))) or [1])
+    args = parser.parse_args(argv)
+
+    import core.passwords as passwords
+
+    print(f"{args.hashes} bcrypt hashes at rounds={args.rounds}, {cpus} CPU(s)")
+    header = f"{'mode':<18}{'seconds':>10}{'hashes/s':>11}{'loop lag p50':>14}{'loop lag max':>14}"
+    print(header)
+    print("-" * len(header))
+
+    def report(mode: str, result: dict) -> None:
+        print(f"{mode:<18}{result['seconds']:>10.2f}{result['hashes_per_second']:>11.1f}"
+              f"{result['loop_lag_p50_ms']:>12.1f}ms{result['loop_lag_max_ms']:>12.1f}ms")
+
+    # Baseline: what the services did before - hash inline on the calling thread
+    async def inline(password):
+        return passwords._hash(password, args.rounds)
+    report("inline", asyncio.run(_burst(inline, args.hashes)))
+
+    for workers in args.workers:
+        passwords.shutdown_password_hasher()
+        passwords.PASSWORD_HASH_WORKERS = workers
+        passwords._pending = passwords.threading.BoundedSemaphore(workers * 4)
+
+        async def pooled(password):
+            return await passwords.hash_password_async(password, args.rounds)
+
+        async def run_pooled():
+            await pooled("warm-up")  # start the worker processes outside the timing
+            await asyncio.gather(*(pooled("warm-up") for _ in range(workers)))
+            return await _burst(pooled, args.hashes)
+
+        report(f"pool x{workers}", asyncio.run(run_pooled()))
+    passwords.shutdown_password_hasher()
+
+
+if __name__ == "__main__":
+    main()
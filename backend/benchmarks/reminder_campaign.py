@@ -0,0 +1,61 @@
+"""
+End-to-end payment reminder campaign against the fake Supabase backend and the SendGrid stub.
+
+    cd backend
+    python -m benchmarks.reminder_campaign                      # overdue campaign, seeded volumes
+    python -m benchmarks.reminder_campaign --kind upcoming --sendgrid-latency-ms 300
+
+Prints the campaign report (recipients, batches, throughput) and what the stub received.
+"""
+import argparse
+import json
+import os
+from datetime import date
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("SUPABASE_URL", "https://benchmark.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "benchmark-anon-key")
+os.environ.setdefault("SENDGRID_API_KEY", "SG.benchmark")
+os.environ.setdefault("FROM_EMAIL", "finance@benchmark-school.co.za")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kind", choices=("overdue", "upcoming"), default="overdue")
+    parser.add_argument("--parents", type=int, default=5000)
+    parser.add_argument("--students", type=int, default=12000)
+    parser.add_argument("--payments", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Injected latency per Supabase call")
+    parser.add_argument("--sendgrid-latency-ms", type=float, default=150.0)
+    parser.add_argument("--sendgrid-fail-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    from benchmarks.sendgrid_stub import SendGridStub
+    stub = SendGridStub(args.sendgrid_latency_ms, args.sendgrid_fail_rate)
+    os.environ["SENDGRID_API_HOST"] = stub.start()
+
+    from benchmarks.fake_postgrest import FakeSupabase, install
+    from benchmarks.seed import seed
+    fake = FakeSupabase(latency_ms=args.latency_ms)
+    seed(fake, parents=args.parents, students=args.students, payments=args.payments)
+    install(fake)
+
+    from services.payment_reminder_service import run_reminder_campaign
+    # Seeded schedules are due on the 15th of the current month
+    today = date.today()
+    as_of = today.replace(day=28) if args.kind == "overdue" else today.replace(day=10)
+    fake.reset_counters()
+    try:
+        report = run_reminder_campaign(args.kind, as_of=as_of, batch_size=args.batch_size)
+    finally:
+        stub.stop()
+
+    print(json.dumps(report, indent=2))
+    print(f"Supabase calls: {fake.calls} {dict(fake.calls_by_table)}")
+    print(f"SendGrid stub: {stub.requests} requests, {stub.recipients} recipients, {stub.rejected} rejected")
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,197 @@
+"""
+Offline benchmark suite: runs the FastAPI app in-process against the fake Supabase backend.
+
+    cd backend
+    python -m benchmarks.run                                  # default volumes, 20 ms injected latency
+    python -m benchmarks.run --latency-ms 0 --iterations 500  # pure CPU cost of our code
+    python -m benchmarks.run --json results.json              # save results
+    python -m benchmarks.run --baseline results.json          # exit 1 on p95 / DB-call regressions
+
+Reports p50/p95/p99 latency and Supabase calls per request for payment details, dashboard
+aggregation (sync and async), school-fee lookup, login and an authenticated (locally verified
+JWT) parent-info lookup.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+# Keep the app quiet and the tracing thresholds out of the way before anything is imported
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("QUERY_SLOW_MS", "100000")
+os.environ.setdefault("QUERY_N_PLUS_ONE_THRESHOLD", "100000")
+os.environ.setdefault("SUPABASE_URL", "https://benchmark.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "benchmark-anon-key")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "benchmark-jwt-secret")  # FakeSupabase's default signing secret
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    rank = max(1, min(len(ordered), round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def measure(name: str, fake, call: Callable[[], None], iterations: int, warmup: int) -> Dict:
+    for _ in range(warmup):
+        call()
+    latencies, db_calls = [], []
+    for _ in range(iterations):
+        before = fake.calls
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+        db_calls.append(fake.calls - before)
+    return {
+        "scenario": name,
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "db_calls_mean": round(statistics.fmean(db_calls), 2),
+        "db_calls_max": max(db_calls),
+    }
+
+
+def _expect(response, *statuses):
+    if response.status_code not in (statuses or (200,)):
+        raise RuntimeError(f"{response.request.method} {response.request.url.path} -> {response.status_code}: {response.text[:200]}")
+
+
+def run(args) -> List[Dict]:
+    from fastapi.testclient import TestClient
+    from benchmarks.fake_postgrest import FakeSupabase, install, install_async
+    from benchmarks.seed import seed, BENCHMARK_PASSWORD
+
+    fake = FakeSupabase(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    started = time.perf_counter()
+    keys = seed(fake, parents=args.parents, students=args.students, payments=args.payments)
+    print(f"Seeded {args.parents} parents, {args.students} students, {args.payments} payments "
+          f"in {time.perf_counter() - started:.1f}s (latency {args.latency_ms}±{args.jitter_ms} ms)")
+
+    import main
+    from services.dashboard_service import get_parent_dashboard, get_parent_dashboard_async, rebuild_parent_dashboard
+
+    install(fake)
+    # Backfill the parent_dashboard read model (as rebuild_parent_dashboard.py does after deploying it)
+    latency = fake.latency_ms, fake.jitter_ms
+    fake.latency_ms = fake.jitter_ms = 0
+    rebuild_parent_dashboard()
+    fake.latency_ms, fake.jitter_ms = latency
+    client = TestClient(main.app)
+    rng = random.Random(args.seed)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(install_async(fake))
+
+    def payment_details():
+        _expect(client.get(f"/api/parents/payment-details/{rng.choice(keys['student_ids'])}"))
+
+    def dashboard():
+        if get_parent_dashboard(rng.choice(keys["parent_id_numbers"])) is None:
+            raise RuntimeError("dashboard returned None")
+
+    def dashboard_async():
+        if loop.run_until_complete(get_parent_dashboard_async(rng.choice(keys["parent_id_numbers"]))) is None:
+            raise RuntimeError("async dashboard returned None")
+
+    def school_fee_lookup():
+        _expect(client.get(f"/api/school-fees/{rng.choice(keys['grades'])}"), 200, 404)
+
+    def login():
+        email = rng.choice(keys["emails"])
+        _expect(client.post("/auth/login", json={"email": email, "password": BENCHMARK_PASSWORD}))
+
+    # A fixed pool of signed-in users, so repeat requests exercise the verified-token cache
+    sessions = []
+    for email in keys["emails"][:200]:
+        user_id = fake.users[email]["id"]
+        sessions.append((user_id, {"Authorization": f"Bearer {fake.session_for(email)['access_token']}"}))
+
+    def parent_info():
+        user_id, headers = rng.choice(sessions)
+        _expect(client.get(f"/api/parents/user/{user_id}/info", headers=headers))
+
+    scenarios = {
+        "payment_details": payment_details,
+        "dashboard": dashboard,
+        "dashboard_async": dashboard_async,
+        "school_fee_lookup": school_fee_lookup,
+        "login": login,
+        "parent_info": parent_info,
+    }
+    selected = args.scenario or list(scenarios)
+    results = []
+    try:
+        for name in selected:
+            fake.reset_counters()
+            results.append(measure(name, fake, scenarios[name], args.iterations, args.warmup))
+            results[-1]["tables"] = dict(fake.calls_by_table.most_common())
+    finally:
+        loop.close()
+    return results
+
+
+def print_table(results: List[Dict]) -> None:
+    header = f"{'scenario':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'db/req':>9}{'db max':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['scenario']:<20}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+              f"{r['mean_ms']:>10.2f}{r['db_calls_mean']:>9.2f}{r['db_calls_max']:>8}")
+
+
+def compare(results: List[Dict], baseline_path: str, max_regression: float) -> List[str]:
+    """Regressions against a saved run: p95 beyond the tolerance, or more DB calls per request."""
+    with open(baseline_path) as f:
+        baseline = {r["scenario"]: r for r in json.load(f)["results"]}
+    problems = []
+    for r in results:
+        base = baseline.get(r["scenario"])
+        if not base:
+            continue
+        if r["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+            problems.append(f"{r['scenario']}: p95 {r['p95_ms']} ms vs baseline {base['p95_ms']} ms")
+        if r["db_calls_mean"] > base["db_calls_mean"] + 0.01:
+            problems.append(f"{r['scenario']}: {r['db_calls_mean']} DB calls/request vs baseline {base['db_calls_mean']}")
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parents", type=int, default=5000)
+    parser.add_argument("--students", type=int, default=12000)
+    parser.add_argument("--payments", type=int, default=100000)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Injected latency per Supabase call")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--scenario", action="append", help="Run only this scenario (repeatable)")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare against a previous --json file")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed p95 slowdown vs baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    print_table(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": {k: v for k, v in vars(args).items() if k not in ("json", "baseline")},
+                       "results": results}, f, indent=2)
+    if args.baseline:
+        problems = compare(results, args.baseline, args.max_regression)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+"""
+Deterministic seed data for the fake Supabase backend, shaped like production.
+Defaults: 5k parents, 12k students, 100k payments.
+"""
+import random
+import uuid
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List
+
+from benchmarks.fake_postgrest import FakeDatabaseError, FakeSupabase
+
+BENCHMARK_PASSWORD = "Benchmark#2025"
+GRADES = ["Grade R"] + [f"Grade {n}" for n in range(1, 13)]
+BANKS = ["ABSA", "Capitec", "FNB", "Nedbank", "Standard Bank"]
+FIRST_NAMES = ["Thabo", "Lerato", "Sipho", "Naledi", "Johan", "Anika", "Ayesha", "Pieter", "Zanele", "Kagiso"]
+SURNAMES = ["Nkosi", "Dlamini", "van der Merwe", "Naidoo", "Botha", "Mokoena", "Pillay", "Smith", "Khumalo", "Jacobs"]
+
+
+def _id_number(rng: random.Random) -> str:
+    return "".join(str(rng.randint(0, 9)) for _ in range(13))
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def monthly_fee(grade: str) -> float:
+    return 1200.0 if grade == "Grade R" else 1700.0 + 100 * int(grade.split()[-1])
+
+
+def seed(fake: FakeSupabase, parents: int = 5000, students: int = 12000, payments: int = 100000,
+         seed_value: int = 2025, month: str = None) -> Dict[str, List]:
+    """
+    Fill fake with applications, parents, students, fee_responsibility, fees, school_fees,
+    payments, payment_schedule and facility_linking rows, plus an auth user per parent.
+    Returns sample keys ({"student_ids", "parent_id_numbers", "emails", "grades"}) for the scenarios.
+    """
+    rng = random.Random(seed_value)
+    month = month or date.today().strftime("%Y-%m")
+    year = int(month[:4])
+
+    fake.add_table("fees", [
+        {"id": i + 1, "grade_level": grade, "tuition_fees": monthly_fee(grade) * 0.6, "activity_fees": monthly_fee(grade) * 0.2,
+         "facility_fees": monthly_fee(grade) * 0.12, "other_fees": monthly_fee(grade) * 0.08,
+         "total_monthly_fee": monthly_fee(grade), "effective_date": f"{year}-01-01", "is_active": True}
+        for i, grade in enumerate(GRADES)
+    ])
+    fake.add_table("school_fees", [
+        {"id": i + 1, "grade": grade, "annual_fee": monthly_fee(grade) * 12, "term_fee": monthly_fee(grade) * 3,
+         "registration_fee": 800, "re_registration_fee": 400, "sport_fee": 0}
+        for i, grade in enumerate(GRADES)
+    ])
+
+    applications, parent_rows, fee_responsibility = [], [], []
+    for i in range(parents):
+        user_id, application_id = _uuid(rng), _uuid(rng)
+        first_name, surname = rng.choice(FIRST_NAMES), rng.choice(SURNAMES)
+        email = f"parent{i}@benchmark-school.co.za"
+        id_number = _id_number(rng)
+        fake.add_user(email, BENCHMARK_PASSWORD, user_id, {"full_name": f"{first_name} {surname}"})
+        applications.append({"id": application_id, "user_id": user_id, "status": "in_progress", "parent_id_number": id_number})
+        parent_rows.append({
+            "id": _uuid(rng), "application_id": application_id, "user_id": user_id, "relationship": "Primary",
+            "first_name": first_name, "surname": surname, "id_number": id_number, "email": email,
+            "mobile": f"08{rng.randint(10000000, 99999999)}", "is_primary": True,
+        })
+        fee_responsibility.append({
+            "id": _uuid(rng), "application_id": application_id, "fee_person": "Parent", "relationship": "Mother",
+            "fee_terms_accepted": True, "selected_plan": rng.choice(["monthly_flat", "termly_discount", "annual_discount"]),
+            "parent_id_number": id_number, "parent_first_name": first_name, "parent_surname": surname,
+            "parent_email": email, "parent_mobile": parent_rows[-1]["mobile"], "bank_name": rng.choice(BANKS),
+            "branch_code": str(rng.randint(100000, 999999)), "account_number": str(rng.randint(10 ** 9, 10 ** 10 - 1)),
+            "account_type": rng.choice(["Cheque", "Savings"]),
+        })
+
+    student_rows = []
+    for i in range(students):
+        # Every parent gets one learner first, then siblings are spread randomly
+        parent = parent_rows[i] if i < parents else rng.choice(parent_rows)
+        grade = rng.choice(GRADES)
+        student_rows.append({
+            "id": _uuid(rng), "application_id": parent["application_id"], "parent_id": parent["id_number"],
+            "first_name": rng.choice(FIRST_NAMES), "surname": parent["surname"], "id_number": _id_number(rng),
+            "grade_applied_for": grade, "gender": rng.choice(["male", "female"]),
+            "date_of_birth": f"{year - 6 - rng.randint(0, 12)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+            "street_address": f"{rng.randint(1, 200)} Main Road", "city": "Johannesburg", "state": "Gauteng",
+            "postcode": "2001", "phone_number": None, "email": None, "status": "active", "monthly_fee": monthly_fee(grade),
+        })
+
+    payment_rows = []
+    for i in range(payments):
+        student = rng.choice(student_rows)
+        paid_month = f"{year}-{rng.randint(1, int(month[5:])):02d}"
+        payment_rows.append({
+            "id": i + 1, "parent_id_number": student["parent_id"], "student_id": student["id_number"],
+            "application_id": student["application_id"],
+            "payment_amount": float(Decimal(str(student["monthly_fee"])) * Decimal(rng.choice(["1", "1", "0.5"]))),
+            "payment_date": f"{paid_month}-0{rng.randint(1, 9)}", "payment_method": "debit_order",
+            "receipt_number": f"BM-{i:07d}", "month_covered": paid_month,
+            "status": rng.choice(["completed"] * 9 + ["failed"]),
+        })
+
+    schedule_rows = [
+        {"id": i + 1, "parent_id_number": s["parent_id"], "student_id": s["id_number"], "application_id": s["application_id"],
+         "due_date": f"{month}-15", "amount_due": s["monthly_fee"], "month_due": month, "status": "pending"}
+        for i, s in enumerate(student_rows)
+    ]
+    facility_rows = [
+        {"id": i + 1, "student_id": s["id_number"], "application_id": s["application_id"], "parent_id_number": s["parent_id"],
+         "facility_name": "Debit order", "is_linked": True, "status": "active", "linked_date": f"{year}-01-10"}
+        for i, s in enumerate(student_rows) if rng.random() < 0.6
+    ]
+
+    fake.add_table("applications", applications)
+    fake.add_table("parents", parent_rows)
+    fake.add_table("students", student_rows)
+    fake.add_table("fee_responsibility", fee_responsibility)
+    fake.add_table("payments", payment_rows)
+    fake.add_table("payment_schedule", schedule_rows)
+    fake.add_table("facility_linking", facility_rows)
+    fake.add_table("addresses", [], primary_key="address_id")
+    fake.add_table("parent_dashboard", [], primary_key="student_id")
+    _register_rpcs(fake)
+    _register_views(fake)
+
+    return {
+        "student_ids": [s["id"] for s in student_rows],
+        "parent_id_numbers": [p["id_number"] for p in parent_rows],
+        "emails": [p["email"] for p in parent_rows],
+        "grades": GRADES + ["12", "gr10", "Grade r", "R", "GR_7", "13"],
+    }
+
+
+def _register_rpcs(fake: FakeSupabase) -> None:
+    """Python versions of the SQL functions in backend/migrations used by the services."""
+    payments = fake.table("payments")
+
+    def payment_totals_by_students(params):
+        wanted, month = set(params["p_student_ids"]), params["p_month"]
+        totals: Dict[str, float] = {}
+        for row in payments.lookup("month_covered", month):
+            if row["student_id"] in wanted and row["status"] == "completed":
+                totals[row["student_id"]] = totals.get(row["student_id"], 0) + row["payment_amount"]
+        return [{"student_id": k, "month_covered": month, "total_paid": v} for k, v in totals.items()]
+
+    def payment_totals_by_parent(params):
+        month = params["p_month"]
+        rows = [r for r in payments.lookup("parent_id_number", params["p_parent_id_number"])
+                if r["month_covered"] == month and r["status"] == "completed"]
+        if not rows:
+            return []
+        return [{"parent_id_number": params["p_parent_id_number"], "month_covered": month,
+                 "total_paid": sum(r["payment_amount"] for r in rows)}]
+
+    applications, parents = fake.table("applications"), fake.table("parents")
+
+    def provision_parent_account(params):
+        user_id, created = params["p_user_id"], False
+        existing_apps = applications.lookup("user_id", user_id)
+        if existing_apps:
+            application_id = existing_apps[0]["id"]
+        else:
+            application_id = str(uuid.uuid4())
+            applications.rows.append({"id": application_id, "user_id": user_id, "status": "in_progress"})
+            applications.invalidate()
+            created = True
+        existing_parents = parents.lookup("user_id", user_id)
+        if existing_parents:
+            parent_id = existing_parents[0]["id"]
+        else:
+            parent_id = str(uuid.uuid4())
+            parents.rows.append({
+                "id": parent_id, "application_id": application_id, "user_id": user_id,
+                "first_name": params.get("p_first_name") or "Parent", "surname": params.get("p_surname") or "",
+                "email": params.get("p_email"), "relationship": "Primary", "is_primary": True,
+            })
+            parents.invalidate()
+            created = True
+        return [{"application_id": application_id, "parent_id": parent_id, "created": created}]
+
+    addresses, students = fake.table("addresses"), fake.table("students")
+
+    def insert(table, row):
+        row = dict(row)
+        row.setdefault(table.primary_key, str(uuid.uuid4()))
+        table.rows.append(row)
+        table.invalidate()
+        return row
+
+    def require_parents(parent_ids):
+        missing = sorted({p for p in parent_ids if not parents.lookup("id_number", str(p))})
+        if missing:
+            raise FakeDatabaseError("23503", f"Parents with ID {', '.join(missing)} do not exist")
+
+    def create_parent_with_address(params):
+        address = insert(addresses, params["p_address"])
+        return insert(parents, {**params["p_parent"], "address_id": address["address_id"]})
+
+    def create_student_with_address(params):
+        require_parents([params["p_student"].get("parent_id")])
+        address = insert(addresses, params["p_address"])
+        return insert(students, {**params["p_student"], "address_id": address["address_id"]})
+
+    def create_students_with_addresses(params):
+        require_parents([item["student"].get("parent_id") for item in params["p_rows"]])
+        return [create_student_with_address({"p_address": item["address"], "p_student": item["student"]})
+                for item in params["p_rows"]]
+
+    fee_responsibility = fake.table("fee_responsibility")
+
+    def save_selected_plan(params):
+        existing = fee_responsibility.lookup("application_id", params["p_application_id"])
+        if existing:
+            existing[0]["selected_plan"] = params["p_selected_plan"]
+            return [existing[0]]
+        return [insert(fee_responsibility, {
+            "application_id": params["p_application_id"], "selected_plan": params["p_selected_plan"],
+            "fee_person": "Parent", "relationship": "Parent", "fee_terms_accepted": False,
+        })]
+
+    def get_payment_details(params):
+        found = students.lookup("id", params["p_student_id"])
+        if not found:
+            return []
+        student = found[0]
+        fee = (fee_responsibility.lookup("application_id", str(student.get("application_id"))) or [None])[0] or {}
+        return [{
+            "student_id": student["id"], "first_name": student.get("first_name"), "surname": student.get("surname"),
+            "application_id": student.get("application_id"), "fee_found": bool(fee),
+            **{column: fee.get(column) for column in ("parent_id_number", "parent_first_name", "parent_surname",
+                                                      "bank_name", "branch_code", "account_number", "account_type")},
+        }]
+
+    fake.add_rpc("payment_totals_by_students", payment_totals_by_students)
+    fake.add_rpc("payment_totals_by_parent", payment_totals_by_parent)
+    fake.add_rpc("provision_parent_account", provision_parent_account)
+    fake.add_rpc("create_parent_with_address", create_parent_with_address)
+    fake.add_rpc("create_student_with_address", create_student_with_address)
+    fake.add_rpc("create_students_with_addresses", create_students_with_addresses)
+    fake.add_rpc("save_selected_plan", save_selected_plan)
+    fake.add_rpc("get_payment_details", get_payment_details)
+
+
+def _register_views(fake: FakeSupabase) -> None:
+    """Python versions of the views in backend/migrations used by the services."""
+    applications, students = fake.table("applications"), fake.table("students")
+
+    def user_students():
+        # First application per user (rows are in creation order), joined to students by parent ID
+        first_apps = {}
+        for app in applications.rows:
+            first_apps.setdefault(app["user_id"], app)
+        return [
+            {"user_id": user_id, **student}
+            for user_id, app in first_apps.items() if app.get("parent_id_number")
+            for student in students.lookup("parent_id", str(app["parent_id_number"]))
+        ]
+
+    fake.add_view("user_students", user_students)
@@ -0,0 +1,111 @@
+"""
+Local stub of the SendGrid v3 mail/send API.
+
+Accepts POST /v3/mail/send, validates the parts of the payload SendGrid enforces (1-1000
+personalizations, each with a recipient), records what it received and answers 202, with
+optional injected latency and failure rate. Point the app at it with
+SENDGRID_API_HOST=http://127.0.0.1:<port>.
+
+    python -m benchmarks.sendgrid_stub --port 8025 --latency-ms 150
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+
+class SendGridStub:
+    def __init__(self, latency_ms: float = 0.0, fail_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.recipients = 0
+        self.rejected = 0
+        self.bodies = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def validate(self, body: dict) -> Optional[str]:
+        personalizations = body.get("personalizations")
+        if not isinstance(personalizations, list) or not 1 <= len(personalizations) <= 1000:
+            return "personalizations must contain between 1 and 1000 items"
+        if any(not p.get("to") for p in personalizations):
+            return "every personalization needs at least one recipient"
+        if not body.get("template_id") and not (body.get("subject") and body.get("content")):
+            return "subject and content are required without a template_id"
+        return None
+
+    def handle(self, path: str, raw: bytes) -> Tuple[int, dict]:
+        if path != "/v3/mail/send":
+            return 404, {"errors": [{"message": f"Unknown path {path}"}]}
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            return 400, {"errors": [{"message": "Invalid JSON"}]}
+        error = self.validate(body)
+        with self._lock:
+            self.requests += 1
+            if error:
+                self.rejected += 1
+                return 400, {"errors": [{"message": error}]}
+            if self.fail_rate and self._random.random() < self.fail_rate:
+                return 503, {"errors": [{"message": "Injected failure"}]}
+            self.recipients += len(body["personalizations"])
+            self.bodies.append(body)
+        return 202, {}
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve in a background thread; returns the base URL."""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("content-length") or 0))
+                status, payload = stub.handle(self.path, raw)
+                data = json.dumps(payload).encode() if payload else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}"
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    stub = SendGridStub(args.latency_ms, args.fail_rate)
+    print(f"SendGrid stub listening on {stub.start(args.host, args.port)}")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"requests={stub.requests} recipients={stub.recipients} rejected={stub.rejected}")
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Concurrency stress test for the single-call upserts: parallel double-submits must never create
+duplicate bank_accounts, declarations or fee_responsibility rows.
+
+    cd backend
+    python -m benchmarks.upsert_stress                       # 20 rounds x 16 parallel submits each
+    python -m benchmarks.upsert_stress --threads 32 --legacy # also run the old select-then-insert flow
+
+Each round picks fresh keys (a parent ID number and an application id), releases --threads
+submits of each save at the same instant, then counts rows per key. The fake backend applies
+each request atomically (like one Postgres statement) with --latency-ms between requests, so
+select-then-insert races show up exactly as they would against Supabase. Exits 1 on duplicates.
+"""
+import argparse
+import os
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+os.environ.setdefault("SUPABASE_URL", "https://benchmark.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "benchmark-anon-key")
+
+
+def _legacy_save_bank_account(supabase, parent_id_number: str, bank_data: dict) -> None:
+    """The pre-upsert flow, kept here only to show the race the upsert removes."""
+    existing = supabase.table("bank_accounts").select("id").eq("parent_id_number", parent_id_number).execute()
+    if existing.data:
+        supabase.table("bank_accounts").update(bank_data).eq("parent_id_number", parent_id_number).execute()
+    else:
+        supabase.table("bank_accounts").insert({"parent_id_number": parent_id_number, **bank_data}).execute()
+
+
+def _burst(threads: int, call) -> list:
+    """Run call(i) on threads threads released together; returns exceptions raised."""
+    barrier = threading.Barrier(threads)
+    errors = []
+
+    def submit(i):
+        barrier.wait()
+        try:
+            call(i)
+        except Exception as e:
+            errors.append(e)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(submit, range(threads)))
+    return errors
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16, help="Parallel submits per save per round")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--legacy", action="store_true", help="Also stress the old select-then-insert bank flow")
+    args = parser.parse_args(argv)
+
+    from benchmarks.fake_postgrest import FakeSupabase, install
+    from benchmarks.seed import seed
+    fake = FakeSupabase(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms)
+    seed(fake, parents=10, students=10, payments=10)
+    install(fake)
+
+    from core.supabase_client import supabase
+    from services.bank_service import save_bank_account
+    from services.declaration_service import declaration_service
+    from services.plan_service import plan_service
+
+    def bank_data(i):
+        return {"account_holder_name": f"Holder {i}", "bank_name": "FNB", "account_type": "Cheque",
+                "account_number": f"{6200000000 + i}", "branch_code": "250655"}
+
+    def declare(application_id, i):
+        declaration_service.save_declaration(
+            application_id, True, True, True, True, True, True, True, full_name=f"Signer {i}", city="Johannesburg",
+        )
+
+    scenarios = {
+        "bank_accounts": ("parent_id_number", lambda key, i: save_bank_account(key, bank_data(i))),
+        "declarations": ("application_id", declare),
+        "fee_responsibility": ("application_id", lambda key, i: plan_service.save_selected_plan(key, f"plan_{i % 3}")),
+    }
+    if args.legacy:
+        scenarios["bank_accounts (legacy)"] = (
+            "parent_id_number", lambda key, i: _legacy_save_bank_account(supabase, key, bank_data(i)),
+        )
+
+    print(f"{args.rounds} rounds x {args.threads} parallel submits, {args.latency_ms}±{args.jitter_ms} ms per request")
+    failed = False
+    for name, (key_column, save) in scenarios.items():
+        table = fake.table(name.split()[0])
+        duplicated, errors = 0, 0
+        for _ in range(args.rounds):
+            key = str(uuid.uuid4()) if key_column == "application_id" else uuid.uuid4().hex[:13]
+            errors += len(_burst(args.threads, lambda i: save(key, i)))
+            rows = [row for row in table.rows if str(row.get(key_column)) == key]
+            duplicated += len(rows) > 1
+        legacy = "(legacy)" in name
+        ok = duplicated == 0 and errors == 0
+        failed |= not ok and not legacy
+        status = "OK" if ok else ("RACE (expected)" if legacy else "FAIL")
+        print(f"  {name:<24} rounds with duplicates: {duplicated:>3}/{args.rounds}  errors: {errors:>3}  {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
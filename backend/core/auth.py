@@ -0,0 +1,220 @@
+"""
+Local verification of Supabase access tokens.
+
+get_current_user is a FastAPI dependency that checks a bearer token's signature, expiry and
+audience in-process instead of calling supabase.auth.get_user() per request:
+  - HS256 tokens are verified with SUPABASE_JWT_SECRET
+  - RS256/ES256 tokens are verified with the project's JWKS, cached for JWKS_CACHE_TTL_SECONDS
+    and refetched early when a token carries an unknown kid (key rotation)
+Verified tokens are kept in an LRU until they expire, so repeat requests skip the crypto too.
+
+Admin/batch endpoints depend on require_service_role instead: the project's service_role key
+(a signed JWT with role=service_role and no user or audience) is the only caller they accept.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import httpx
+import jwt
+from anyio import to_thread
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+logger = logging.getLogger(__name__)
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWKS_URL = os.getenv("SUPABASE_JWKS_URL") or (
+    f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else None
+)
+JWT_AUDIENCE = os.getenv("JWT_AUDIENCE", "authenticated")
+JWT_LEEWAY_SECONDS = int(os.getenv("JWT_LEEWAY_SECONDS", "30"))
+JWKS_CACHE_TTL_SECONDS = float(os.getenv("JWKS_CACHE_TTL_SECONDS", "600"))
+# Unknown kids trigger a refetch at most this often, so forged kids can't hammer the JWKS endpoint
+JWKS_MIN_REFRESH_SECONDS = float(os.getenv("JWKS_MIN_REFRESH_SECONDS", "30"))
+VERIFIED_TOKEN_CACHE_SIZE = int(os.getenv("VERIFIED_TOKEN_CACHE_SIZE", "10000"))
+
+_ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+
+class AuthError(Exception):
+    """The token is missing, malformed, expired or not signed by our Supabase project."""
+
+
+class AuthenticatedUser:
+    __slots__ = ("id", "email", "role", "expires_at", "claims")
+
+    def __init__(self, claims: dict):
+        self.id = claims.get("sub")  # None for the service_role key
+        self.email = claims.get("email")
+        self.role = claims.get("role")
+        self.expires_at = claims["exp"]
+        self.claims = claims
+
+
+class JWKSCache:
+    """Signing keys by kid, fetched from the JWKS endpoint and refreshed on a TTL."""
+
+    def __init__(self, url: Optional[str], ttl_seconds: float = JWKS_CACHE_TTL_SECONDS):
+        self.url = url
+        self.ttl_seconds = ttl_seconds
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self) -> None:
+        if not self.url:
+            raise AuthError("No JWKS URL configured (set SUPABASE_URL or SUPABASE_JWKS_URL)")
+        response = httpx.get(self.url, timeout=5.0)
+        response.raise_for_status()
+        self._keys = {key.key_id: key for key in jwt.PyJWKSet.from_dict(response.json()).keys if key.key_id}
+        self._fetched_at = time.monotonic()
+        logger.info(f"🔑 Loaded {len(self._keys)} signing key(s) from {self.url}")
+
+    def get_key(self, kid: str) -> jwt.PyJWK:
+        key = self._keys.get(kid)
+        age = time.monotonic() - self._fetched_at
+        if key is not None and age < self.ttl_seconds:
+            return key
+        with self._lock:
+            age = time.monotonic() - self._fetched_at
+            stale = age >= self.ttl_seconds
+            unknown_kid = kid not in self._keys and age >= JWKS_MIN_REFRESH_SECONDS
+            if stale or unknown_kid:
+                try:
+                    self._refresh()
+                except AuthError:
+                    raise
+                except Exception as e:
+                    # Keep serving the previous keys if the endpoint is briefly unavailable
+                    logger.warning(f"⚠️ JWKS refresh failed, using cached keys: {e}")
+                    if not self._keys:
+                        raise AuthError("Signing keys unavailable") from e
+            key = self._keys.get(kid)
+        if key is None:
+            raise AuthError("Unknown signing key")
+        return key
+
+
+class VerifiedTokenCache:
+    """LRU of token -> AuthenticatedUser; entries are dropped once the token expires."""
+
+    def __init__(self, maxsize: int = VERIFIED_TOKEN_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, AuthenticatedUser]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[AuthenticatedUser]:
+        with self._lock:
+            user = self._entries.get(token)
+            if user is None:
+                return None
+            if user.expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def set(self, token: str, user: AuthenticatedUser) -> None:
+        with self._lock:
+            self._entries[token] = user
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+jwks_cache = JWKSCache(SUPABASE_JWKS_URL)
+verified_tokens = VerifiedTokenCache()
+
+
+def verify_token(token: str) -> AuthenticatedUser:
+    """Verify a Supabase access token locally. Raises AuthError if it is not valid."""
+    user = verified_tokens.get(token)
+    if user is not None:
+        return user
+
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.PyJWTError as e:
+        raise AuthError("Malformed token") from e
+    algorithm = header.get("alg")
+    if algorithm == "HS256":
+        if not SUPABASE_JWT_SECRET:
+            raise AuthError("HS256 tokens require SUPABASE_JWT_SECRET")
+        key = SUPABASE_JWT_SECRET
+    elif algorithm in _ASYMMETRIC_ALGORITHMS:
+        key = jwks_cache.get_key(header.get("kid"))
+    else:
+        raise AuthError(f"Unsupported token algorithm: {algorithm}")
+
+    try:
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            leeway=JWT_LEEWAY_SECONDS,
+            options={"require": ["exp"], "verify_aud": False},
+        )
+    except jwt.ExpiredSignatureError as e:
+        raise AuthError("Token expired") from e
+    except jwt.PyJWTError as e:
+        raise AuthError(f"Invalid token: {e}") from e
+    # User tokens must name the user and our audience; the service_role key carries neither
+    if claims.get("role") != "service_role":
+        audience = claims.get("aud")
+        if JWT_AUDIENCE not in (audience if isinstance(audience, list) else [audience]):
+            raise AuthError("Invalid token: Audience doesn't match")
+        if not claims.get("sub"):
+            raise AuthError("Invalid token: Token is missing the \"sub\" claim")
+
+    user = AuthenticatedUser(claims)
+    verified_tokens.set(token, user)
+    return user
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+async def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> AuthenticatedUser:
+    """FastAPI dependency: the user behind the request's bearer token, or 401."""
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    token = credentials.credentials
+    # Cached tokens are answered on the event loop; first sightings may need a JWKS fetch
+    user = verified_tokens.get(token)
+    if user is not None:
+        return user
+    try:
+        return await to_thread.run_sync(verify_token, token)
+    except AuthError as e:
+        logger.debug(f"Rejected bearer token: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+def ensure_same_user(current_user: AuthenticatedUser, user_id: str) -> None:
+    """403 unless the authenticated user is the one the route is about (service_role may act for anyone)."""
+    if current_user.id != user_id and current_user.role != "service_role":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to access another user's data")
+
+
+async def require_service_role(current_user: AuthenticatedUser = Depends(get_current_user)) -> AuthenticatedUser:
+    """FastAPI dependency for admin/batch endpoints: 401 without a token, 403 unless it is the service_role key."""
+    if current_user.role != "service_role":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="This endpoint requires the service_role key")
+    return current_user
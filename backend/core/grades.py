@@ -0,0 +1,101 @@
+"""
+Grade label helpers shared by the fee services, school fees routes and grade promotion.
+"""
+import re
+
+# Longest prefix first so "grade12" isn't stripped to "ade12"
+_GRADE_PREFIXES = ("grade", "gr")
+_GRADE_SEPARATORS = re.compile(r"[\s_.]+")
+
+
+def normalize_grade(grade: str) -> str:
+    """
+    ✅ GRADE NORMALIZATION HELPER
+    
+    WHY THIS MATTERS:
+    - Students table has: "Grade 7", "Grade 8", "12", "10", etc.
+    - school_fees table expects: exactly "Grade 8", "Grade 10", "Grade 12" etc.
+    - Without normalization, grade "12" doesn't match "Grade 12" → 404 error
+    
+    LOGIC:
+    1. Strip whitespace and lowercase
+    2. If it's just a number (7, 8, 10, 11, 12) → convert to "Grade X"
+    3. If it starts with "grade" → standardize to "Grade X"
+    4. Try exact match in DB if all else fails
+    """
+    grade = grade.strip()
+    grade_lower = grade.lower()
+    
+    # Case 1: Pure number like "12" or " 10 "
+    if grade.isdigit() or grade_lower.isdigit():
+        num = grade.strip()
+        return f"Grade {num}"
+    
+    # Case 2: "grade 12" or "Grade12" or variations
+    if grade_lower.startswith("grade"):
+        parts = grade_lower.split()
+        if len(parts) >= 2 and parts[1].replace(' ', '').isdigit():
+            num = parts[1]
+            return f"Grade {num}"
+        # Handle "Grade12" (no space)
+        remainder = grade_lower[5:].strip()
+        if remainder.isdigit():
+            return f"Grade {remainder}"
+    
+    # Case 3: Already properly formatted "Grade 10"
+    if grade.startswith("Grade "):
+        return grade
+    
+    # Fallback: return as-is
+    return grade
+
+
+def grade_alias_key(grade: str) -> str:
+    """
+    Reduce any accepted spelling of a grade to one lookup key.
+
+    "12", "gr12", "Grade12", "GR_12", "Grade 12" -> "12"
+    "Grade R", "GR_R", "R"                       -> "r"
+    """
+    key = _GRADE_SEPARATORS.sub("", (grade or "").lower())
+    for prefix in _GRADE_PREFIXES:
+        if key.startswith(prefix) and len(key) > len(prefix):
+            key = key[len(prefix):]
+            break
+    if key.isdigit():
+        key = str(int(key))  # "07" -> "7"
+    return key
+
+
+def build_grade_alias_index(rows: list, field: str = "grade") -> dict:
+    """
+    Map grade_alias_key(row[field]) -> row so every accepted spelling of a grade
+    resolves with a single dict lookup. The first row wins on duplicate keys.
+    """
+    index = {}
+    for row in rows:
+        index.setdefault(grade_alias_key(row.get(field) or ""), row)
+    return index
+
+
+# Promotion order; grade_alias_key() spellings
+GRADE_SEQUENCE = ("r",) + tuple(str(n) for n in range(1, 13))
+
+
+def canonical_grade_label(grade: str) -> str:
+    """Any accepted spelling -> "Grade R" / "Grade 7"; unrecognised grades come back unchanged."""
+    key = grade_alias_key(grade)
+    if key not in GRADE_SEQUENCE:
+        return grade
+    return "Grade R" if key == "r" else f"Grade {key}"
+
+
+def next_grade(grade: str):
+    """
+    The grade after this one as a canonical label ("gr7" -> "Grade 8", "R" -> "Grade 1").
+    None for the final grade or an unrecognised label.
+    """
+    key = grade_alias_key(grade)
+    if key not in GRADE_SEQUENCE or key == GRADE_SEQUENCE[-1]:
+        return None
+    return canonical_grade_label(GRADE_SEQUENCE[GRADE_SEQUENCE.index(key) + 1])
@@ -0,0 +1,168 @@
+"""
+Structured, non-blocking logging.
+
+Request handlers only enqueue log records (QueueHandler); a single QueueListener thread
+formats and writes them, so stdout I/O never happens on the request path.
+
+Environment:
+    LOG_LEVEL              root level (default INFO)
+    LOG_LEVELS             per-module overrides, e.g. "services.payment_service=DEBUG,routes=WARNING"
+    LOG_FORMAT             "json" (default) or "text"
+    LOG_QUEUE_SIZE         max buffered records before new ones are dropped (default 10000)
+    LOG_PAYLOAD_MAX_CHARS  truncate logged payloads to this many characters (default 500, 0 = omit payloads)
+    LOG_PAYLOAD_SAMPLE_RATE fraction of payload logs that are emitted at all (default 1.0, 0 = off)
+"""
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "500"))
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "1.0"))
+
+# Payload keys whose values never reach the logs
+_REDACTED_KEYS = {"password", "password_hash"}
+
+# Attributes every LogRecord has; anything else was passed via extra= and goes into the JSON line
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, plus any extra= fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message (args may be mutated after the call returns) and traceback now,
+        # but keep them in separate fields so the JSON formatter can emit them separately
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+
+def parse_module_levels(spec: str) -> Dict[str, str]:
+    """Parse "a.b=DEBUG,c=WARNING" into {"a.b": "DEBUG", "c": "WARNING"}."""
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging() -> None:
+    """Route all logging through a bounded queue to a background writer. Safe to call twice."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "text":
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        stream_handler.setFormatter(JsonFormatter())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    root = logging.getLogger()
+    root.handlers = [_DroppingQueueHandler(log_queue)]
+    root.setLevel(LOG_LEVEL)
+    # httpx logs every Supabase round trip at INFO; core.query_tracing already reports on those
+    for name in ("httpx", "httpcore"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    for name, level in parse_module_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    # Uvicorn installs its own stream handlers; send its records through the queue too
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_dropped_log_count() -> int:
+    """Records dropped because the log queue was full."""
+    return _DroppingQueueHandler.dropped
+
+
+def log_payload(logger: logging.Logger, message: str, payload: Any, level: int = logging.DEBUG) -> None:
+    """
+    Log a (potentially large) payload, truncated to LOG_PAYLOAD_MAX_CHARS and sampled at
+    LOG_PAYLOAD_SAMPLE_RATE. Password fields are redacted. Serialisation is skipped entirely
+    when the record would be dropped.
+    """
+    if LOG_PAYLOAD_MAX_CHARS <= 0 or not logger.isEnabledFor(level):
+        return
+    if LOG_PAYLOAD_SAMPLE_RATE < 1.0 and random.random() >= LOG_PAYLOAD_SAMPLE_RATE:
+        return
+    logger.log(level, message, extra={"payload": truncate(redact(payload))})
+
+
+def redact(payload: Any) -> Any:
+    """Copy of payload with the values of password keys replaced, at any depth."""
+    if isinstance(payload, dict):
+        return {key: "***" if key in _REDACTED_KEYS else redact(value) for key, value in payload.items()}
+    if isinstance(payload, (list, tuple)):
+        return [redact(item) for item in payload]
+    return payload
+
+
+def truncate(payload: Any, max_chars: int = None) -> str:
+    """Serialise payload and cut it to max_chars, noting how much was dropped."""
+    max_chars = LOG_PAYLOAD_MAX_CHARS if max_chars is None else max_chars
+    text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+    if len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}... [{len(text) - max_chars} more chars]"
@@ -0,0 +1,157 @@
+"""
+Per-route request metrics, exposed in Prometheus text format on /metrics.
+
+The middleware runs on the event loop, so updates need no locks. Series are keyed by
+(method, route template, status) tuples; the label string for a series is built once,
+when the series is first seen, not per request.
+"""
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+# Latency buckets in seconds (upper bounds); +Inf is implicit
+METRICS_LATENCY_BUCKETS = tuple(
+    float(b) for b in os.getenv(
+        "METRICS_LATENCY_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10"
+    ).split(",")
+)
+_UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _RouteSeries:
+    """Counters and latency histogram for one (method, route, status)."""
+
+    __slots__ = ("labels", "bucket_counts", "count", "latency_sum", "request_bytes", "response_bytes")
+
+    def __init__(self, method: str, route: str, status: int):
+        self.labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+        self.bucket_counts = [0] * (len(METRICS_LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.latency_sum = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._series: Dict[Tuple[str, str, int], _RouteSeries] = {}
+        self.in_flight = 0
+        self.started_at = time.time()
+
+    def observe(self, method: str, route: str, status: int, seconds: float, request_bytes: int, response_bytes: int) -> None:
+        key = (method, route, status)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _RouteSeries(method, route, status)
+        series.bucket_counts[bisect_left(METRICS_LATENCY_BUCKETS, seconds)] += 1
+        series.count += 1
+        series.latency_sum += seconds
+        series.request_bytes += request_bytes
+        series.response_bytes += response_bytes
+
+    def reset(self) -> None:
+        self._series.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        series = list(self._series.values())
+        lines: List[str] = [
+            "# HELP http_requests_in_flight Requests currently being handled.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_requests_total Requests handled, by route and status.",
+            "# TYPE http_requests_total counter",
+        ]
+        lines += [f"http_requests_total{{{s.labels}}} {s.count}" for s in series]
+
+        lines += [
+            "# HELP http_request_duration_seconds Request latency, by route and status.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for s in series:
+            cumulative = 0
+            for bound, count in zip(METRICS_LATENCY_BUCKETS, s.bucket_counts):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{s.labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{s.labels},le="+Inf"}} {s.count}')
+            lines.append(f"http_request_duration_seconds_sum{{{s.labels}}} {s.latency_sum}")
+            lines.append(f"http_request_duration_seconds_count{{{s.labels}}} {s.count}")
+
+        lines += [
+            "# HELP http_request_size_bytes_total Request body bytes received, by route and status.",
+            "# TYPE http_request_size_bytes_total counter",
+        ]
+        lines += [f"http_request_size_bytes_total{{{s.labels}}} {s.request_bytes}" for s in series]
+        lines += [
+            "# HELP http_response_size_bytes_total Response body bytes sent, by route and status.",
+            "# TYPE http_response_size_bytes_total counter",
+        ]
+        lines += [f"http_response_size_bytes_total{{{s.labels}}} {s.response_bytes}" for s in series]
+
+        lines += [
+            "# HELP process_start_time_seconds Start time of the process since unix epoch in seconds.",
+            "# TYPE process_start_time_seconds gauge",
+            f"process_start_time_seconds {self.started_at}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, status, and payload sizes per route template
+    (/api/parents/payment-details/{student_id}, not the raw path, so label cardinality stays bounded).
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        status = 500
+        request_bytes = 0
+        response_bytes = 0
+
+        async def receive_wrapper():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status, response_bytes
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        registry.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            registry.in_flight -= 1
+            # FastAPI stores the matched APIRoute in the (shared) scope during routing
+            route = scope.get("route")
+            registry.observe(
+                scope["method"],
+                getattr(route, "path", _UNMATCHED_ROUTE),
+                status,
+                time.perf_counter() - start,
+                request_bytes,
+                response_bytes,
+            )
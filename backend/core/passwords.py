@@ -0,0 +1,111 @@
+"""
+bcrypt password hashing in a bounded process pool.
+
+A bcrypt hash is hundreds of ms of pure CPU; done inline it holds the GIL-bound worker and a
+threadpool slot, so bulk registrations stall unrelated requests. Hashes are computed in a
+ProcessPoolExecutor of PASSWORD_HASH_WORKERS processes instead:
+  - hash_password_async() for async routes - awaits without holding a threadpool slot
+  - hash_password() for sync callers - blocks only the calling thread (the GIL is released)
+At most PASSWORD_HASH_MAX_PENDING hashes are queued at once; further callers wait their turn.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 4)))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+
+@lru_cache(maxsize=None)
+def _context(rounds: int) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+def _hash(password: str, rounds: int) -> str:
+    """Runs in a pool process."""
+    return _context(rounds).hash(password)
+
+
+def _verify(password: str, password_hash: str) -> bool:
+    """Runs in a pool process."""
+    return _context(BCRYPT_ROUNDS).verify(password, password_hash)
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """The shared pool, started on first use. spawn keeps workers independent of our threads."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                logger.info(f"🔐 Password hashing pool started: {PASSWORD_HASH_WORKERS} process(es), bcrypt rounds={BCRYPT_ROUNDS}")
+    return _executor
+
+
+def shutdown_password_hasher() -> None:
+    """Stop the pool processes (called from the app lifespan)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    """bcrypt-hash password in the pool, blocking the calling thread until done."""
+    with _pending:
+        return get_executor().submit(_hash, password, rounds).result()
+
+
+def hash_passwords(passwords: list, rounds: int = BCRYPT_ROUNDS) -> list:
+    """Hash many passwords across the pool's processes (bulk imports); same order as the input."""
+    futures = []
+    for password in passwords:
+        _pending.acquire()
+        future = get_executor().submit(_hash, password, rounds)
+        future.add_done_callback(lambda _: _pending.release())
+        futures.append(future)
+    return [future.result() for future in futures]
+
+
+async def _run_in_pool(fn, *args):
+    """Run fn in the pool once a pending slot is free, without blocking the event loop."""
+    if not _pending.acquire(blocking=False):
+        # Saturated: wait for a slot in a thread; if we are cancelled meanwhile, hand it back
+        acquiring = asyncio.ensure_future(asyncio.to_thread(_pending.acquire))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            acquiring.add_done_callback(lambda f: f.cancelled() or _pending.release())
+            raise
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_executor(), fn, *args)
+    finally:
+        _pending.release()
+
+
+async def hash_password_async(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    """bcrypt-hash password in the pool without blocking the event loop or a threadpool slot."""
+    return await _run_in_pool(_hash, password, rounds)
+
+
+async def verify_password_async(password: str, password_hash: str) -> bool:
+    """Check password against a bcrypt hash in the pool."""
+    return await _run_in_pool(_verify, password, password_hash)
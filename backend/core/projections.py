@@ -0,0 +1,26 @@
+"""
+Column projections for PostgREST selects.
+Services declare the columns each read needs instead of select("*"), which keeps
+JSON payloads (and decode cost) proportional to what callers actually use.
+"""
+from typing import Tuple
+
+
+class Projection(str):
+    """
+    An explicit select list. It is a str ("id, status, ...") so it can be passed
+    straight to .select(), and keeps the column names for introspection/extension.
+    """
+
+    columns: Tuple[str, ...]
+
+    def __new__(cls, *columns: str) -> "Projection":
+        if not columns:
+            raise ValueError("Projection needs at least one column")
+        projection = super().__new__(cls, ", ".join(columns))
+        projection.columns = tuple(columns)
+        return projection
+
+    def extend(self, *columns: str) -> "Projection":
+        """Return a new projection with extra columns appended (duplicates skipped)."""
+        return Projection(*self.columns, *(c for c in columns if c not in self.columns))
@@ -0,0 +1,167 @@
+"""
+Per-request Supabase query tracing.
+
+Every PostgREST/RPC call made through the shared Supabase clients is timed by httpx event
+hooks on their pooled HTTP clients and attributed to the current request (a ContextVar set by
+QueryTracingMiddleware; it follows sync handlers into the threadpool). Per request we:
+  - add a Server-Timing header: db;dur=<total ms>;desc="<n> queries"
+  - log any single query slower than QUERY_SLOW_MS
+  - warn when the same table/filter shape runs more than QUERY_N_PLUS_ONE_THRESHOLD times (N+1)
+"""
+import logging
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+QUERY_TRACING = os.getenv("QUERY_TRACING", "true").lower() in ("1", "true", "yes")
+QUERY_SLOW_MS = float(os.getenv("QUERY_SLOW_MS", "200"))
+QUERY_N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_N_PLUS_ONE_THRESHOLD", "3"))
+
+# Query params that shape the response rather than filter rows; their values are kept in the shape
+_MODIFIER_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+_START_KEY = "query_trace_start"
+
+
+class QueryRecord:
+    __slots__ = ("table", "shape", "method", "status", "duration_ms")
+
+    def __init__(self, table: str, shape: str, method: str, status: int, duration_ms: float):
+        self.table = table
+        self.shape = shape
+        self.method = method
+        self.status = status
+        self.duration_ms = duration_ms
+
+
+class RequestQueryTrace:
+    """Queries issued while handling one HTTP request."""
+
+    def __init__(self):
+        self.queries: List[QueryRecord] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(q.duration_ms for q in self.queries)
+
+    def repeated_shapes(self, threshold: int = QUERY_N_PLUS_ONE_THRESHOLD) -> List[Tuple[str, int]]:
+        """Query shapes run more than threshold times - the N+1 pattern."""
+        counts = Counter(q.shape for q in self.queries)
+        return [(shape, n) for shape, n in counts.most_common() if n > threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.total_ms:.1f};desc="{self.count} queries"'
+
+
+_current_trace: ContextVar[Optional[RequestQueryTrace]] = ContextVar("supabase_query_trace", default=None)
+
+
+def get_current_trace() -> Optional[RequestQueryTrace]:
+    """The query trace for the request being handled, or None outside a request."""
+    return _current_trace.get()
+
+
+def describe_request(request: httpx.Request) -> Tuple[str, str]:
+    """
+    (table, shape) for a Supabase HTTP request. The shape keeps the table, method, filter columns
+    and operators but drops filter values, so "students?parent_id=eq.1" and "?parent_id=eq.2" match.
+    """
+    path = request.url.path
+    if "/rest/v1/" in path:
+        table = path.split("/rest/v1/", 1)[1].strip("/")
+        table = f"rpc:{table[4:]}" if table.startswith("rpc/") else table
+    else:
+        table = path
+
+    parts = []
+    for key, value in request.url.params.multi_items():
+        if key in _MODIFIER_PARAMS:
+            parts.append(f"{key}={value}")
+        else:
+            parts.append(f"{key}={value.split('.', 1)[0]}")
+    return table, f"{request.method} {table}?{'&'.join(sorted(parts))}"
+
+
+def _on_request(request: httpx.Request) -> None:
+    request.extensions[_START_KEY] = time.perf_counter()
+
+
+def _on_response(response: httpx.Response) -> None:
+    request = response.request
+    start = request.extensions.get(_START_KEY)
+    if start is None:
+        return
+    duration_ms = (time.perf_counter() - start) * 1000
+    table, shape = describe_request(request)
+
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.queries.append(QueryRecord(table, shape, request.method, response.status_code, duration_ms))
+    if duration_ms >= QUERY_SLOW_MS:
+        logger.warning(f"🐢 Slow Supabase query ({duration_ms:.0f} ms): {shape}",
+                       extra={"table": table, "duration_ms": round(duration_ms, 1), "status": response.status_code})
+
+
+async def _on_request_async(request: httpx.Request) -> None:
+    _on_request(request)
+
+
+async def _on_response_async(response: httpx.Response) -> None:
+    _on_response(response)
+
+
+def event_hooks(is_async: bool = False) -> dict:
+    """httpx event_hooks for the Supabase HTTP clients (empty when QUERY_TRACING is off)."""
+    if not QUERY_TRACING:
+        return {}
+    if is_async:
+        return {"request": [_on_request_async], "response": [_on_response_async]}
+    return {"request": [_on_request], "response": [_on_response]}
+
+
+class QueryTracingMiddleware:
+    """Pure ASGI middleware that opens a query trace per request and reports on it."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not QUERY_TRACING:
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestQueryTrace()
+        token = _current_trace.set(trace)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and trace.queries:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            self._report(scope, trace)
+
+    @staticmethod
+    def _report(scope, trace: RequestQueryTrace) -> None:
+        if not trace.queries:
+            return
+        route = getattr(scope.get("route"), "path", scope.get("path"))
+        logger.debug(f"{scope['method']} {route}: {trace.count} Supabase queries, {trace.total_ms:.1f} ms",
+                     extra={"db_queries": trace.count, "db_ms": round(trace.total_ms, 1)})
+        for shape, n in trace.repeated_shapes():
+            logger.warning(f"⚠️ Possible N+1 in {scope['method']} {route}: {shape} ran {n} times",
+                           extra={"db_queries": trace.count, "repeated": n})
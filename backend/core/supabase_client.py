@@ -1,15 +1,177 @@
-from supabase import create_client, Client
+from supabase import create_client, acreate_client, Client, AsyncClient
+from supabase import ClientOptions, AsyncClientOptions
+import asyncio
+import httpx
+import logging
 import os
 from dotenv import load_dotenv
+from core.query_tracing import event_hooks
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# HTTP connection pool tuning (shared by the PostgREST, auth and storage clients)
+SUPABASE_HTTP_MAX_CONNECTIONS = int(os.getenv("SUPABASE_HTTP_MAX_CONNECTIONS", "100"))
+SUPABASE_HTTP_MAX_KEEPALIVE = int(os.getenv("SUPABASE_HTTP_MAX_KEEPALIVE", "20"))
+SUPABASE_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_HTTP_KEEPALIVE_EXPIRY", "60"))
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "true").lower() in ("1", "true", "yes")
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+SUPABASE_READ_TIMEOUT = float(os.getenv("SUPABASE_READ_TIMEOUT", "30"))
+SUPABASE_POOL_TIMEOUT = float(os.getenv("SUPABASE_POOL_TIMEOUT", "10"))
+SUPABASE_WARMUP_CONNECTIONS = int(os.getenv("SUPABASE_WARMUP_CONNECTIONS", "4"))
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=SUPABASE_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=SUPABASE_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=SUPABASE_HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def _http_timeout() -> httpx.Timeout:
+    return httpx.Timeout(
+        SUPABASE_READ_TIMEOUT,
+        connect=SUPABASE_CONNECT_TIMEOUT,
+        pool=SUPABASE_POOL_TIMEOUT,
+    )
+
+
+def create_supabase_client(url: str = None, key: str = None) -> Client:
+    """
+    Build a sync Supabase client backed by one pooled, keep-alive httpx.Client.
+    Pool size, HTTP/2 and timeouts come from the SUPABASE_HTTP_* / SUPABASE_*_TIMEOUT env vars.
+    """
+    http_client = httpx.Client(
+        http2=SUPABASE_HTTP2,
+        limits=_http_limits(),
+        timeout=_http_timeout(),
+        follow_redirects=True,
+        event_hooks=event_hooks(),  # Per-request query timing / N+1 detection
+    )
+    options = ClientOptions(httpx_client=http_client)
+    return create_client(url or SUPABASE_URL, key or SUPABASE_KEY, options=options)
+
+
+async def create_async_supabase_client(url: str = None, key: str = None) -> AsyncClient:
+    """Async counterpart of create_supabase_client, backed by a pooled httpx.AsyncClient."""
+    http_client = httpx.AsyncClient(
+        http2=SUPABASE_HTTP2,
+        limits=_http_limits(),
+        timeout=_http_timeout(),
+        follow_redirects=True,
+        event_hooks=event_hooks(is_async=True),
+    )
+    options = AsyncClientOptions(httpx_client=http_client)
+    return await acreate_client(url or SUPABASE_URL, key or SUPABASE_KEY, options=options)
+
+
+supabase: Client = create_supabase_client()
+
+_async_supabase: AsyncClient = None
+_async_supabase_lock = asyncio.Lock()
 
 
 def get_supabase_client() -> Client:
     """Get the Supabase client instance"""
     return supabase
+
+
+async def get_async_supabase_client() -> AsyncClient:
+    """
+    Get the shared async Supabase client instance.
+    Created lazily on first use because the async client must be built inside a running event loop.
+    """
+    global _async_supabase
+    if _async_supabase is None:
+        async with _async_supabase_lock:
+            if _async_supabase is None:
+                _async_supabase = await create_async_supabase_client()
+    return _async_supabase
+
+
+def _pool_stats(http_client) -> dict:
+    """Read connection counts from an httpx client's underlying httpcore pool."""
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []) or [])
+    return {
+        "connections": len(connections),
+        "idle": sum(1 for c in connections if c.is_idle()),
+        "active": sum(1 for c in connections if not c.is_idle() and not c.is_closed()),
+        "http2": sum(1 for c in connections if "HTTP/2" in repr(c)),
+        "queued_requests": len(getattr(pool, "_requests", []) or []),
+    }
+
+
+def get_pool_stats() -> dict:
+    """Connection pool statistics for the shared sync and async clients, for sizing workers."""
+    stats = {
+        "limits": {
+            "max_connections": SUPABASE_HTTP_MAX_CONNECTIONS,
+            "max_keepalive_connections": SUPABASE_HTTP_MAX_KEEPALIVE,
+            "keepalive_expiry": SUPABASE_HTTP_KEEPALIVE_EXPIRY,
+            "http2": SUPABASE_HTTP2,
+        },
+        "sync": _pool_stats(supabase.options.httpx_client),
+        "async": None,
+    }
+    if _async_supabase is not None:
+        stats["async"] = _pool_stats(_async_supabase.options.httpx_client)
+    return stats
+
+
+async def warm_up_supabase_clients() -> None:
+    """
+    Open pooled connections ahead of the first request so it doesn't pay for DNS + TLS.
+    Failures are logged, never raised - the API should still start if Supabase is briefly unreachable.
+    """
+    def _warm_sync():
+        supabase.table("school_fees").select("grade").limit(1).execute()
+
+    async def _warm_async(client: AsyncClient):
+        await client.table("school_fees").select("grade").limit(1).execute()
+
+    client = await get_async_supabase_client()
+    results = await asyncio.gather(
+        asyncio.to_thread(_warm_sync),
+        *(_warm_async(client) for _ in range(max(1, SUPABASE_WARMUP_CONNECTIONS))),
+        return_exceptions=True,
+    )
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors:
+        logger.warning(f"Supabase warm-up failed for {len(errors)}/{len(results)} connections (continuing): {errors[0]}")
+    else:
+        logger.info(f"Supabase connection pools warmed: {get_pool_stats()}")
+
+
+async def close_supabase_clients() -> None:
+    """Close pooled connections on shutdown."""
+    supabase.options.httpx_client.close()
+    if _async_supabase is not None:
+        await _async_supabase.options.httpx_client.aclose()
+
+
+def fetch_all_rows(build_query, page_size: int = 1000) -> list:
+    """
+    Read every row of a query in page_size pages (PostgREST caps rows per response).
+    build_query is a zero-arg callable returning a fresh, filtered/ordered select builder.
+    """
+    rows = []
+    start = 0
+    while True:
+        response = build_query().range(start, start + page_size - 1).execute()
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        start += page_size
+
+
+def chunked(items: list, size: int):
+    """Yield successive size-length slices of items (for in_() filters and batch writes)."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
@@ -1,14 +1,37 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from core.logging_config import setup_logging, shutdown_logging
+
+setup_logging()  # Before the routers import, so every module logs through the queue
+
 from routes.student_routes import router as student_router
 from routes.parent_routes import router as parent_router
 from routes.auth_routes import router as auth_router
 from routes.declaration_routes import router as declaration_router
 from routes.school_fees_routes import router as school_fees_router
 from routes.user_routes import router as user_router
+from routes.payment_routes import router as payment_router
+from core.supabase_client import warm_up_supabase_clients, close_supabase_clients, get_pool_stats
+from core.metrics import MetricsMiddleware, metrics
+from core.query_tracing import QueryTracingMiddleware
+from services.email_outbox import email_outbox
+from core.passwords import shutdown_password_hasher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up_supabase_clients()  # Open pooled Supabase connections before the first request
+    email_outbox.start()  # Background email delivery
+    yield
+    await email_outbox.stop()
+    shutdown_password_hasher()
+    await close_supabase_clients()
+    shutdown_logging()
 
 
-app = FastAPI(title="Parent Re-Registration API")
+app = FastAPI(title="Parent Re-Registration API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,6 +39,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(QueryTracingMiddleware)  # Server-Timing, slow-query and N+1 logging
+app.add_middleware(MetricsMiddleware)  # Outermost, so latency includes CORS handling
 
 app.include_router(student_router)
 app.include_router(parent_router)
@@ -23,11 +48,27 @@ app.include_router(auth_router)  # Authentication routes
 app.include_router(declaration_router)  # Declaration routes
 app.include_router(school_fees_router)  # School fees routes
 app.include_router(user_router)  # User information routes
+app.include_router(payment_router)  # Payment ingestion routes
 
 @app.get("/")
 def root():
     return {"message": "Parent Re-Registration API is running!"}
 
+@app.get("/health/supabase-pool")
+def supabase_pool_stats():
+    """Supabase HTTP connection pool statistics, used to size workers and pool limits."""
+    return get_pool_stats()
+
+@app.get("/health/email-outbox")
+def email_outbox_stats():
+    """Queued / sent / failed email counts in the background email outbox."""
+    return email_outbox.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Per-route latency histograms, status codes, payload sizes and in-flight requests (Prometheus text format)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -0,0 +1,114 @@
+-- ✅ Transactional person + address creation
+-- create_parent / create_student used to insert the address and the person in separate HTTP
+-- calls (plus a parent existence check for students), so a failure in between left orphan
+-- addresses. Each function below does the whole create in one transaction and one round-trip
+-- and returns the created person row as JSON.
+
+-- 🟢 Insert a JSON object into a table, using only the keys it contains (so column defaults
+-- still apply to everything else). Runs with the caller's privileges and RLS.
+-- It takes any table name, so it lives in the private schema, which PostgREST does not
+-- expose: clients can only reach it through the three wrappers below.
+CREATE SCHEMA IF NOT EXISTS private;
+REVOKE ALL ON SCHEMA private FROM PUBLIC;
+GRANT USAGE ON SCHEMA private TO anon, authenticated, service_role;
+
+-- Replaces the earlier public.insert_json_row, which was callable as /rpc/insert_json_row
+DROP FUNCTION IF EXISTS public.insert_json_row(regclass, jsonb);
+
+CREATE OR REPLACE FUNCTION private.insert_json_row(p_table regclass, p_row jsonb)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_columns text;
+  v_row jsonb;
+BEGIN
+  SELECT string_agg(quote_ident(a.attname), ', ')
+  INTO v_columns
+  FROM pg_attribute a
+  WHERE a.attrelid = p_table
+    AND a.attnum > 0
+    AND NOT a.attisdropped
+    AND p_row ? a.attname;
+
+  IF v_columns IS NULL THEN
+    RAISE EXCEPTION 'No insertable columns for %', p_table USING ERRCODE = '22023';
+  END IF;
+
+  EXECUTE format(
+    'INSERT INTO %1$s (%2$s) SELECT %2$s FROM jsonb_populate_record(NULL::%1$s, $1) RETURNING to_jsonb(%1$s.*)',
+    p_table, v_columns
+  )
+  INTO v_row
+  USING p_row;
+  RETURN v_row;
+END;
+$$;
+
+-- 🟢 Address + parent
+CREATE OR REPLACE FUNCTION public.create_parent_with_address(p_address jsonb, p_parent jsonb)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_address jsonb;
+BEGIN
+  v_address := private.insert_json_row('public.addresses', p_address);
+  RETURN private.insert_json_row('public.parents', p_parent || jsonb_build_object('address_id', v_address->'address_id'));
+END;
+$$;
+
+-- 🟢 Address + student; the parent (by SA ID number) must already exist
+CREATE OR REPLACE FUNCTION public.create_student_with_address(p_address jsonb, p_student jsonb)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_address jsonb;
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM public.parents p WHERE p.id_number = p_student->>'parent_id') THEN
+    RAISE EXCEPTION 'Parent with ID % does not exist', p_student->>'parent_id' USING ERRCODE = '23503';
+  END IF;
+  v_address := private.insert_json_row('public.addresses', p_address);
+  RETURN private.insert_json_row('public.students', p_student || jsonb_build_object('address_id', v_address->'address_id'));
+END;
+$$;
+
+-- 🟢 Bulk variant for class-sized imports: p_rows is [{"address": {...}, "student": {...}}, ...].
+-- All or nothing; returns the created student rows in input order.
+CREATE OR REPLACE FUNCTION public.create_students_with_addresses(p_rows jsonb)
+RETURNS jsonb
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_missing text;
+  v_item jsonb;
+  v_address jsonb;
+  v_created jsonb := '[]'::jsonb;
+BEGIN
+  SELECT string_agg(DISTINCT r.item->'student'->>'parent_id', ', ')
+  INTO v_missing
+  FROM jsonb_array_elements(p_rows) AS r(item)
+  WHERE NOT EXISTS (SELECT 1 FROM public.parents p WHERE p.id_number = r.item->'student'->>'parent_id');
+
+  IF v_missing IS NOT NULL THEN
+    RAISE EXCEPTION 'Parents with ID % do not exist', v_missing USING ERRCODE = '23503';
+  END IF;
+
+  FOR v_item IN SELECT value FROM jsonb_array_elements(p_rows) LOOP
+    v_address := private.insert_json_row('public.addresses', v_item->'address');
+    v_created := v_created || jsonb_build_array(
+      private.insert_json_row('public.students', (v_item->'student') || jsonb_build_object('address_id', v_address->'address_id'))
+    );
+  END LOOP;
+  RETURN v_created;
+END;
+$$;
+
+-- The wrappers run as the caller, so the caller needs EXECUTE on the helper; the private
+-- schema keeps it off the API.
+REVOKE ALL ON FUNCTION private.insert_json_row(regclass, jsonb) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION private.insert_json_row(regclass, jsonb) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.create_parent_with_address(jsonb, jsonb) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.create_student_with_address(jsonb, jsonb) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.create_students_with_addresses(jsonb) TO anon, authenticated, service_role;
@@ -0,0 +1,6 @@
+-- ✅ Parent-scoped keyset pagination for /api/parents/bank-details/all
+-- WHERE parent_id_number = $1 AND id > $cursor ORDER BY id LIMIT n walks this index
+-- instead of scanning fee_responsibility. Unfiltered exports page over the primary key.
+
+CREATE INDEX IF NOT EXISTS idx_fee_responsibility_parent_id_number_id
+ON public.fee_responsibility (parent_id_number, id);
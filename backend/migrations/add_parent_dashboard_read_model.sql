@@ -0,0 +1,32 @@
+-- ✅ Parent dashboard read model
+-- One denormalized row per learner per month with everything the Parent Dashboard shows
+-- (fee, paid this month, outstanding, next payment date, facility link, status).
+-- The API keeps it current: create_payment, schedule/facility/fee/student writes recompute the
+-- affected rows, so get_parent_dashboard is a single indexed read instead of five lookups.
+-- Backfill or repair with: python rebuild_parent_dashboard.py [--month YYYY-MM]
+
+CREATE TABLE IF NOT EXISTS public.parent_dashboard (
+  student_id text NOT NULL,
+  month text NOT NULL CHECK (month ~ '^\d{4}-\d{2}$'),
+  parent_id_number text NOT NULL,
+  application_id uuid,
+  first_name text,
+  surname text,
+  grade text,
+  monthly_fee numeric NOT NULL DEFAULT 0,
+  paid_this_month numeric NOT NULL DEFAULT 0,
+  outstanding_amount numeric NOT NULL DEFAULT 0,
+  next_payment_date date,
+  facility_linked boolean NOT NULL DEFAULT false,
+  payment_status text NOT NULL,
+  refreshed_at timestamp with time zone NOT NULL DEFAULT now(),
+  CONSTRAINT parent_dashboard_pkey PRIMARY KEY (student_id, month)
+);
+
+-- 🟢 The dashboard read: WHERE parent_id_number = ? AND month = ? ORDER BY student_id
+CREATE INDEX IF NOT EXISTS idx_parent_dashboard_parent_month
+ON public.parent_dashboard (parent_id_number, month, student_id);
+
+-- 🟢 Month-wide rebuilds and clean-up of learners that no longer exist
+CREATE INDEX IF NOT EXISTS idx_parent_dashboard_month
+ON public.parent_dashboard (month);
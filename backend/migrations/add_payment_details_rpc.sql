@@ -0,0 +1,41 @@
+-- ✅ Payment Modal details in one round-trip
+-- get_payment_details used to read the student, then fee_responsibility by the student's
+-- application_id. This joins them in Postgres; fee_found is false when the application has
+-- no fee_responsibility record yet. No rows means the student does not exist.
+
+CREATE INDEX IF NOT EXISTS idx_fee_responsibility_application_id
+ON public.fee_responsibility (application_id);
+
+CREATE OR REPLACE FUNCTION public.get_payment_details(p_student_id uuid)
+RETURNS TABLE (
+  student_id uuid,
+  first_name text,
+  surname text,
+  application_id uuid,
+  fee_found boolean,
+  parent_id_number text,
+  parent_first_name text,
+  parent_surname text,
+  bank_name text,
+  branch_code text,
+  account_number text,
+  account_type text
+)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT s.id, s.first_name, s.surname, s.application_id,
+         f.id IS NOT NULL,
+         f.parent_id_number::text, f.parent_first_name::text, f.parent_surname::text,
+         f.bank_name::text, f.branch_code::text, f.account_number::text, f.account_type::text
+  FROM public.students s
+  LEFT JOIN LATERAL (
+    SELECT fr.*
+    FROM public.fee_responsibility fr
+    WHERE fr.application_id = s.application_id
+    LIMIT 1
+  ) f ON true
+  WHERE s.id = p_student_id;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.get_payment_details(uuid) TO anon, authenticated, service_role;
@@ -0,0 +1,11 @@
+-- ✅ Payment reminder campaigns
+-- Overdue / upcoming reminders select unpaid rows by due_date across the whole table;
+-- a partial index over unpaid schedules keeps that a range scan as history grows.
+
+CREATE INDEX IF NOT EXISTS idx_payment_schedule_unpaid_due_date
+ON public.payment_schedule (due_date, id)
+WHERE status <> 'paid';
+
+-- Payer lookup by parent for the recipient join
+CREATE INDEX IF NOT EXISTS idx_fee_responsibility_parent_id_number
+ON public.fee_responsibility (parent_id_number);
@@ -0,0 +1,5 @@
+-- ✅ Payment schedule generation upserts with ON CONFLICT (student_id, month_due)
+-- One instalment per learner per month, so reruns of the generator overwrite instead of duplicating
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_payment_schedule_student_month_unique
+ON public.payment_schedule (student_id, month_due);
@@ -0,0 +1,41 @@
+-- ✅ Server-side payment totals
+-- Sums completed payments in Postgres and returns one row per student / parent + month,
+-- so the API no longer downloads every payment row to add them up in Python.
+
+-- Index the filter + group columns used by both functions
+CREATE INDEX IF NOT EXISTS idx_payments_student_month_status
+ON public.payments (student_id, month_covered, status);
+
+CREATE INDEX IF NOT EXISTS idx_payments_parent_month_status
+ON public.payments (parent_id_number, month_covered, status);
+
+-- 🟢 Totals per student for one month (batched: pass every student_id at once)
+CREATE OR REPLACE FUNCTION public.payment_totals_by_students(p_student_ids text[], p_month text)
+RETURNS TABLE (student_id text, month_covered text, total_paid numeric)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT p.student_id::text, p.month_covered, COALESCE(SUM(p.payment_amount), 0)
+  FROM public.payments p
+  WHERE p.student_id::text = ANY (p_student_ids)
+    AND p.month_covered = p_month
+    AND p.status = 'completed'
+  GROUP BY p.student_id, p.month_covered;
+$$;
+
+-- 🟢 Total for one parent for one month
+CREATE OR REPLACE FUNCTION public.payment_totals_by_parent(p_parent_id_number text, p_month text)
+RETURNS TABLE (parent_id_number text, month_covered text, total_paid numeric)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT p.parent_id_number, p.month_covered, COALESCE(SUM(p.payment_amount), 0)
+  FROM public.payments p
+  WHERE p.parent_id_number = p_parent_id_number
+    AND p.month_covered = p_month
+    AND p.status = 'completed'
+  GROUP BY p.parent_id_number, p.month_covered;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.payment_totals_by_students(text[], text) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION public.payment_totals_by_parent(text, text) TO anon, authenticated, service_role;
@@ -0,0 +1,31 @@
+-- ✅ Bulk payment ingestion upserts with ON CONFLICT (receipt_number)
+-- PostgREST needs a unique constraint/index on the conflict column for this to work
+--
+-- Payments are financial records, so duplicate receipt numbers are not deleted here: the
+-- migration stops and lists them instead. Review and resolve them first:
+--   SELECT receipt_number, COUNT(*), array_agg(id) FROM public.payments
+--   WHERE receipt_number IS NOT NULL GROUP BY 1 HAVING COUNT(*) > 1;
+
+DO $$
+DECLARE
+  v_duplicates text;
+BEGIN
+  SELECT string_agg(format('%s (%s rows)', receipt_number, n), ', ' ORDER BY receipt_number)
+  INTO v_duplicates
+  FROM (
+    SELECT receipt_number, COUNT(*) AS n
+    FROM public.payments
+    WHERE receipt_number IS NOT NULL
+    GROUP BY receipt_number
+    HAVING COUNT(*) > 1
+  ) d;
+
+  IF v_duplicates IS NOT NULL THEN
+    RAISE EXCEPTION 'payments has duplicate receipt numbers; resolve them before adding the unique index: %', v_duplicates
+      USING ERRCODE = '23505';
+  END IF;
+END;
+$$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_payments_receipt_number_unique
+ON public.payments (receipt_number);
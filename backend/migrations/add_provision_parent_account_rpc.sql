@@ -0,0 +1,60 @@
+-- ✅ Login-time provisioning in one round-trip
+-- Replaces the select/insert applications + select/insert parents sequence AuthService.login
+-- ran on every login. Idempotent: concurrent first logins of the same user are serialised
+-- by an advisory lock, and existing rows are returned untouched.
+
+CREATE INDEX IF NOT EXISTS idx_applications_user_id
+ON public.applications (user_id);
+
+CREATE INDEX IF NOT EXISTS idx_parents_user_id
+ON public.parents (user_id);
+
+-- 🟢 Ensure the user has an application and a primary parent record
+CREATE OR REPLACE FUNCTION public.provision_parent_account(
+  p_user_id uuid,
+  p_email text,
+  p_first_name text,
+  p_surname text
+)
+RETURNS TABLE (application_id uuid, parent_id uuid, created boolean)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+  v_application_id uuid;
+  v_parent_id uuid;
+  v_created boolean := false;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtextextended(p_user_id::text, 0));
+
+  SELECT a.id INTO v_application_id
+  FROM public.applications a
+  WHERE a.user_id = p_user_id
+  ORDER BY a.created_at
+  LIMIT 1;
+
+  IF v_application_id IS NULL THEN
+    INSERT INTO public.applications (user_id, status)
+    VALUES (p_user_id, 'in_progress')
+    RETURNING id INTO v_application_id;
+    v_created := true;
+  END IF;
+
+  SELECT p.id INTO v_parent_id
+  FROM public.parents p
+  WHERE p.user_id = p_user_id
+  LIMIT 1;
+
+  IF v_parent_id IS NULL THEN
+    INSERT INTO public.parents (application_id, user_id, first_name, surname, email, relationship, is_primary)
+    VALUES (v_application_id, p_user_id, COALESCE(NULLIF(p_first_name, ''), 'Parent'), COALESCE(p_surname, ''),
+            p_email, 'Primary', true)
+    RETURNING id INTO v_parent_id;
+    v_created := true;
+  END IF;
+
+  RETURN QUERY SELECT v_application_id, v_parent_id, v_created;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.provision_parent_account(uuid, text, text, text) TO anon, authenticated, service_role;
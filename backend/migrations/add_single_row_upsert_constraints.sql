@@ -0,0 +1,44 @@
+-- ✅ Single-call upserts for bank accounts, declarations and selected plans
+-- save_bank_account, save_declaration and save_selected_plan used to select and then insert or
+-- update, so parallel double-submits could both insert. They now rely on ON CONFLICT, which
+-- needs one row per key to be enforced by a unique index.
+--
+-- Existing duplicates must go first. Review them before running this migration:
+--   SELECT parent_id_number, COUNT(*) FROM public.bank_accounts GROUP BY 1 HAVING COUNT(*) > 1;
+--   SELECT application_id, COUNT(*) FROM public.fee_responsibility GROUP BY 1 HAVING COUNT(*) > 1;
+-- The statements below keep the most recently updated row of each group.
+
+DELETE FROM public.bank_accounts b
+USING public.bank_accounts newer
+WHERE b.parent_id_number = newer.parent_id_number
+  AND (newer.updated_at, newer.id::text) > (b.updated_at, b.id::text);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_bank_accounts_parent_id_number_unique
+ON public.bank_accounts (parent_id_number);
+
+DELETE FROM public.fee_responsibility f
+USING public.fee_responsibility newer
+WHERE f.application_id = newer.application_id
+  AND (newer.updated_at, newer.id::text) > (f.updated_at, f.id::text);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_fee_responsibility_application_id_unique
+ON public.fee_responsibility (application_id);
+
+-- declarations.application_id is already UNIQUE (declarations_application_id_key)
+
+-- 🟢 Set the selected plan, creating the fee_responsibility record if needed. Only
+-- selected_plan is touched on existing rows (a PostgREST upsert would overwrite every
+-- column in the payload).
+CREATE OR REPLACE FUNCTION public.save_selected_plan(p_application_id uuid, p_selected_plan text)
+RETURNS SETOF public.fee_responsibility
+LANGUAGE sql
+AS $$
+  INSERT INTO public.fee_responsibility (application_id, selected_plan, fee_person, relationship, fee_terms_accepted)
+  VALUES (p_application_id, p_selected_plan, 'Parent', 'Parent', false)
+  ON CONFLICT (application_id) DO UPDATE
+    SET selected_plan = EXCLUDED.selected_plan,
+        updated_at = now()
+  RETURNING *;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.save_selected_plan(uuid, text) TO anon, authenticated, service_role;
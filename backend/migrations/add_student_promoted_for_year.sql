@@ -0,0 +1,7 @@
+-- ✅ Idempotent grade promotion
+-- promote_all_students stamps each learner with the academic year they were promoted into and
+-- only updates rows WHERE promoted_for_year IS DISTINCT FROM <that year>, so rerunning the job
+-- (e.g. after a chunk failed) never promotes anyone twice.
+
+ALTER TABLE public.students
+ADD COLUMN IF NOT EXISTS promoted_for_year integer;
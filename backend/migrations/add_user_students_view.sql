@@ -0,0 +1,41 @@
+-- ✅ A user's students in one round-trip
+-- get_students_by_user_id used to read applications.parent_id_number for the user, then
+-- students by parent_id. user_students does that join in Postgres, keyed by the auth user_id,
+-- so the API filters it with a single user_id=eq.<uuid>. Like the old code, only the user's
+-- first application decides which parent's students are returned.
+-- security_invoker keeps the RLS policies of applications/students in force for the caller.
+
+CREATE INDEX IF NOT EXISTS idx_applications_user_id_created_at
+ON public.applications (user_id, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_students_parent_id
+ON public.students (parent_id);
+
+CREATE OR REPLACE VIEW public.user_students
+WITH (security_invoker = true) AS
+SELECT a.user_id,
+       s.parent_id,
+       s.application_id,
+       s.first_name,
+       s.surname,
+       s.grade_applied_for,
+       s.id_number,
+       s.gender,
+       s.date_of_birth,
+       s.street_address,
+       s.city,
+       s.state,
+       s.postcode,
+       s.phone_number,
+       s.email,
+       s.status,
+       s.monthly_fee,
+       s.previous_grade
+FROM (
+  SELECT DISTINCT ON (user_id) user_id, parent_id_number
+  FROM public.applications
+  ORDER BY user_id, created_at
+) a
+JOIN public.students s ON s.parent_id = a.parent_id_number;
+
+GRANT SELECT ON public.user_students TO authenticated, service_role;
@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+"""
+Rebuild the parent_dashboard read model for a month (backfills and repairs).
+
+    cd backend
+    python rebuild_parent_dashboard.py                  # current month
+    python rebuild_parent_dashboard.py --month 2026-02  # a specific month
+"""
+import argparse
+import json
+import re
+
+from core.logging_config import setup_logging, shutdown_logging
+from services.dashboard_service import rebuild_parent_dashboard
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--month", help="YYYY-MM (default: current month)")
+    args = parser.parse_args(argv)
+    if args.month and not re.fullmatch(r"\d{4}-\d{2}", args.month):
+        parser.error("--month must be YYYY-MM")
+
+    setup_logging()
+    try:
+        print(json.dumps(rebuild_parent_dashboard(args.month), indent=2))
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
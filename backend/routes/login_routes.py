@@ -1,16 +1,20 @@
 # routes/login_routes.py
+import logging
 from fastapi import APIRouter, HTTPException
 from core.supabase_client import supabase
+from core.logging_config import log_payload
 from schemas.login_schema import LoginRequest
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/login")
 
 @router.post("/parent")
 def login_parent(login_req: LoginRequest):  # receive Pydantic model
-    print("🔹 Login attempt for parent_id:", login_req.id_number)
+    logger.debug("🔹 Login attempt for parent_id: %s", login_req.id_number)
     try:
         res = supabase.table("parents").select("*").eq("id_number", login_req.id_number).execute()
-        print("🔹 Supabase response:", res.data)
+        log_payload(logger, "🔹 Supabase response", res.data)
         if not res.data or len(res.data) == 0:
             raise HTTPException(status_code=404, detail="Parent not found")
         
@@ -22,5 +26,5 @@ def login_parent(login_req: LoginRequest):  # receive Pydantic model
             "phone_number": parent["phone_number"]
         }
     except Exception as e:
-        print("❌ Error in login:", e)
+        logger.error("❌ Error in login: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,13 +1,27 @@
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from schemas.parent_schema import ParentCreate
 from services.parent_service import create_parent, get_parent_children, get_parent_by_application_id, get_parent_by_user_id
 from services.student_service import get_students_by_parent_id, update_student_by_id_number
 from services.plan_service import plan_service
-from services.bank_service import save_bank_account, get_bank_account
+from services.bank_service import (
+    save_bank_account, get_bank_account, get_bank_details_page, iter_bank_details,
+    get_application_user_id, save_fee_responsibility_bank_details,
+    BANK_DETAILS_PAGE_SIZE, BANK_DETAILS_MAX_PAGE_SIZE,
+)
 from services.declaration_service import declaration_service
+from services.payment_details_service import (
+    get_payment_details as get_payment_details_for_student,
+    get_payment_details_by_app as get_payment_details_for_app,
+)
 from schemas.bank_schema import BankAccountCreate
 from fastapi import Body
 import logging
+from core.logging_config import log_payload
+from core.auth import AuthenticatedUser, get_current_user, ensure_same_user
+from core.passwords import hash_password_async
 import json
 
 logger = logging.getLogger(__name__)
@@ -16,10 +30,12 @@ router = APIRouter(prefix="/api/parents", tags=["Parents"])
 
 # ✅ Register new parent
 @router.post("/register")
-def register_parent(parent: ParentCreate):
+async def register_parent(parent: ParentCreate):
     try:
         parent_dict = parent.dict()
-        data = create_parent(parent_dict)
+        # Hash in the process pool without holding a threadpool slot, then do the inserts
+        parent_dict["password_hash"] = await hash_password_async(parent_dict.pop("password"))
+        data = await run_in_threadpool(create_parent, parent_dict)
         return {"message": "Parent registered successfully", "parent": data}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -39,102 +55,26 @@ def get_payment_details(student_id: str):
         Payment details including bank account and learner information
     """
     try:
-        from core.supabase_client import supabase
-        
-        print(f"\n💳 [get_payment_details] ===== START =====")
-        print(f"💳 [get_payment_details] Fetching payment details for student_id='{student_id}'")
+        logger.debug(f"💳 [get_payment_details] Fetching payment details for student_id='{student_id}'")
         
-        # Get student details to find their application_id
-        student_response = supabase.table("students").select("id, first_name, surname, application_id").eq("id", student_id).execute()
+        # One RPC (students ⋈ fee_responsibility), cached briefly per student
+        payment_details = get_payment_details_for_student(student_id)
         
-        if not student_response.data or len(student_response.data) == 0:
-            print(f"❌ [get_payment_details] Student not found for student_id: {student_id}")
+        if payment_details is None:
+            logger.error(f"❌ [get_payment_details] Student not found for student_id: {student_id}")
             return {
                 "message": "Student not found",
                 "payment_details": None
             }
         
-        student = student_response.data[0]
-        application_id = student.get("application_id")
-        
-        print(f"💳 [get_payment_details] Student found: {student.get('first_name')} {student.get('surname')}")
-        print(f"💳 [get_payment_details] Application ID: {application_id}")
-        
-        if not application_id:
-            print(f"⚠️ [get_payment_details] Student has no application_id")
-            return {
-                "message": "Payment details found",
-                "payment_details": {
-                    "student_id": student_id,
-                    "student_name": f"{student.get('first_name')} {student.get('surname')}",
-                    "account_holder_name": "Not provided",
-                    "bank_name": "Not provided",
-                    "account_type": "Cheque",
-                    "account_number": "Not provided",
-                    "branch_code": "Not provided",
-                }
-            }
-        
-        # Get fee_responsibility record with bank details
-        print(f"💳 [get_payment_details] 🔍 Querying fee_responsibility for application_id: {application_id}")
-        fee_resp = supabase.table("fee_responsibility").select("*").eq("application_id", application_id).execute()
-        
-        print(f"💳 [get_payment_details] fee_responsibility query response count: {len(fee_resp.data) if fee_resp.data else 0}")
-        
-        if not fee_resp.data or len(fee_resp.data) == 0:
-            print(f"⚠️ [get_payment_details] No fee_responsibility record found for application_id: {application_id}")
-            return {
-                "message": "Payment details found",
-                "payment_details": {
-                    "student_id": student_id,
-                    "student_name": f"{student.get('first_name')} {student.get('surname')}",
-                    "account_holder_name": "Not provided",
-                    "bank_name": "Not provided",
-                    "account_type": "Cheque",
-                    "account_number": "Not provided",
-                    "branch_code": "Not provided",
-                }
-            }
-        
-        fee_responsibility = fee_resp.data[0]
-        
-        print(f"💳 [get_payment_details] Fee responsibility record found")
-        
-        # Get account holder name from parent_first_name and parent_surname in fee_responsibility
-        parent_first_name = fee_responsibility.get("parent_first_name") or ""
-        parent_surname = fee_responsibility.get("parent_surname") or ""
-        account_holder_name = f"{parent_first_name} {parent_surname}".strip() or "Not provided"
-        
-        # Get bank details with null handling
-        bank_name = fee_responsibility.get("bank_name") or "Not provided"
-        account_number = fee_responsibility.get("account_number") or "Not provided"
-        branch_code = fee_responsibility.get("branch_code") or "Not provided"
-        account_type = fee_responsibility.get("account_type") or "Cheque"
-        
-        print(f"💳 [get_payment_details] Computed account_holder_name: '{account_holder_name}'")
-        print(f"💳 [get_payment_details] Computed bank_name: '{bank_name}'")
-        
-        payment_details = {
-            "student_id": student_id,
-            "student_name": f"{student.get('first_name')} {student.get('surname')}",
-            "account_holder_name": account_holder_name,
-            "bank_name": bank_name,
-            "account_type": account_type,
-            "account_number": account_number,
-            "branch_code": branch_code,
-            "application_id": application_id
-        }
-        
-        print(f"💳 [get_payment_details] Payment details compiled successfully")
-        print(f"💳 [get_payment_details] Final payment_details: {json.dumps(payment_details, default=str)}")
-        print(f"💳 [get_payment_details] ===== END =====\n")
+        log_payload(logger, "💳 [get_payment_details] Final payment_details", payment_details)
         
         return {
-            "message": "Payment details retrieved",
+            "message": "Payment details retrieved" if "application_id" in payment_details else "Payment details found",
             "payment_details": payment_details
         }
     except Exception as e:
-        print(f"❌ [get_payment_details] Error: {str(e)}")
+        logger.error(f"❌ [get_payment_details] Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -152,18 +92,12 @@ def get_payment_details_by_app(application_id: str):
         Payment details including bank account and learner information
     """
     try:
-        from core.supabase_client import supabase
-        
-        print(f"\n💳 [get_payment_details_by_app] ===== START =====")
-        print(f"💳 [get_payment_details_by_app] Fetching payment details for application_id='{application_id}'")
+        logger.debug(f"💳 [get_payment_details_by_app] Fetching payment details for application_id='{application_id}'")
         
-        # Get fee_responsibility record directly
-        fee_resp = supabase.table("fee_responsibility").select("*").eq("application_id", application_id).execute()
+        payment_details = get_payment_details_for_app(application_id)
         
-        print(f"💳 [get_payment_details_by_app] fee_responsibility query response count: {len(fee_resp.data) if fee_resp.data else 0}")
-        
-        if not fee_resp.data or len(fee_resp.data) == 0:
-            print(f"⚠️ [get_payment_details_by_app] No fee_responsibility record found")
+        if payment_details is None:
+            logger.warning(f"⚠️ [get_payment_details_by_app] No fee_responsibility record found")
             return {
                 "message": "No fee responsibility record found",
                 "payment_details": {
@@ -175,99 +109,72 @@ def get_payment_details_by_app(application_id: str):
                 }
             }
         
-        fee_responsibility = fee_resp.data[0]
-        
-        print(f"💳 [get_payment_details_by_app] Fee responsibility record found")
-        
-        # Get account holder name from parent_first_name and parent_surname
-        parent_first_name = fee_responsibility.get("parent_first_name") or ""
-        parent_surname = fee_responsibility.get("parent_surname") or ""
-        account_holder_name = f"{parent_first_name} {parent_surname}".strip() or "Not provided"
-        
-        # Get bank details with null handling
-        bank_name = fee_responsibility.get("bank_name") or "Not provided"
-        account_number = fee_responsibility.get("account_number") or "Not provided"
-        branch_code = fee_responsibility.get("branch_code") or "Not provided"
-        account_type = fee_responsibility.get("account_type") or "Cheque"
-        
-        print(f"💳 [get_payment_details_by_app] account_holder_name: '{account_holder_name}'")
-        
-        payment_details = {
-            "application_id": application_id,
-            "account_holder_name": account_holder_name,
-            "bank_name": bank_name,
-            "account_type": account_type,
-            "account_number": account_number,
-            "branch_code": branch_code,
-        }
-        
-        print(f"💳 [get_payment_details_by_app] Payment details compiled successfully")
-        print(f"💳 [get_payment_details_by_app] ===== END =====\n")
-        
         return {
             "message": "Payment details retrieved",
             "payment_details": payment_details
         }
     except Exception as e:
-        print(f"❌ [get_payment_details_by_app] Error: {str(e)}")
+        logger.error(f"❌ [get_payment_details_by_app] Error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# ✅ Get all bank account details for a parent's students
+# ✅ Get bank account details, scoped to a parent/application, paginated or streamed
 @router.get("/bank-details/all")
-def get_all_bank_details(parent_id: str = None):
+def get_all_bank_details(
+    parent_id: Optional[str] = None,
+    application_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(BANK_DETAILS_PAGE_SIZE, ge=1, le=BANK_DETAILS_MAX_PAGE_SIZE),
+    export: Optional[str] = Query(None, pattern="^(ndjson|json)$"),
+):
     """
-    Fetch all bank account details for a parent and their students.
-    Can be used to get consolidated payment information.
-    
+    Fetch bank account details from fee_responsibility.
+
+    - parent_id / application_id filter the rows (parent_id is the parent's ID number)
+    - Pages are keyset-paginated on id: pass the returned next_cursor as cursor to get the next page
+    - export=ndjson|json streams every matching row (admin bulk export) as NDJSON or a JSON array,
+      reading one page at a time so memory stays flat regardless of table size
+
     Returns:
-        List of bank account details for all student applications
+        {"bank_details": [...], "next_cursor": str | None} or a streamed export
     """
+    if export:
+        return _stream_bank_details(export, parent_id, application_id)
+
     try:
-        from core.supabase_client import supabase
-        
-        print(f"\n💳 [get_all_bank_details] ===== START =====")
-        print(f"💳 [get_all_bank_details] Fetching all bank details for parent")
-        
-        # Get all fee_responsibility records
-        fee_resp = supabase.table("fee_responsibility").select("*").execute()
-        
-        print(f"💳 [get_all_bank_details] Found {len(fee_resp.data) if fee_resp.data else 0} fee_responsibility records")
-        
-        if not fee_resp.data:
-            return {
-                "message": "No bank details found",
-                "bank_details": []
-            }
-        
-        bank_details_list = []
-        for fee_rec in fee_resp.data:
-            # Get parent name
-            parent_first_name = fee_rec.get("parent_first_name") or ""
-            parent_surname = fee_rec.get("parent_surname") or ""
-            account_holder_name = f"{parent_first_name} {parent_surname}".strip() or "Not provided"
-            
-            bank_details_list.append({
-                "application_id": fee_rec.get("application_id"),
-                "account_holder_name": account_holder_name,
-                "bank_name": fee_rec.get("bank_name") or "Not provided",
-                "account_type": fee_rec.get("account_type") or "Cheque",
-                "account_number": fee_rec.get("account_number") or "Not provided",
-                "branch_code": fee_rec.get("branch_code") or "Not provided",
-            })
-        
-        print(f"💳 [get_all_bank_details] Compiled {len(bank_details_list)} bank detail records")
-        print(f"💳 [get_all_bank_details] ===== END =====\n")
-        
+        bank_details_list, next_cursor = get_bank_details_page(parent_id, application_id, after=cursor, limit=limit)
+        logger.info(f"[get_all_bank_details] parent={parent_id} application={application_id} "
+                    f"returned {len(bank_details_list)} rows, more={next_cursor is not None}")
+
         return {
-            "message": "Bank details retrieved",
-            "bank_details": bank_details_list
+            "message": "Bank details retrieved" if bank_details_list else "No bank details found",
+            "bank_details": bank_details_list,
+            "next_cursor": next_cursor,
         }
     except Exception as e:
-        print(f"❌ [get_all_bank_details] Error: {str(e)}")
+        logger.error(f"[get_all_bank_details] Error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _stream_bank_details(export: str, parent_id: Optional[str], application_id: Optional[str]):
+    """Stream all matching bank details as NDJSON or a JSON array."""
+    rows = iter_bank_details(parent_id, application_id)
+
+    def ndjson():
+        for row in rows:
+            yield json.dumps(row) + "\n"
+
+    def json_array():
+        yield "["
+        for i, row in enumerate(rows):
+            yield ("," if i else "") + json.dumps(row)
+        yield "]"
+
+    if export == "ndjson":
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    return StreamingResponse(json_array(), media_type="application/json")
+
+
 # ✅ Fetch children from students table (legacy route)
 @router.get("/{parent_id}/children")
 def fetch_children(parent_id: str):
@@ -308,12 +215,14 @@ def get_parent_info(application_id: str):
 
 # ✅ Fetch parent info by user_id
 @router.get("/user/{user_id}/info")
-def get_parent_info_by_user(user_id: str):
+def get_parent_info_by_user(user_id: str, current_user: AuthenticatedUser = Depends(get_current_user)):
     """
     Fetch primary parent information by user_id (authenticated user).
     Finds the application linked to this user, then fetches the primary parent.
     Used by Header to display logged-in parent's name.
+    Requires the user's own bearer token (verified locally, see core.auth).
     """
+    ensure_same_user(current_user, user_id)
     try:
         logger.info(f"Fetching parent info for user_id: {user_id}")
         parent = get_parent_by_user_id(user_id)
@@ -405,7 +314,7 @@ def save_plan(application_id: str, plan_data: dict = Body(...)):
     """
     try:
         logger.info(f"Received POST request to save plan for application_id: {application_id}")
-        logger.debug(f"Plan data: {plan_data}")
+        log_payload(logger, "Plan data", plan_data)
         
         if not plan_data.get("selected_plan"):
             raise ValueError("selected_plan is required in request body")
@@ -435,13 +344,13 @@ def test_all_plans(parent_id: str):
     """Test endpoint to see all plans for debugging"""
     try:
         from core.supabase_client import supabase
-        print(f"\n🧪 [test_all_plans] Fetching all plans for parent_id='{parent_id}'")
+        logger.debug(f"🧪 [test_all_plans] Fetching all plans for parent_id='{parent_id}'")
         response = supabase.table("plan_selection").select("*").eq("parent_id_number", parent_id).execute()
-        print(f"🧪 [test_all_plans] Found {len(response.data) if response.data else 0} plans")
-        print(f"🧪 [test_all_plans] Plans: {response.data}\n")
+        logger.debug(f"🧪 [test_all_plans] Found {len(response.data) if response.data else 0} plans")
+        log_payload(logger, "🧪 [test_all_plans] Plans", response.data)
         return {"total": len(response.data) if response.data else 0, "plans": response.data}
     except Exception as e:
-        print(f"❌ [test_all_plans] Error: {e}")
+        logger.error(f"❌ [test_all_plans] Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # ✅ Send registration completion email
@@ -460,23 +369,24 @@ def send_registration_email(parent_id: str, email_data: dict = Body(...)):
     try:
         from services.email_service import send_registration_completion_email
         
-        print(f"\n📧 [send_registration_email] ===== START =====")
-        print(f"📧 [send_registration_email] Received request for parent_id='{parent_id}'")
-        print(f"📧 [send_registration_email] Email data: {email_data}")
+        logger.debug(f"📧 [send_registration_email] Received request for parent_id='{parent_id}'")
+        log_payload(logger, "📧 [send_registration_email] Email data", email_data)
         
-        result = send_registration_completion_email(
+        email_id = send_registration_completion_email(
             to_email=email_data.get("parent_email"),
             parent_name=email_data.get("parent_name"),
             student_names=email_data.get("student_names", []),
             selected_plan=email_data.get("selected_plan", "N/A")
         )
         
-        print(f"📧 [send_registration_email] Email sent successfully")
-        print(f"📧 [send_registration_email] ===== END =====\n")
+        # Delivery happens in the background outbox workers; we only wait for the enqueue
+        logger.debug(f"📧 [send_registration_email] Email queued as #{email_id}")
         
-        return {"message": "Registration email sent successfully", "sent": result}
+        queued = email_id is not None
+        message = "Registration email queued" if queued else "Registration email could not be queued"
+        return {"message": message, "sent": queued, "queued": queued, "email_id": email_id}
     except Exception as e:
-        print(f"❌ [send_registration_email] Error: {e}")
+        logger.error(f"❌ [send_registration_email] Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # ✅ Save Bank Account Details
@@ -497,9 +407,8 @@ def save_bank_details(parent_id: str, bank_data: dict = Body(...)):
     }
     """
     try:
-        print(f"\n💳 [save_bank_details] ===== START =====")
-        print(f"💳 [save_bank_details] Received POST request for parent_id='{parent_id}'")
-        print(f"💳 [save_bank_details] Bank data: {bank_data}")
+        logger.debug(f"💳 [save_bank_details] Received POST request for parent_id='{parent_id}'")
+        log_payload(logger, "💳 [save_bank_details] Bank data", bank_data)
         
         # Validate data
         bank_account = BankAccountCreate(**bank_data)
@@ -507,14 +416,46 @@ def save_bank_details(parent_id: str, bank_data: dict = Body(...)):
         # Save to database
         result = save_bank_account(parent_id, bank_account.dict())
         
-        print(f"💳 [save_bank_details] Bank account saved successfully")
-        print(f"💳 [save_bank_details] ===== END =====\n")
+        logger.debug(f"💳 [save_bank_details] Bank account saved successfully")
         
         return {"message": "Bank account details saved successfully", "bank_account": result}
     except Exception as e:
-        print(f"❌ [save_bank_details] Error: {e}")
+        logger.error(f"❌ [save_bank_details] Error: {e}")
         raise HTTPException(status_code=400, detail=str(e))
 
+# ✅ Save the bank details shown in the Payment Modal (fee_responsibility)
+@router.put("/{application_id}/bank-details")
+def save_fee_responsibility_bank(
+    application_id: str,
+    bank_data: dict = Body(...),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+):
+    """
+    Save bank details and plan on the application's fee_responsibility record.
+    Requires the bearer token of the user who owns the application.
+
+    Body example:
+    {
+        "bank_name": "FNB",
+        "branch_code": "250655",
+        "account_number": "62123456789",
+        "account_type": "Cheque",
+        "selected_plan": "pay-monthly",
+        "parent_first_name": "John",
+        "parent_surname": "Doe"
+    }
+    """
+    owner = get_application_user_id(application_id)
+    if owner is None:
+        raise HTTPException(status_code=404, detail="Application not found")
+    ensure_same_user(current_user, owner)
+    try:
+        record = save_fee_responsibility_bank_details(application_id, bank_data)
+        return {"message": "Bank details saved", "fee_responsibility": record}
+    except Exception as e:
+        logger.error(f"❌ [save_fee_responsibility_bank] Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ✅ Get Bank Account Details
 @router.get("/{parent_id}/bank-account")
 def get_bank_details(parent_id: str):
@@ -522,19 +463,17 @@ def get_bank_details(parent_id: str):
     Retrieve bank account details for a parent.
     """
     try:
-        print(f"\n💳 [get_bank_details] ===== START =====")
-        print(f"💳 [get_bank_details] Received GET request for parent_id='{parent_id}'")
+        logger.debug(f"💳 [get_bank_details] Received GET request for parent_id='{parent_id}'")
         
         bank_account = get_bank_account(parent_id)
         
         if not bank_account:
-            print(f"⚠️ [get_bank_details] No bank account found")
+            logger.warning(f"⚠️ [get_bank_details] No bank account found")
             return {"message": "No bank account details found", "bank_account": None}
         
-        print(f"💳 [get_bank_details] Bank account retrieved successfully")
-        print(f"💳 [get_bank_details] ===== END =====\n")
+        logger.debug(f"💳 [get_bank_details] Bank account retrieved successfully")
         
         return {"message": "Bank account details retrieved", "bank_account": bank_account}
     except Exception as e:
-        print(f"❌ [get_bank_details] Error: {e}")
+        logger.error(f"❌ [get_bank_details] Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
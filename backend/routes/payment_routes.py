@@ -0,0 +1,240 @@
+"""
+Payment routes - bulk ingestion of bank statement / debit-order results,
+academic-year payment schedule generation, payment reminder campaigns and
+parent dashboard rebuilds.
+"""
+
+import codecs
+import csv
+import json
+import logging
+from collections import deque
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from core.auth import require_service_role
+from services.payment_service import PaymentBulkIngestor, PAYMENT_BULK_CHUNK_SIZE
+from services.payment_schedule_service import generate_payment_schedules, SCHEDULE_MONTHLY_INSTALMENTS
+from services.payment_reminder_service import run_reminder_campaign, REMINDER_BATCH_SIZE, REMINDER_UPCOMING_DAYS
+from services.dashboard_service import rebuild_parent_dashboard
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/payments", tags=["Payments"])
+
+
+async def _iter_lines(request: Request):
+    """Yield decoded text lines from the request body as it streams in."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        yield pending.rstrip("\r")
+
+
+class _LineFeed:
+    """Iterator over lines appended as they stream in, so one csv.reader can span the whole body."""
+
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def _iter_csv_records(request: Request):
+    """
+    Yield (line_number, values, error) per CSV record. Lines are buffered until their quotes
+    balance, so quoted fields containing newlines stay in one record; line_number is the
+    record's first line.
+    """
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    record_start, quotes = None, 0
+    line_number = 0
+
+    def read_record():
+        try:
+            return record_start, next(reader), None
+        except csv.Error as e:
+            return record_start, None, f"Malformed CSV: {e}"
+
+    async for line in _iter_lines(request):
+        line_number += 1
+        if record_start is None:
+            if not line.strip():
+                continue
+            record_start = line_number
+        feed.lines.append(line + "\n")
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            yield read_record()
+            record_start, quotes = None, 0
+    if record_start is not None:
+        # Unterminated quote at end of file: let the reader make what it can of it
+        yield read_record()
+
+
+async def _iter_payment_rows(request: Request):
+    """
+    Yield (line_number, row, error) for each payment in the request body. Rows that cannot be
+    parsed come back with row=None and an error instead of aborting the upload, since earlier
+    chunks may already be written.
+    - text/csv: header row + one payment per record, parsed as it streams
+    - application/x-ndjson: one JSON object per line, parsed as it streams
+    - application/json: a JSON array, or {"payments": [...]} (parsed before anything is written)
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type in ("text/csv", "application/csv"):
+        header = None
+        async for line_number, values, error in _iter_csv_records(request):
+            if error:
+                yield line_number, None, error
+            elif header is None:
+                header = [h.strip() for h in values]
+            else:
+                yield line_number, dict(zip(header, values)), None
+
+    elif content_type in ("application/x-ndjson", "application/jsonl"):
+        line_number = 0
+        async for line in _iter_lines(request):
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f"Invalid JSON: {e}"
+                continue
+            if isinstance(row, dict):
+                yield line_number, row, None
+            else:
+                yield line_number, None, "Expected a JSON object"
+
+    elif content_type == "application/json":
+        body = json.loads(await request.body())
+        rows = body.get("payments", []) if isinstance(body, dict) else body
+        if not isinstance(rows, list):
+            raise ValueError("JSON body must be an array of payments or {\"payments\": [...]}")
+        for row in rows:
+            yield None, (row if isinstance(row, dict) else {}), None
+
+    else:
+        raise ValueError(f"Unsupported content type '{content_type}'. Use text/csv, application/x-ndjson or application/json")
+
+
+# ✅ Bulk payment ingestion (month-end bank statement reconciliation)
+@router.post("/bulk", dependencies=[Depends(require_service_role)])
+async def bulk_upload_payments(
+    request: Request,
+    chunk_size: int = Query(PAYMENT_BULK_CHUNK_SIZE, ge=1, le=5000),
+):
+    """
+    Ingest a CSV / NDJSON / JSON stream of payments.
+
+    Rows are validated, deduped on receipt_number and written chunk_size at a time as
+    multi-row upserts, so large files finish in a handful of round trips.
+
+    CSV example:
+        parent_id_number,student_id,application_id,payment_amount,payment_date,receipt_number,status
+        9001015001088,0501015001088,<uuid>,4500.00,2025-11-01,DO-2025-11-0001,completed
+
+    Unparsable lines are reported as invalid rows (with their line number) rather than failing
+    the upload. If the stream breaks off midway, the report of what was written so far is
+    still returned (HTTP 500, with "error").
+
+    Returns:
+        {"summary": {"total", "inserted", "duplicate", "invalid", "failed"}, "results": [per-row status]}
+    """
+    ingestor = PaymentBulkIngestor(chunk_size)
+    try:
+        async for line, row, error in _iter_payment_rows(request):
+            if error:
+                ingestor.add_invalid(error, line)
+            elif ingestor.add(row, line):
+                await run_in_threadpool(ingestor.flush)
+    except Exception as e:
+        if isinstance(e, ValueError) and not ingestor.results:
+            # Rejected before any row was read - nothing has been written
+            logger.warning(f"Bulk payment upload rejected: {str(e)}")
+            raise HTTPException(status_code=400, detail=str(e))
+        logger.error(f"Bulk payment upload aborted: {str(e)}", exc_info=True)
+        return JSONResponse(status_code=500, content={
+            "message": "Bulk payment upload aborted", "error": str(e), **await run_in_threadpool(ingestor.report),
+        })
+
+    report = await run_in_threadpool(ingestor.report)
+    logger.info(f"Bulk payment upload complete: {report['summary']}")
+    return {"message": "Bulk payment upload processed", **report}
+
+
+# ✅ Generate the payment schedule for a whole academic year
+@router.post("/schedules/generate", dependencies=[Depends(require_service_role)])
+def generate_schedules(
+    academic_year: int = Query(..., ge=2000, le=2100),
+    instalments: int = Query(SCHEDULE_MONTHLY_INSTALMENTS, ge=10, le=12),
+    dry_run: bool = False,
+):
+    """
+    Build every learner's instalments from fee_responsibility.selected_plan and the grade fee,
+    and upsert them into payment_schedule in large batches. Idempotent on (student_id, month_due).
+    """
+    try:
+        result = generate_payment_schedules(academic_year, instalments=instalments, dry_run=dry_run)
+        return {"message": "Payment schedules generated", **result}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error generating payment schedules for {academic_year}: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ✅ Recompute the parent dashboard read model for a month
+@router.post("/dashboard/rebuild", dependencies=[Depends(require_service_role)])
+def rebuild_dashboard(month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$")):
+    """
+    Recompute every learner's parent_dashboard row for month (default: current month) and drop
+    rows of learners that no longer exist. Idempotent - use for backfills and repairs.
+    """
+    try:
+        return {"message": "Parent dashboard rebuilt", **rebuild_parent_dashboard(month)}
+    except Exception as e:
+        logger.error(f"Error rebuilding parent dashboard ({month or 'current month'}): {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ✅ Email every parent with overdue / upcoming payments
+@router.post("/reminders", dependencies=[Depends(require_service_role)])
+def send_payment_reminders(
+    kind: str = Query("overdue", pattern="^(overdue|upcoming)$"),
+    days_ahead: int = Query(REMINDER_UPCOMING_DAYS, ge=1, le=60),
+    as_of: Optional[date] = None,
+    batch_size: int = Query(REMINDER_BATCH_SIZE, ge=1, le=1000),
+    dry_run: bool = False,
+):
+    """
+    Run a payment reminder campaign: recipients come from set-based payment_schedule queries and
+    are sent as SendGrid personalizations, up to batch_size parents per API call.
+    dry_run computes recipients and batches without sending.
+    """
+    try:
+        report = run_reminder_campaign(kind, as_of=as_of, days_ahead=days_ahead, batch_size=batch_size, dry_run=dry_run)
+        return {"message": "Payment reminder campaign processed", **report}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error running {kind} payment reminder campaign: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,14 +1,26 @@
-from fastapi import APIRouter, HTTPException
-from services.student_service import create_student, get_students_by_parent_id, get_students_by_user_id, update_student_by_id_number
+import asyncio
+from typing import List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from core.auth import AuthenticatedUser, get_current_user, ensure_same_user, require_service_role
+from core.passwords import hash_password_async
+from services.grade_promotion_service import promote_all_students, PROMOTION_DIFF_LIMIT
+from services.student_service import (
+    create_student, create_students_bulk, get_students_by_parent_id, get_students_by_user_id, update_student_by_id_number,
+    STUDENT_BULK_MAX,
+)
 
 # Use a clear API prefix so frontend (/api/students/...) matches the backend routes
 router = APIRouter(prefix="/api/students", tags=["Students"])
 
 
 @router.post("/register")
-def register_student(student: dict):
+async def register_student(student: dict):
     try:
-        result = create_student(student)
+        if "password" in student:
+            # Hash in the process pool without holding a threadpool slot, then do the inserts
+            student["password_hash"] = await hash_password_async(student.pop("password"))
+        result = await run_in_threadpool(create_student, student)
         return {"message": "Student registered successfully", "data": result}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -16,6 +28,41 @@ def register_student(student: dict):
         raise HTTPException(status_code=500, detail=f"Error creating student: {str(e)}")
 
 
+@router.post("/register/bulk")
+async def register_students_bulk(students: List[dict] = Body(...)):
+    """Class-sized import: every student and address is created in one transaction, or none are."""
+    if len(students) > STUDENT_BULK_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {STUDENT_BULK_MAX} students per bulk import")
+    try:
+        to_hash = [student for student in students if "password" in student]
+        hashes = await asyncio.gather(*(hash_password_async(student.pop("password")) for student in to_hash))
+        for student, password_hash in zip(to_hash, hashes):
+            student["password_hash"] = password_hash
+        result = await run_in_threadpool(create_students_bulk, students)
+        return {"message": f"{len(result)} students registered successfully", "data": result}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating students: {str(e)}")
+
+
+@router.post("/promote-grades", dependencies=[Depends(require_service_role)])
+def promote_grades(
+    dry_run: bool = True,
+    diff_limit: int = Query(PROMOTION_DIFF_LIMIT, ge=0, le=10000),
+    academic_year: Optional[int] = Query(None, ge=2000, le=2100),
+):
+    """
+    School-wide grade promotion for re-registration season. Defaults to a dry run that returns
+    the per-grade transitions and a diff sample; pass dry_run=false to apply it. Learners already
+    promoted into academic_year (default: next year) are skipped, so reruns are safe.
+    """
+    try:
+        return promote_all_students(dry_run=dry_run, diff_limit=diff_limit, academic_year=academic_year)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error promoting grades: {str(e)}")
+
+
 @router.get("/parent/{parent_id}")
 def get_students_for_parent(parent_id: str):
     try:
@@ -28,7 +75,8 @@ def get_students_for_parent(parent_id: str):
 
 
 @router.get("/user/{user_id}")
-def get_students_for_user(user_id: str):
+def get_students_for_user(user_id: str, current_user: AuthenticatedUser = Depends(get_current_user)):
+    ensure_same_user(current_user, user_id)
     try:
         students = get_students_by_user_id(user_id)
         if not students:
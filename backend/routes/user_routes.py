@@ -1,9 +1,12 @@
+import logging
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, EmailStr
 from core.supabase_client import get_supabase_client
 import os
 from dotenv import load_dotenv
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 router = APIRouter(prefix="/api/user", tags=["User"])
@@ -41,5 +44,5 @@ def get_user_info(user_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error fetching user info: {str(e)}")
+        logger.error(f"Error fetching user info: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error fetching user info: {str(e)}")
@@ -3,13 +3,21 @@ Authentication service using Supabase Auth.
 Handles user signup, login, and token validation.
 """
 
+import asyncio
+import os
 from supabase import Client
+from core.cache import TTLCache
 from core.supabase_client import supabase
 from schemas.login_schema import LoginRequest, SignupRequest, TokenResponse, UserResponse
 import logging
 
 logger = logging.getLogger(__name__)
 
+# user_id -> application_id for users whose application/parent records are known to exist
+PROVISIONED_CACHE_TTL_SECONDS = int(os.getenv("PROVISIONED_CACHE_TTL_SECONDS", "86400"))
+PROVISIONED_CACHE_MAXSIZE = int(os.getenv("PROVISIONED_CACHE_MAXSIZE", "50000"))
+_provisioned_users = TTLCache(PROVISIONED_CACHE_TTL_SECONDS, maxsize=PROVISIONED_CACHE_MAXSIZE)
+
 
 class AuthService:
     """Service for handling authentication with Supabase Auth."""
@@ -44,8 +52,8 @@ class AuthService:
             raise ValueError("Password must contain at least one special character.")
 
         try:
-            # Sign up with Supabase Auth
-            response = self.supabase.auth.sign_up({
+            # Sign up with Supabase Auth; the client is blocking, so it runs in a worker thread
+            response = await asyncio.to_thread(self.supabase.auth.sign_up, {
                 "email": email,
                 "password": password,
                 "options": {
@@ -79,7 +87,9 @@ class AuthService:
     async def login(self, email: str, password: str) -> TokenResponse:
         """
         Login a parent user with email and password.
-        Creates an application record if one doesn't exist for this user.
+        On a user's first login (per process) the application and parent records are
+        provisioned with one RPC; afterwards a login is a single auth round-trip.
+        Both run in worker threads so the event loop keeps serving other requests.
         
         Args:
             email: Email address
@@ -93,7 +103,8 @@ class AuthService:
             Exception: If Supabase login fails
         """
         try:
-            response = self.supabase.auth.sign_in_with_password({
+            # The Supabase client is blocking, so auth and provisioning run in a worker thread
+            response = await asyncio.to_thread(self.supabase.auth.sign_in_with_password, {
                 "email": email,
                 "password": password
             })
@@ -107,58 +118,13 @@ class AuthService:
                 full_name=response.user.user_metadata.get("full_name", "") if response.user.user_metadata else ""
             )
 
-            # ✅ Step 2: Create application if it doesn't exist for this user
-            try:
-                existing_app = self.supabase.table("applications").select("id").eq("user_id", response.user.id).execute()
-                
-                if not existing_app.data or len(existing_app.data) == 0:
-                    # Create new application
-                    app_response = self.supabase.table("applications").insert({
-                        "user_id": response.user.id,
-                        "status": "in_progress"
-                    }).execute()
-                    
-                    if app_response.data:
-                        logger.info(f"Created new application for user {response.user.id}")
-                        application_id = app_response.data[0]["id"]
-                    else:
-                        logger.warning(f"Failed to create application for user {response.user.id}")
-                        application_id = None
-                else:
-                    logger.info(f"Application already exists for user {response.user.id}")
-                    application_id = existing_app.data[0]["id"]
-                
-                # ✅ IMPORTANT: Always create/check parent record with user_id link
-                if application_id:
-                    try:
-                        # Check if parent record already exists for this user
-                        existing_parent = self.supabase.table("parents").select("id").eq("user_id", response.user.id).execute()
-                        
-                        if not existing_parent.data or len(existing_parent.data) == 0:
-                            # Create parent record with user_id link
-                            parent_response = self.supabase.table("parents").insert({
-                                "application_id": application_id,
-                                "user_id": response.user.id,
-                                "first_name": user.full_name.split()[0] if user.full_name else "Parent",
-                                "surname": " ".join(user.full_name.split()[1:]) if len(user.full_name.split()) > 1 else "",
-                                "email": response.user.email,
-                                "relationship": "Primary",
-                                "is_primary": True
-                            }).execute()
-                            
-                            if parent_response.data:
-                                logger.info(f"✅ Created parent record for user {response.user.id}")
-                            else:
-                                logger.warning(f"⚠️ Failed to create parent record for user {response.user.id}")
-                        else:
-                            logger.info(f"Parent record already exists for user {response.user.id}")
-                    except Exception as parent_error:
-                        logger.error(f"❌ Error with parent record: {str(parent_error)}")
-                        import traceback
-                        logger.error(traceback.format_exc())
-            except Exception as app_error:
-                logger.error(f"Error creating/checking application: {str(app_error)}")
-                # Don't fail login if application creation fails
+            # ✅ Step 2: Provision application + parent record on first login only
+            if _provisioned_users.get(user.id) is None:
+                try:
+                    await asyncio.to_thread(self.provision_user, user.id, user.email, user.full_name)
+                except Exception as provision_error:
+                    # Don't fail login if provisioning fails; it is retried on the next login
+                    logger.error(f"❌ Error provisioning application/parent for user {user.id}: {str(provision_error)}")
 
             token_response = TokenResponse(
                 access_token=response.session.access_token,
@@ -175,6 +141,31 @@ class AuthService:
                 raise ValueError("Invalid email or password")
             raise
 
+    def provision_user(self, user_id: str, email: str, full_name: str) -> dict:
+        """
+        Ensure the user has an application and a primary parent record.
+        One idempotent RPC (provision_parent_account); a successful result is remembered
+        per user_id so returning users skip it entirely.
+
+        Returns:
+            {"application_id", "parent_id", "created"}
+        """
+        names = (full_name or "").split()
+        response = self.supabase.rpc("provision_parent_account", {
+            "p_user_id": user_id,
+            "p_email": email or None,
+            "p_first_name": names[0] if names else "Parent",
+            "p_surname": " ".join(names[1:]),
+        }).execute()
+        if not response.data:
+            raise Exception("provision_parent_account returned no rows")
+
+        result = response.data[0]
+        _provisioned_users.set(user_id, result["application_id"])
+        if result.get("created"):
+            logger.info(f"✅ Provisioned application {result['application_id']} / parent {result['parent_id']} for user {user_id}")
+        return result
+
     async def logout(self, user_id: str) -> dict:
         """
         Logout a user (backend-side cleanup if needed).
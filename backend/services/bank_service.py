@@ -2,8 +2,31 @@
 Bank Account Service - Handle bank account details for debit orders
 """
 
+import logging
 from core.supabase_client import supabase
+from core.projections import Projection
 from schemas.bank_schema import BankAccountCreate
+from services.plan_service import PAYMENT_DETAILS_COLUMNS
+from services.payment_details_service import invalidate_payment_details
+
+logger = logging.getLogger(__name__)
+
+# Column projections: full bank account rows, and the slim variant for display
+BANK_ACCOUNT_COLUMNS = Projection(
+    "id", "parent_id_number", "account_holder_name", "bank_name", "account_type", "account_number",
+    "branch_code", "id_number", "phone_number", "created_at", "updated_at",
+)
+BANK_ACCOUNT_SUMMARY_COLUMNS = Projection("account_holder_name", "bank_name", "account_type", "account_number", "branch_code")
+
+# fee_responsibility bank details, keyed by id for keyset pagination
+BANK_DETAILS_COLUMNS = PAYMENT_DETAILS_COLUMNS.extend("id", "parent_id_number")
+BANK_DETAILS_PAGE_SIZE = 100
+BANK_DETAILS_MAX_PAGE_SIZE = 1000
+
+# fee_responsibility fields the Update Details page may change
+FEE_RESPONSIBILITY_BANK_FIELDS = (
+    "bank_name", "branch_code", "account_number", "account_type", "selected_plan", "parent_first_name", "parent_surname",
+)
 
 
 def save_bank_account(parent_id_number: str, bank_data: dict):
@@ -18,30 +41,11 @@ def save_bank_account(parent_id_number: str, bank_data: dict):
         Created/updated bank account record
     """
     try:
-        # Check if bank account already exists
-        existing = supabase.table("bank_accounts").select("*").eq("parent_id_number", parent_id_number).execute()
-        
-        if existing.data and len(existing.data) > 0:
-            # Update existing record
-            result = (
-                supabase.table("bank_accounts")
-                .update({
-                    "account_holder_name": bank_data.get("account_holder_name"),
-                    "bank_name": bank_data.get("bank_name"),
-                    "account_type": bank_data.get("account_type"),
-                    "account_number": bank_data.get("account_number"),
-                    "branch_code": bank_data.get("branch_code"),
-                    "id_number": bank_data.get("id_number"),
-                    "phone_number": bank_data.get("phone_number"),
-                    "updated_at": "now()"
-                })
-                .eq("parent_id_number", parent_id_number)
-                .execute()
-            )
-            print(f"✅ Bank account updated for parent {parent_id_number}")
-        else:
-            # Create new record
-            result = supabase.table("bank_accounts").insert({
+        # One atomic INSERT ... ON CONFLICT (parent_id_number) DO UPDATE, so parallel
+        # double-submits can't create a second row
+        result = (
+            supabase.table("bank_accounts")
+            .upsert({
                 "parent_id_number": parent_id_number,
                 "account_holder_name": bank_data.get("account_holder_name"),
                 "bank_name": bank_data.get("bank_name"),
@@ -50,22 +54,70 @@ def save_bank_account(parent_id_number: str, bank_data: dict):
                 "branch_code": bank_data.get("branch_code"),
                 "id_number": bank_data.get("id_number"),
                 "phone_number": bank_data.get("phone_number"),
-            }).execute()
-            print(f"✅ Bank account created for parent {parent_id_number}")
-        
+                "updated_at": "now()"
+            }, on_conflict="parent_id_number")
+            .execute()
+        )
+        logger.info(f"✅ Bank account saved for parent {parent_id_number}")
+        invalidate_payment_details(parent_id_number=parent_id_number)
+
         return result.data[0] if result.data else None
 
     except Exception as e:
-        print(f"❌ Error saving bank account: {str(e)}")
+        logger.error(f"❌ Error saving bank account: {str(e)}")
         raise Exception(f"Failed to save bank account: {str(e)}")
 
 
-def get_bank_account(parent_id_number: str):
+def get_application_user_id(application_id: str):
+    """The auth user_id that owns an application, or None if it doesn't exist."""
+    result = supabase.table("applications").select("user_id").eq("id", application_id).limit(1).execute()
+    return result.data[0]["user_id"] if result.data else None
+
+
+def save_fee_responsibility_bank_details(application_id: str, bank_data: dict):
+    """
+    Save the bank details (and plan) the Payment Modal shows, on the application's
+    fee_responsibility record, creating the record if there is none yet.
+    Cached payment details for the application and its parent are dropped afterwards.
+
+    Args:
+        application_id: UUID of the application
+        bank_data: Any of FEE_RESPONSIBILITY_BANK_FIELDS; other keys are ignored
+
+    Returns:
+        The saved fee_responsibility record
+    """
+    fields = {field: bank_data[field] for field in FEE_RESPONSIBILITY_BANK_FIELDS if field in bank_data}
+    try:
+        existing = (
+            supabase.table("fee_responsibility")
+            .select("id, parent_id_number")
+            .eq("application_id", application_id)
+            .limit(1)
+            .execute()
+        )
+        if existing.data:
+            result = supabase.table("fee_responsibility").update(fields).eq("id", existing.data[0]["id"]).execute()
+        else:
+            result = supabase.table("fee_responsibility").insert({"application_id": application_id, **fields}).execute()
+    except Exception as e:
+        logger.error(f"❌ Error saving bank details for application {application_id}: {str(e)}")
+        raise Exception(f"Failed to save bank details: {str(e)}")
+
+    record = result.data[0] if result.data else None
+    parent_id_number = (record or {}).get("parent_id_number") or (existing.data[0]["parent_id_number"] if existing.data else None)
+    invalidate_payment_details(application_id=application_id, parent_id_number=parent_id_number)
+    logger.info(f"✅ Bank details saved for application {application_id}")
+    return record
+
+
+def get_bank_account(parent_id_number: str, columns: Projection = BANK_ACCOUNT_COLUMNS):
     """
     Retrieve bank account details for a parent.
     
     Args:
         parent_id_number: Parent's ID number
+        columns: Columns to return (BANK_ACCOUNT_SUMMARY_COLUMNS for the slim variant)
     
     Returns:
         Bank account record or None
@@ -73,20 +125,20 @@ def get_bank_account(parent_id_number: str):
     try:
         result = (
             supabase.table("bank_accounts")
-            .select("*")
+            .select(columns)
             .eq("parent_id_number", parent_id_number)
             .execute()
         )
         
         if result.data and len(result.data) > 0:
-            print(f"✅ Bank account found for parent {parent_id_number}")
+            logger.debug(f"✅ Bank account found for parent {parent_id_number}")
             return result.data[0]
         
-        print(f"⚠️ No bank account found for parent {parent_id_number}")
+        logger.warning(f"⚠️ No bank account found for parent {parent_id_number}")
         return None
 
     except Exception as e:
-        print(f"❌ Error retrieving bank account: {str(e)}")
+        logger.error(f"❌ Error retrieving bank account: {str(e)}")
         raise Exception(f"Failed to retrieve bank account: {str(e)}")
 
 
@@ -102,9 +154,70 @@ def delete_bank_account(parent_id_number: str):
     """
     try:
         supabase.table("bank_accounts").delete().eq("parent_id_number", parent_id_number).execute()
-        print(f"✅ Bank account deleted for parent {parent_id_number}")
+        logger.info(f"✅ Bank account deleted for parent {parent_id_number}")
         return True
 
     except Exception as e:
-        print(f"❌ Error deleting bank account: {str(e)}")
+        logger.error(f"❌ Error deleting bank account: {str(e)}")
         raise Exception(f"Failed to delete bank account: {str(e)}")
+
+
+def format_bank_details(fee_rec: dict) -> dict:
+    """Shape a fee_responsibility row into the bank details returned to the frontend."""
+    parent_first_name = fee_rec.get("parent_first_name") or ""
+    parent_surname = fee_rec.get("parent_surname") or ""
+    return {
+        "id": fee_rec.get("id"),
+        "application_id": fee_rec.get("application_id"),
+        "parent_id_number": fee_rec.get("parent_id_number"),
+        "account_holder_name": f"{parent_first_name} {parent_surname}".strip() or "Not provided",
+        "bank_name": fee_rec.get("bank_name") or "Not provided",
+        "account_type": fee_rec.get("account_type") or "Cheque",
+        "account_number": fee_rec.get("account_number") or "Not provided",
+        "branch_code": fee_rec.get("branch_code") or "Not provided",
+    }
+
+
+def get_bank_details_page(parent_id_number: str = None, application_id: str = None, after: str = None,
+                          limit: int = BANK_DETAILS_PAGE_SIZE):
+    """
+    Fetch one keyset page of bank details from fee_responsibility, ordered by id.
+
+    Args:
+        parent_id_number: Only rows for this parent (optional)
+        application_id: Only rows for this application (optional)
+        after: Cursor - the last id of the previous page
+        limit: Page size (capped at BANK_DETAILS_MAX_PAGE_SIZE)
+
+    Returns:
+        (formatted rows, next cursor or None when this is the last page)
+    """
+    limit = max(1, min(limit, BANK_DETAILS_MAX_PAGE_SIZE))
+    query = supabase.table("fee_responsibility").select(BANK_DETAILS_COLUMNS)
+    if parent_id_number:
+        query = query.eq("parent_id_number", parent_id_number)
+    if application_id:
+        query = query.eq("application_id", application_id)
+    if after:
+        query = query.gt("id", after)
+
+    # Ask for one extra row so we know whether another page exists without a count query
+    rows = query.order("id").limit(limit + 1).execute().data or []
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = rows[-1]["id"] if has_more else None
+    return [format_bank_details(row) for row in rows], next_cursor
+
+
+def iter_bank_details(parent_id_number: str = None, application_id: str = None,
+                      page_size: int = BANK_DETAILS_MAX_PAGE_SIZE):
+    """
+    Yield every matching bank details row, one keyset page in memory at a time.
+    Used for the streamed bulk export.
+    """
+    cursor = None
+    while True:
+        rows, cursor = get_bank_details_page(parent_id_number, application_id, after=cursor, limit=page_size)
+        yield from rows
+        if not cursor:
+            return
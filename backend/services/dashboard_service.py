@@ -1,12 +1,41 @@
 """
 Comprehensive Dashboard Service - Aggregates data from all tables
+
+The per-learner figures are materialized in the parent_dashboard read model (one row per
+learner per month). Writes that change them (payments, schedules, facility links, fees,
+students) call refresh_parent_dashboard for the affected learners and their siblings, so
+get_parent_dashboard is a single indexed read. A parent without rows for the month (e.g. the
+first read of a new month) is computed from the source tables once and written back.
+rebuild_parent_dashboard recomputes a whole month (backfills, repairs).
 """
-from datetime import datetime, date
-from services.fee_service import get_fee_by_grade
-from services.payment_service import get_total_paid_by_student_month
-from services.payment_schedule_service import get_schedule_by_student_month, get_upcoming_payments
-from services.facility_service import is_facility_linked
-from services.student_service import get_students_by_parent_id
+import logging
+import asyncio
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, date, timedelta
+from postgrest.types import ReturnMethod
+from core.supabase_client import supabase, get_async_supabase_client, fetch_all_rows, chunked
+from core.projections import Projection
+from core.grades import normalize_grade
+from services.fee_service import fetch_fees_by_grades
+from services.payment_service import fetch_total_paid_by_students_month
+from services.payment_schedule_service import fetch_schedules_by_students_month, get_upcoming_payments
+from services.facility_service import fetch_facility_links_by_students
+
+logger = logging.getLogger(__name__)
+
+# Learners recomputed (and upserted) per batch by refreshes and rebuilds
+PARENT_DASHBOARD_CHUNK_SIZE = int(os.getenv("PARENT_DASHBOARD_CHUNK_SIZE", "200"))
+
+PARENT_DASHBOARD_COLUMNS = Projection(
+    "student_id", "application_id", "first_name", "surname", "grade", "monthly_fee", "paid_this_month",
+    "outstanding_amount", "next_payment_date", "facility_linked", "payment_status",
+)
+DASHBOARD_STUDENT_COLUMNS = Projection("id_number", "parent_id", "application_id", "first_name", "surname", "grade_applied_for")
+
+# Grade-wide refreshes scan every learner, so they run off the request thread, one at a time
+_grade_refresh_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dashboard-grade-refresh")
 
 def get_current_month_str() -> str:
     """Get current month in YYYY-MM format"""
@@ -25,134 +54,336 @@ def calculate_payment_status(paid_amount: float, monthly_fee: float) -> str:
     else:
         return "partial"
 
+def _student_keys(students: list) -> tuple:
+    """Return the (student_ids, grades) lists used to key the batched lookups"""
+    student_ids = [s.get("id_number") or s.get("student_id") for s in students]
+    grades = [s.get("grade_applied_for") or "N/A" for s in students]
+    return student_ids, grades
+
+def _default_next_payment_date() -> str:
+    """Next payment date for learners without a schedule: the 15th of this month, or of next month once it has passed"""
+    today = date.today()
+    if today.day > 15:
+        next_date = date(today.year, today.month, 15) + timedelta(days=30)
+    else:
+        next_date = date(today.year, today.month, 15)
+    return next_date.isoformat()
+
+def _build_learner(
+    student: dict,
+    student_id: str,
+    grade: str,
+    fees_by_grade: dict,
+    paid_by_student: dict,
+    schedules_by_student: dict,
+    facility_links: dict,
+) -> dict:
+    """One learner's dashboard figures from the batched lookups. Pure in-memory work."""
+    logger.debug(f"  📚 Processing student: {student.get('first_name')} {student.get('surname')} ({grade})")
+
+    # Get fee structure from FEES table
+    fee_info = fees_by_grade.get(grade)
+    if not fee_info:
+        logger.warning(f"  ⚠️ No fee structure found for grade {grade}, using default")
+        monthly_fee = 4500.00
+        fee_breakdown = {
+            "tuition_fees": 2700.00,
+            "activity_fees": 900.00,
+            "facility_fees": 630.00,
+            "other_fees": 360.00
+        }
+    else:
+        monthly_fee = fee_info.get("total_monthly_fee", 4500.00)
+        fee_breakdown = {
+            "tuition_fees": fee_info.get("tuition_fees", 0),
+            "activity_fees": fee_info.get("activity_fees", 0),
+            "facility_fees": fee_info.get("facility_fees", 0),
+            "other_fees": fee_info.get("other_fees", 0)
+        }
+    
+    # Get payments for this student this month
+    paid_this_month = paid_by_student.get(student_id, 0.0)
+    outstanding_amount = max(0, monthly_fee - paid_this_month)
+    
+    # Get next payment schedule (None without one - defaulted at read time, see _from_read_model_row)
+    schedule = schedules_by_student.get(student_id)
+    next_payment_date = schedule.get("due_date") if schedule else None
+    
+    # Check facility status
+    facility_linked = facility_links.get(student_id, False)
+    
+    # Determine payment status
+    payment_status = calculate_payment_status(paid_this_month, monthly_fee)
+    
+    # Build learner object
+    learner = {
+        "id": student.get("application_id") or student_id,
+        "first_name": student.get("first_name", ""),
+        "surname": student.get("surname", ""),
+        "student_id": student_id,
+        "grade": grade,
+        "monthly_fee": monthly_fee,
+        "paid_this_month": paid_this_month,
+        "outstanding_amount": outstanding_amount,
+        "next_payment_date": next_payment_date,
+        "facility_linked": facility_linked,
+        "payment_status": payment_status
+    }
+    logger.debug(f"    ✓ Fee: R{monthly_fee:.2f} | Paid: R{paid_this_month:.2f} | Outstanding: R{outstanding_amount:.2f}")
+    return learner
+
+def _summarize_dashboard(learners: list, current_month: str) -> dict:
+    """Totals and fee breakdown over the learners, in the dashboard payload shape"""
+    total_monthly_fees = sum(learner["monthly_fee"] for learner in learners)
+    total_paid_this_month = sum(learner["paid_this_month"] for learner in learners)
+    total_outstanding = sum(learner["outstanding_amount"] for learner in learners)
+    
+    # Get overall fee breakdown (average across all students)
+    if learners:
+        avg_fee_breakdown = {
+            "tuition_fees": (total_monthly_fees * 0.6) / len(learners) * len(learners),
+            "activity_fees": (total_monthly_fees * 0.18) / len(learners) * len(learners),
+            "facility_fees": (total_monthly_fees * 0.14) / len(learners) * len(learners),
+            "other_fees": (total_monthly_fees * 0.08) / len(learners) * len(learners)
+        }
+    else:
+        avg_fee_breakdown = {
+            "tuition_fees": 0,
+            "activity_fees": 0,
+            "facility_fees": 0,
+            "other_fees": 0
+        }
+    
+    dashboard_data = {
+        "total_learners": len(learners),
+        "total_monthly_fees": total_monthly_fees,
+        "total_paid_this_month": total_paid_this_month,
+        "outstanding_amount": total_outstanding,
+        "learners": learners,
+        "fee_breakdown": avg_fee_breakdown,
+        "current_month": current_month,
+        "generated_at": datetime.now().isoformat()
+    }
+    
+    logger.info(f"✅ Dashboard ready: {len(learners)} learners, Total fees: R{total_monthly_fees:.2f}, Outstanding: R{total_outstanding:.2f}")
+    return dashboard_data
+
+def _compute_learners(students: list, month: str) -> list:
+    """
+    Dashboard figures for students (rows with DASHBOARD_STUDENT_COLUMNS) for month.
+    Fees, payments, schedules and facilities are batch-loaded (one query each) so the call count
+    does not grow with the number of learners. Raises on database errors, so a failed lookup is
+    never written to the read model as zeros.
+    """
+    student_ids, grades = _student_keys(students)
+    fees_by_grade = fetch_fees_by_grades(grades)
+    paid_by_student = fetch_total_paid_by_students_month(student_ids, month)
+    schedules_by_student = fetch_schedules_by_students_month(student_ids, month)
+    facility_links = fetch_facility_links_by_students(student_ids)
+    return [
+        _build_learner(student, student_id, grade, fees_by_grade, paid_by_student, schedules_by_student, facility_links)
+        for student, student_id, grade in zip(students, student_ids, grades)
+    ]
+
+def _to_read_model_row(student: dict, learner: dict, month: str, refreshed_at: str) -> dict:
+    return {
+        "student_id": learner["student_id"],
+        "month": month,
+        "parent_id_number": student["parent_id"],
+        "application_id": student.get("application_id"),
+        "first_name": learner["first_name"],
+        "surname": learner["surname"],
+        "grade": learner["grade"],
+        "monthly_fee": learner["monthly_fee"],
+        "paid_this_month": learner["paid_this_month"],
+        "outstanding_amount": learner["outstanding_amount"],
+        "next_payment_date": learner["next_payment_date"] or None,
+        "facility_linked": learner["facility_linked"],
+        "payment_status": learner["payment_status"],
+        "refreshed_at": refreshed_at,
+    }
+
+def _from_read_model_row(row: dict) -> dict:
+    return {
+        "id": row.get("application_id") or row["student_id"],
+        "first_name": row.get("first_name") or "",
+        "surname": row.get("surname") or "",
+        "student_id": row["student_id"],
+        "grade": row.get("grade"),
+        "monthly_fee": float(row.get("monthly_fee") or 0),
+        "paid_this_month": float(row.get("paid_this_month") or 0),
+        "outstanding_amount": float(row.get("outstanding_amount") or 0),
+        "next_payment_date": row.get("next_payment_date") or _default_next_payment_date(),
+        "facility_linked": bool(row.get("facility_linked")),
+        "payment_status": row.get("payment_status"),
+    }
+
+def _materialize(students: list, month: str) -> list:
+    """
+    Compute the learners for students and upsert their read-model rows. Returns the learners
+    as get_parent_dashboard would read them back.
+    """
+    students = [student for student in students if student.get("id_number") and student.get("parent_id")]
+    learners = []
+    refreshed_at = datetime.now().isoformat()
+    for batch in chunked(students, PARENT_DASHBOARD_CHUNK_SIZE):
+        rows = [
+            _to_read_model_row(student, learner, month, refreshed_at)
+            for student, learner in zip(batch, _compute_learners(batch, month))
+        ]
+        supabase.table("parent_dashboard").upsert(rows, on_conflict="student_id,month", returning=ReturnMethod.minimal).execute()
+        learners.extend(_from_read_model_row(row) for row in rows)
+    return learners
+
+def refresh_parent_dashboard(student_ids: list, month: str = None) -> int:
+    """
+    Recompute the read-model rows of these learners (by SA ID) and their siblings for month
+    (default: current). Whole families are written so a parent's month is never partially
+    materialized - get_parent_dashboard trusts any rows it finds. Learners that no longer exist
+    lose their row. Called after writes to payments, schedules, facility links, fees and
+    students; errors are logged, not raised, so the write that triggered the refresh still
+    succeeds (rebuild_parent_dashboard repairs missed refreshes).
+    Returns the number of rows written.
+    """
+    month = month or get_current_month_str()
+    wanted = sorted({student_id for student_id in student_ids if student_id})
+    written = 0
+    try:
+        for batch in chunked(wanted, PARENT_DASHBOARD_CHUNK_SIZE):
+            found = (
+                supabase.table("students")
+                .select("id_number, parent_id")
+                .in_("id_number", batch)
+                .execute()
+                .data or []
+            )
+            parent_ids = sorted({student["parent_id"] for student in found if student.get("parent_id")})
+            for parents in chunked(parent_ids, PARENT_DASHBOARD_CHUNK_SIZE):
+                families = (
+                    supabase.table("students")
+                    .select(DASHBOARD_STUDENT_COLUMNS)
+                    .in_("parent_id", parents)
+                    .execute()
+                    .data or []
+                )
+                written += len(_materialize(families, month))
+            gone = set(batch) - {student["id_number"] for student in found}
+            if gone:
+                supabase.table("parent_dashboard").delete(returning=ReturnMethod.minimal).in_("student_id", sorted(gone)).eq("month", month).execute()
+    except Exception as e:
+        logger.error(f"❌ Error refreshing parent dashboard for {len(wanted)} learner(s) ({month}): {e}")
+    return written
+
+def refresh_parent_dashboard_for_grade(grade_level: str, month: str = None) -> int:
+    """Refresh every learner whose grade matches grade_level (after a fee change). Returns rows written."""
+    try:
+        students = fetch_all_rows(lambda: supabase.table("students").select("id_number, grade_applied_for").order("id"))
+    except Exception as e:
+        logger.error(f"❌ Error loading learners in {grade_level} for a dashboard refresh: {e}")
+        return 0
+    grade_key = normalize_grade(grade_level)
+    student_ids = [s["id_number"] for s in students if normalize_grade(s.get("grade_applied_for") or "") == grade_key]
+    return refresh_parent_dashboard(student_ids, month)
+
+def refresh_parent_dashboard_for_grade_in_background(grade_level: str, month: str = None) -> Future:
+    """Queue refresh_parent_dashboard_for_grade on the background refresh thread; returns its future."""
+    return _grade_refresh_pool.submit(refresh_parent_dashboard_for_grade, grade_level, month)
+
+def rebuild_parent_dashboard(month: str = None) -> dict:
+    """
+    Recompute every learner's read-model row for month (default: current) and delete rows of
+    learners that no longer exist. Idempotent; use it for backfills and after bulk changes.
+
+    Returns:
+        {"month", "students", "rows", "deleted", "seconds"}
+    """
+    started = time.perf_counter()
+    month = month or get_current_month_str()
+    students = fetch_all_rows(lambda: supabase.table("students").select(DASHBOARD_STUDENT_COLUMNS).order("id"))
+    learners = _materialize(students, month)
+
+    current = {learner["student_id"] for learner in learners}
+    existing = fetch_all_rows(
+        lambda: supabase.table("parent_dashboard").select("student_id").eq("month", month).order("student_id")
+    )
+    stale = sorted({row["student_id"] for row in existing} - current)
+    for batch in chunked(stale, PARENT_DASHBOARD_CHUNK_SIZE):
+        supabase.table("parent_dashboard").delete(returning=ReturnMethod.minimal).in_("student_id", batch).eq("month", month).execute()
+
+    report = {
+        "month": month,
+        "students": len(students),
+        "rows": len(learners),
+        "deleted": len(stale),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    logger.info(f"✅ Parent dashboard rebuilt for {month}: {len(learners)} rows, {len(stale)} stale row(s) deleted in {report['seconds']}s")
+    return report
+
+def _students_of_parent(parent_id_number: str) -> list:
+    return (
+        supabase.table("students")
+        .select(DASHBOARD_STUDENT_COLUMNS)
+        .eq("parent_id", parent_id_number)
+        .order("id_number")
+        .execute()
+        .data or []
+    )
+
+def _materialize_parent(parent_id_number: str, month: str) -> dict:
+    """Read-model miss: compute the parent's learners from the source tables and store them"""
+    students = _students_of_parent(parent_id_number)
+    if not students:
+        logger.warning(f"⚠️ No students found for parent {parent_id_number}")
+        return None
+    logger.debug(f"🧮 Materializing dashboard for parent {parent_id_number} ({month}): {len(students)} students")
+    return _summarize_dashboard(_materialize(students, month), month)
+
 def get_parent_dashboard(parent_id_number: str) -> dict:
     """
     Get comprehensive dashboard data for a parent.
-    Aggregates data from students, fees, payments, and schedules.
+    One indexed read of the parent_dashboard read model for the current month.
     """
     try:
-        print(f"📊 [get_parent_dashboard] Fetching dashboard for parent: {parent_id_number}")
-        
-        # Get all students for this parent
-        students_response = get_students_by_parent_id(parent_id_number)
-        
-        if not students_response or len(students_response) == 0:
-            print(f"⚠️ No students found for parent {parent_id_number}")
-            return None
-        
-        print(f"✅ Found {len(students_response)} students")
-        
+        logger.debug(f"📊 [get_parent_dashboard] Fetching dashboard for parent: {parent_id_number}")
         current_month = get_current_month_str()
-        learners = []
-        total_monthly_fees = 0
-        total_paid_this_month = 0
-        total_outstanding = 0
-        
-        # Process each student
-        for student in students_response:
-            student_id = student.get("id_number") or student.get("student_id")
-            grade = student.get("grade_applied_for") or "N/A"
-            
-            print(f"  📚 Processing student: {student.get('first_name')} {student.get('surname')} ({grade})")
-            
-            # Get fee structure from FEES table
-            fee_info = get_fee_by_grade(grade)
-            if not fee_info:
-                print(f"  ⚠️ No fee structure found for grade {grade}, using default")
-                monthly_fee = 4500.00
-                fee_breakdown = {
-                    "tuition_fees": 2700.00,
-                    "activity_fees": 900.00,
-                    "facility_fees": 630.00,
-                    "other_fees": 360.00
-                }
-            else:
-                monthly_fee = fee_info.get("total_monthly_fee", 4500.00)
-                fee_breakdown = {
-                    "tuition_fees": fee_info.get("tuition_fees", 0),
-                    "activity_fees": fee_info.get("activity_fees", 0),
-                    "facility_fees": fee_info.get("facility_fees", 0),
-                    "other_fees": fee_info.get("other_fees", 0)
-                }
-            
-            # Get payments for this student this month
-            paid_this_month = get_total_paid_by_student_month(student_id, current_month)
-            outstanding_amount = max(0, monthly_fee - paid_this_month)
-            
-            # Get next payment schedule
-            schedule = get_schedule_by_student_month(student_id, current_month)
-            if schedule:
-                next_payment_date = schedule.get("due_date", "")
-            else:
-                # Default to 15th of next month if no schedule exists
-                from datetime import date, timedelta
-                today = date.today()
-                if today.day > 15:
-                    next_date = date(today.year, today.month, 15) + timedelta(days=30)
-                else:
-                    next_date = date(today.year, today.month, 15)
-                next_payment_date = next_date.isoformat()
-            
-            # Check facility status
-            facility_linked = is_facility_linked(student_id)
-            
-            # Determine payment status
-            payment_status = calculate_payment_status(paid_this_month, monthly_fee)
-            
-            # Build learner object
-            learner = {
-                "id": student.get("application_id") or student_id,
-                "first_name": student.get("first_name", ""),
-                "surname": student.get("surname", ""),
-                "student_id": student_id,
-                "grade": grade,
-                "monthly_fee": monthly_fee,
-                "paid_this_month": paid_this_month,
-                "outstanding_amount": outstanding_amount,
-                "next_payment_date": next_payment_date,
-                "facility_linked": facility_linked,
-                "payment_status": payment_status
-            }
-            
-            learners.append(learner)
-            total_monthly_fees += monthly_fee
-            total_paid_this_month += paid_this_month
-            total_outstanding += outstanding_amount
-            
-            print(f"    ✓ Fee: R{monthly_fee:.2f} | Paid: R{paid_this_month:.2f} | Outstanding: R{outstanding_amount:.2f}")
-        
-        # Get overall fee breakdown (average across all students)
-        if learners:
-            avg_fee_breakdown = {
-                "tuition_fees": (total_monthly_fees * 0.6) / len(learners) * len(learners),
-                "activity_fees": (total_monthly_fees * 0.18) / len(learners) * len(learners),
-                "facility_fees": (total_monthly_fees * 0.14) / len(learners) * len(learners),
-                "other_fees": (total_monthly_fees * 0.08) / len(learners) * len(learners)
-            }
-        else:
-            avg_fee_breakdown = {
-                "tuition_fees": 0,
-                "activity_fees": 0,
-                "facility_fees": 0,
-                "other_fees": 0
-            }
-        
-        dashboard_data = {
-            "total_learners": len(learners),
-            "total_monthly_fees": total_monthly_fees,
-            "total_paid_this_month": total_paid_this_month,
-            "outstanding_amount": total_outstanding,
-            "learners": learners,
-            "fee_breakdown": avg_fee_breakdown,
-            "current_month": current_month,
-            "generated_at": datetime.now().isoformat()
-        }
+        response = (
+            supabase.table("parent_dashboard")
+            .select(PARENT_DASHBOARD_COLUMNS)
+            .eq("parent_id_number", parent_id_number)
+            .eq("month", current_month)
+            .order("student_id")
+            .execute()
+        )
+        if not response.data:
+            return _materialize_parent(parent_id_number, current_month)
+        return _summarize_dashboard([_from_read_model_row(row) for row in response.data], current_month)
         
-        print(f"✅ Dashboard ready: {len(learners)} learners, Total fees: R{total_monthly_fees:.2f}, Outstanding: R{total_outstanding:.2f}\n")
-        return dashboard_data
+    except Exception as e:
+        logger.exception(f"❌ Error generating dashboard: {e}")
+        return None
+
+async def get_parent_dashboard_async(parent_id_number: str) -> dict:
+    """
+    Async version of get_parent_dashboard.
+    A read-model miss is materialized in a worker thread.
+    """
+    try:
+        logger.debug(f"📊 [get_parent_dashboard_async] Fetching dashboard for parent: {parent_id_number}")
+        current_month = get_current_month_str()
+        client = await get_async_supabase_client()
+        response = await (
+            client.table("parent_dashboard")
+            .select(PARENT_DASHBOARD_COLUMNS)
+            .eq("parent_id_number", parent_id_number)
+            .eq("month", current_month)
+            .order("student_id")
+            .execute()
+        )
+        if not response.data:
+            return await asyncio.to_thread(_materialize_parent, parent_id_number, current_month)
+        return _summarize_dashboard([_from_read_model_row(row) for row in response.data], current_month)
         
     except Exception as e:
-        print(f"❌ Error generating dashboard: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Error generating dashboard: {e}")
         return None
@@ -1,9 +1,18 @@
 import logging
 from core.supabase_client import supabase
+from core.projections import Projection
 from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+# Column projections: full declaration rows, and the slim variant for status checks
+DECLARATION_COLUMNS = Projection(
+    "id", "application_id", "agree_truth", "agree_policies", "agree_financial", "agree_verification",
+    "agree_data_processing", "agree_audit_storage", "agree_affordability_processing",
+    "full_name", "city", "status", "signed", "date_signed", "created_at", "updated_at",
+)
+DECLARATION_STATUS_COLUMNS = Projection("id", "application_id", "status", "signed", "date_signed")
+
 
 class DeclarationService:
     """Service for managing student declarations in the database."""
@@ -56,13 +65,6 @@ class DeclarationService:
             if not full_name or len(full_name.strip()) < 3:
                 raise ValueError("full_name must be at least 3 characters long")
             
-            # Check if declaration already exists for this application
-            logger.info(f"Checking for existing declaration for application_id: {application_id}")
-            
-            existing = self.supabase.table("declarations").select("*").eq(
-                "application_id", application_id
-            ).execute()
-            
             declaration_data = {
                 "application_id": application_id,
                 "agree_truth": agree_truth,
@@ -78,32 +80,16 @@ class DeclarationService:
                 "signed": True,
             }
             
-            if existing.data and len(existing.data) > 0:
-                # Update existing declaration
-                logger.info(f"Updating existing declaration for application_id: {application_id}")
-                
-                response = self.supabase.table("declarations").update(
-                    declaration_data
-                ).eq("application_id", application_id).execute()
-                
-                if not response.data:
-                    raise Exception("Failed to update declaration")
-                
-                logger.info(f"Declaration updated successfully for application_id: {application_id}")
-                return response.data[0]
-            else:
-                # Create new declaration
-                logger.info(f"Creating new declaration for application_id: {application_id}")
-                
-                response = self.supabase.table("declarations").insert(
-                    declaration_data
-                ).execute()
-                
-                if not response.data:
-                    raise Exception("Failed to create declaration")
-                
-                logger.info(f"Declaration created successfully for application_id: {application_id}")
-                return response.data[0]
+            # Insert or update in one atomic statement (declarations.application_id is unique)
+            response = self.supabase.table("declarations").upsert(
+                declaration_data, on_conflict="application_id"
+            ).execute()
+            
+            if not response.data:
+                raise Exception("Failed to save declaration")
+            
+            logger.info(f"Declaration saved successfully for application_id: {application_id}")
+            return response.data[0]
         
         except ValueError as e:
             logger.warning(f"Validation error in save_declaration: {str(e)}")
@@ -112,12 +98,13 @@ class DeclarationService:
             logger.error(f"Error saving declaration for application_id {application_id}: {str(e)}", exc_info=True)
             raise
     
-    def get_declaration(self, application_id: str) -> Optional[Dict[str, Any]]:
+    def get_declaration(self, application_id: str, columns: Projection = DECLARATION_COLUMNS) -> Optional[Dict[str, Any]]:
         """
         Fetch declaration record for an application.
         
         Args:
             application_id: UUID of the application
+            columns: Columns to return (DECLARATION_STATUS_COLUMNS for the slim variant)
         
         Returns:
             Dictionary containing the declaration record, or None if not found
@@ -125,7 +112,7 @@ class DeclarationService:
         try:
             logger.info(f"Fetching declaration for application_id: {application_id}")
             
-            response = self.supabase.table("declarations").select("*").eq(
+            response = self.supabase.table("declarations").select(columns).eq(
                 "application_id", application_id
             ).execute()
             
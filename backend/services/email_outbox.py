@@ -0,0 +1,203 @@
+"""
+Email Outbox - persisted background delivery for transactional emails.
+
+Request handlers call enqueue_email(), which writes the message to a local SQLite outbox and
+returns immediately. EMAIL_WORKER_CONCURRENCY asyncio workers (started in the app lifespan)
+claim due messages and send them through the shared SendGrid client, retrying failures with
+exponential backoff. Messages survive restarts: anything pending, or stuck "sending" when a
+process died, is picked up again.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+EMAIL_OUTBOX_PATH = os.getenv("EMAIL_OUTBOX_PATH", os.path.join(os.path.dirname(os.path.dirname(__file__)), "email_outbox.sqlite3"))
+EMAIL_WORKER_CONCURRENCY = int(os.getenv("EMAIL_WORKER_CONCURRENCY", "4"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "5"))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "900"))
+EMAIL_POLL_SECONDS = float(os.getenv("EMAIL_POLL_SECONDS", "5"))
+# A "sending" row older than this is assumed orphaned by a crashed worker and is retried
+EMAIL_SEND_TIMEOUT_SECONDS = float(os.getenv("EMAIL_SEND_TIMEOUT_SECONDS", "300"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    to_email TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    html_content TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    locked_at REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON email_outbox (status, next_attempt_at);
+"""
+
+
+class PermanentEmailError(Exception):
+    """Delivery failed in a way retrying will not fix (e.g. SendGrid rejected the payload)."""
+
+
+class EmailOutbox:
+    def __init__(self, path: str = EMAIL_OUTBOX_PATH, concurrency: int = EMAIL_WORKER_CONCURRENCY):
+        self.path = path
+        self.concurrency = concurrency
+        self._local = threading.local()
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers = []
+
+    # ---- storage ----------------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; WAL so enqueues never wait on a worker's claim."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(_SCHEMA)
+                    self._schema_ready = True
+        return conn
+
+    def enqueue(self, to_email: str, subject: str, html_content: str) -> int:
+        """Persist a message for background delivery and wake a worker. Returns the outbox id."""
+        if not to_email:
+            raise ValueError("Recipient email is required")
+        now = time.time()
+        cursor = self._connect().execute(
+            "INSERT INTO email_outbox (to_email, subject, html_content, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)",
+            (to_email, subject, html_content, now, now),
+        )
+        logger.debug(f"📧 Queued email #{cursor.lastrowid} to {to_email}: {subject}")
+        self._notify()
+        return cursor.lastrowid
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Atomically take the oldest due message (safe across worker processes sharing the file)."""
+        now = time.time()
+        return self._connect().execute(
+            """
+            UPDATE email_outbox SET status = 'sending', locked_at = ?, attempts = attempts + 1
+            WHERE id = (
+                SELECT id FROM email_outbox
+                WHERE (status = 'pending' AND next_attempt_at <= ?)
+                   OR (status = 'sending' AND locked_at < ?)
+                ORDER BY next_attempt_at LIMIT 1
+            )
+            RETURNING id, to_email, subject, html_content, attempts
+            """,
+            (now, now, now - EMAIL_SEND_TIMEOUT_SECONDS),
+        ).fetchone()
+
+    def _mark_sent(self, message_id: int) -> None:
+        self._connect().execute(
+            "UPDATE email_outbox SET status = 'sent', sent_at = ?, locked_at = NULL, last_error = NULL WHERE id = ?",
+            (time.time(), message_id),
+        )
+
+    def _mark_failed(self, message_id: int, attempts: int, error: str, permanent: bool) -> None:
+        if permanent or attempts >= EMAIL_MAX_ATTEMPTS:
+            self._connect().execute(
+                "UPDATE email_outbox SET status = 'failed', locked_at = NULL, last_error = ? WHERE id = ?",
+                (error, message_id),
+            )
+            logger.error(f"❌ Email #{message_id} failed permanently after {attempts} attempt(s): {error}")
+            return
+        delay = min(EMAIL_RETRY_MAX_SECONDS, EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+        self._connect().execute(
+            "UPDATE email_outbox SET status = 'pending', locked_at = NULL, last_error = ?, next_attempt_at = ? WHERE id = ?",
+            (error, time.time() + delay, message_id),
+        )
+        logger.warning(f"⚠️ Email #{message_id} attempt {attempts} failed, retrying in {delay:.0f}s: {error}")
+
+    def stats(self) -> dict:
+        """Message counts by status, for health checks."""
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM email_outbox GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    # ---- delivery ---------------------------------------------------------------------------
+
+    def deliver_one(self) -> bool:
+        """Claim and send one due message. Returns False when nothing is due."""
+        from services.email_service import deliver_email
+
+        message = self._claim()
+        if message is None:
+            return False
+        try:
+            deliver_email(message["to_email"], message["subject"], message["html_content"])
+        except PermanentEmailError as e:
+            self._mark_failed(message["id"], message["attempts"], str(e), permanent=True)
+        except Exception as e:
+            self._mark_failed(message["id"], message["attempts"], f"{type(e).__name__}: {e}", permanent=False)
+        else:
+            self._mark_sent(message["id"])
+            logger.info(f"✅ Email #{message['id']} sent to {message['to_email']}")
+        return True
+
+    def _notify(self) -> None:
+        loop, wakeup = self._loop, self._wakeup
+        if loop is not None and wakeup is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wakeup.set)
+
+    async def _worker(self) -> None:
+        while True:
+            # Clear before looking for work: an enqueue during the claim then leaves the event
+            # set, so the wait below returns at once instead of sleeping out the poll interval
+            self._wakeup.clear()
+            try:
+                # SQLite and the SendGrid client are blocking, so each send runs in a thread;
+                # the number of workers bounds concurrent sends
+                if await asyncio.to_thread(self.deliver_one):
+                    continue
+            except Exception as e:
+                logger.error(f"❌ Email worker error: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=EMAIL_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """Start the delivery workers on the running event loop."""
+        if self._workers:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        logger.info(f"📧 Email outbox started with {self.concurrency} worker(s): {self.path}")
+
+    async def stop(self) -> None:
+        """Stop the workers; undelivered messages stay in the outbox for the next start."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._loop = None
+        self._wakeup = None
+
+
+# Global outbox instance
+email_outbox = EmailOutbox()
+
+
+def enqueue_email(to_email: str, subject: str, html_content: str) -> int:
+    """Queue an email on the global outbox"""
+    return email_outbox.enqueue(to_email, subject, html_content)
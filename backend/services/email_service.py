@@ -1,21 +1,46 @@
+import logging
 import os
+import threading
+from typing import Optional
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
+from python_http_client.exceptions import HTTPError
 from dotenv import load_dotenv
+from services.email_outbox import enqueue_email, PermanentEmailError
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
 FROM_EMAIL = os.getenv("FROM_EMAIL")
+# Point at a local stub of the SendGrid API for tests/benchmarks
+SENDGRID_API_HOST = os.getenv("SENDGRID_API_HOST", "https://api.sendgrid.com")
+# Per-request timeout; must stay well below EMAIL_SEND_TIMEOUT_SECONDS, after which the outbox
+# assumes a "sending" message was orphaned and hands it to another worker
+SENDGRID_TIMEOUT_SECONDS = float(os.getenv("SENDGRID_TIMEOUT_SECONDS", "30"))
 
-def send_account_created_email(to_email: str, user_name: str):
-    subject = "Your Account Has Been Created"
-    html_content = f"""
-    <h2>Hello {user_name},</h2>
-    <p>Your account has been created successfully.</p>
-    <p>You can now log in using your email and password.</p>
-    <br/>
-    <p>Thank you,<br/>Your Application Team</p>
+_sendgrid_client = None
+_sendgrid_client_lock = threading.Lock()
+
+
+def get_sendgrid_client() -> SendGridAPIClient:
+    """Shared SendGrid client, built once instead of per email"""
+    global _sendgrid_client
+    if _sendgrid_client is None:
+        with _sendgrid_client_lock:
+            if _sendgrid_client is None:
+                client = SendGridAPIClient(SENDGRID_API_KEY, host=SENDGRID_API_HOST)
+                # SendGridAPIClient has no timeout argument; the HTTP client passes this to every request
+                client.client.timeout = SENDGRID_TIMEOUT_SECONDS
+                _sendgrid_client = client
+    return _sendgrid_client
+
+
+def deliver_email(to_email: str, subject: str, html_content: str):
+    """
+    Send one email now via SendGrid. Used by the outbox workers.
+    Raises PermanentEmailError for rejections that retrying won't fix (4xx other than 429).
     """
     message = Mail(
         from_email=FROM_EMAIL,
@@ -24,16 +49,37 @@ def send_account_created_email(to_email: str, user_name: str):
         html_content=html_content
     )
     try:
-        sg = SendGridAPIClient(SENDGRID_API_KEY)
-        response = sg.send(message)
-        print(f"Email sent: {response.status_code}")
-    except Exception as e:
-        print(f"Error sending email: {e}")
-        raise e
+        response = get_sendgrid_client().send(message)
+    except HTTPError as e:
+        status_code = getattr(e, "status_code", None)
+        if status_code and 400 <= status_code < 500 and status_code != 429:
+            raise PermanentEmailError(f"SendGrid rejected email ({status_code}): {getattr(e, 'body', e)}") from e
+        raise
+    logger.debug(f"Email sent to {to_email}: {response.status_code}")
+    return response
+
+
+def build_account_created_email(user_name: str) -> tuple:
+    """(subject, html_content) for the account created email"""
+    subject = "Your Account Has Been Created"
+    html_content = f"""
+    <h2>Hello {user_name},</h2>
+    <p>Your account has been created successfully.</p>
+    <p>You can now log in using your email and password.</p>
+    <br/>
+    <p>Thank you,<br/>Your Application Team</p>
+    """
+    return subject, html_content
+
 
+def send_account_created_email(to_email: str, user_name: str) -> int:
+    """Queue the account created email for background delivery. Returns the outbox id."""
+    subject, html_content = build_account_created_email(user_name)
+    return enqueue_email(to_email, subject, html_content)
 
-def send_registration_completion_email(to_email: str, parent_name: str, student_names: list, selected_plan: str):
-    """Send confirmation email after successful re-registration"""
+
+def build_registration_completion_email(parent_name: str, student_names: list, selected_plan: str) -> tuple:
+    """(subject, html_content) for the re-registration confirmation email"""
     student_list = ", ".join(student_names)
     subject = "Student Re-Registration Confirmation 2024"
     html_content = f"""
@@ -60,22 +106,19 @@ def send_registration_completion_email(to_email: str, parent_name: str, student_
     <br/>
     <p>Thank you,<br/>School Admissions Team</p>
     """
-    message = Mail(
-        from_email=FROM_EMAIL,
-        to_emails=to_email,
-        subject=subject,
-        html_content=html_content
-    )
+    return subject, html_content
+
+
+def send_registration_completion_email(to_email: str, parent_name: str, student_names: list, selected_plan: str) -> Optional[int]:
+    """
+    Queue the confirmation email sent after successful re-registration.
+    Returns the outbox id, or None if it could not be queued.
+    """
+    subject, html_content = build_registration_completion_email(parent_name, student_names, selected_plan)
     try:
-        sg = SendGridAPIClient(SENDGRID_API_KEY)
-        response = sg.send(message)
-        print(f"✅ Registration completion email sent to {to_email}: {response.status_code}")
-        return True
+        return enqueue_email(to_email, subject, html_content)
     except Exception as e:
-        print(f"❌ Error sending registration email: {type(e).__name__}: {str(e)}")
         # Log the error but don't fail - email is optional for registration to complete
-        print(f"📧 Email service error (non-blocking): {str(e)}")
-        print(f"📧 Email was intended for: {to_email}")
-        print(f"📧 Subject: {subject}")
-        # Return True anyway to not block registration
-        return True
+        logger.error(f"❌ Error queueing registration email (non-blocking): {type(e).__name__}: {str(e)}",
+                     extra={"to_email": to_email, "subject": subject})
+        return None
@@ -1,8 +1,24 @@
 """
 Service layer for facility linking management
 """
+import logging
 from datetime import datetime
 from core.supabase_client import supabase
+from core.projections import Projection
+
+logger = logging.getLogger(__name__)
+
+# Column projections: full facility rows, and the slim variant for link checks
+FACILITY_ROW_COLUMNS = Projection(
+    "id", "student_id", "application_id", "parent_id_number", "facility_name",
+    "is_linked", "linked_date", "status", "created_at", "updated_at",
+)
+FACILITY_LINK_COLUMNS = Projection("student_id", "is_linked")
+
+def _refresh_dashboard(facilities: list) -> None:
+    """Recompute the current-month read-model rows of the learners whose facility rows changed"""
+    from services.dashboard_service import refresh_parent_dashboard  # imports this module
+    refresh_parent_dashboard([facility.get("student_id") for facility in facilities])
 
 def link_facility_to_student(facility_data: dict) -> dict:
     """
@@ -13,20 +29,21 @@ def link_facility_to_student(facility_data: dict) -> dict:
     try:
         response = supabase.table("facility_linking").insert(facility_data).execute()
         if response.data:
+            _refresh_dashboard(response.data)
             return response.data[0]
         return None
     except Exception as e:
-        print(f"❌ Error linking facility: {e}")
+        logger.error(f"❌ Error linking facility: {e}")
         return None
 
-def get_facility_by_student(student_id: str) -> dict:
+def get_facility_by_student(student_id: str, columns: Projection = FACILITY_ROW_COLUMNS) -> dict:
     """
     Get facility linking status for a student.
     """
     try:
         response = (
             supabase.table("facility_linking")
-            .select("*")
+            .select(columns)
             .eq("student_id", student_id)
             .order("created_at", desc=True)
             .limit(1)
@@ -36,23 +53,23 @@ def get_facility_by_student(student_id: str) -> dict:
             return response.data[0]
         return None
     except Exception as e:
-        print(f"❌ Error fetching facility for student: {e}")
+        logger.error(f"❌ Error fetching facility for student: {e}")
         return None
 
-def get_all_facilities_by_parent(parent_id_number: str) -> list:
+def get_all_facilities_by_parent(parent_id_number: str, columns: Projection = FACILITY_ROW_COLUMNS) -> list:
     """
     Get all facilities linked to a parent's students.
     """
     try:
         response = (
             supabase.table("facility_linking")
-            .select("*")
+            .select(columns)
             .eq("parent_id_number", parent_id_number)
             .execute()
         )
         return response.data or []
     except Exception as e:
-        print(f"❌ Error fetching parent facilities: {e}")
+        logger.error(f"❌ Error fetching parent facilities: {e}")
         return []
 
 def is_facility_linked(student_id: str) -> bool:
@@ -60,12 +77,49 @@ def is_facility_linked(student_id: str) -> bool:
     Check if a student has a linked facility.
     """
     try:
-        facility = get_facility_by_student(student_id)
+        facility = get_facility_by_student(student_id, FACILITY_LINK_COLUMNS)
         return facility is not None and facility.get("is_linked", False)
     except Exception as e:
-        print(f"❌ Error checking facility link: {e}")
+        logger.error(f"❌ Error checking facility link: {e}")
         return False
 
+def get_facility_links_by_students(student_ids: list) -> dict:
+    """
+    Check facility linking for several students with a single query.
+    Uses the most recent facility_linking row per student, like is_facility_linked.
+    Returns a dict of student_id -> bool for every requested student.
+    """
+    try:
+        return fetch_facility_links_by_students(student_ids)
+    except Exception as e:
+        logger.error(f"❌ Error checking facility links for students: {e}")
+        return {student_id: False for student_id in student_ids if student_id}
+
+def fetch_facility_links_by_students(student_ids: list) -> dict:
+    """Like get_facility_links_by_students, but raises on database errors"""
+    linked = {student_id: False for student_id in student_ids if student_id}
+    if not linked:
+        return linked
+    response = (
+        supabase.table("facility_linking")
+        .select(FACILITY_LINK_COLUMNS)
+        .in_("student_id", list(linked))
+        .order("created_at", desc=True)
+        .execute()
+    )
+    return _latest_link_by_student(response.data, linked)
+
+def _latest_link_by_student(facilities: list, linked: dict) -> dict:
+    """Fill linked from facility rows ordered newest first, keeping only the latest row per student"""
+    seen = set()
+    for facility in facilities or []:
+        student_id = facility.get("student_id")
+        if student_id in seen or student_id not in linked:
+            continue
+        seen.add(student_id)
+        linked[student_id] = bool(facility.get("is_linked", False))
+    return linked
+
 def update_facility_status(facility_id: int, status: str) -> dict:
     """
     Update facility status.
@@ -82,10 +136,11 @@ def update_facility_status(facility_id: int, status: str) -> dict:
             .execute()
         )
         if response.data:
+            _refresh_dashboard(response.data)
             return response.data[0]
         return None
     except Exception as e:
-        print(f"❌ Error updating facility status: {e}")
+        logger.error(f"❌ Error updating facility status: {e}")
         return None
 
 def unlink_facility(facility_id: int) -> bool:
@@ -103,7 +158,8 @@ def unlink_facility(facility_id: int) -> bool:
             .eq("id", facility_id)
             .execute()
         )
+        _refresh_dashboard(response.data or [])
         return response.data is not None
     except Exception as e:
-        print(f"❌ Error unlinking facility: {e}")
+        logger.error(f"❌ Error unlinking facility: {e}")
         return False
@@ -1,7 +1,63 @@
 """
 Service layer for fees management
 """
+import logging
+import os
 from core.supabase_client import supabase
+from core.cache import TTLCache
+from core.grades import normalize_grade
+
+logger = logging.getLogger(__name__)
+
+# Fee rows change about once a year, so the whole active table is cached in memory
+FEE_CACHE_TTL_SECONDS = int(os.getenv("FEE_CACHE_TTL_SECONDS", "3600"))
+_ACTIVE_FEES_KEY = "active_fees"
+_fee_cache = TTLCache(ttl_seconds=FEE_CACHE_TTL_SECONDS)
+
+def _format_fee(fee: dict) -> dict:
+    """Convert a raw fees row into the numeric fee structure used by callers"""
+    return {
+        "id": fee["id"],
+        "grade_level": fee["grade_level"],
+        "tuition_fees": float(fee["tuition_fees"]),
+        "activity_fees": float(fee["activity_fees"]),
+        "facility_fees": float(fee["facility_fees"]),
+        "other_fees": float(fee["other_fees"]),
+        "total_monthly_fee": float(fee["total_monthly_fee"]),
+        "effective_date": fee["effective_date"]
+    }
+
+def _build_fee_table(rows: list) -> dict:
+    """
+    Index active fee rows by normalize_grade(grade_level) so "12", "grade 12" and "Grade 12"
+    share one entry. Keeps the first active row per grade.
+    """
+    by_grade = {}
+    for fee in rows:
+        by_grade.setdefault(normalize_grade(fee["grade_level"]), _format_fee(fee))
+    return {"rows": rows, "by_grade": by_grade}
+
+def _get_fee_table() -> dict:
+    """Read-through cache over the active fees table. Raises on database errors."""
+    def _load():
+        response = supabase.table("fees").select("*").eq("is_active", True).execute()
+        return _build_fee_table(response.data) if response.data else None
+    return _fee_cache.get_or_load(_ACTIVE_FEES_KEY, _load) or _build_fee_table([])
+
+def _lookup_fees(fee_table: dict, grade_levels: list) -> dict:
+    """Map each requested grade (as given) to its cached fee structure, omitting unknown grades"""
+    fees = {}
+    for grade_level in grade_levels:
+        if not grade_level:
+            continue
+        fee = fee_table["by_grade"].get(normalize_grade(grade_level))
+        if fee:
+            fees[grade_level] = fee
+    return fees
+
+def invalidate_fee_cache() -> None:
+    """Drop cached fee rows so the next read reloads them from the database"""
+    _fee_cache.invalidate()
 
 def get_fee_by_grade(grade_level: str) -> dict:
     """
@@ -9,40 +65,44 @@ def get_fee_by_grade(grade_level: str) -> dict:
     Returns None if not found.
     """
     try:
-        response = supabase.table("fees").select("*").eq("grade_level", grade_level).eq("is_active", True).execute()
-        if response.data and len(response.data) > 0:
-            fee = response.data[0]
-            return {
-                "id": fee["id"],
-                "grade_level": fee["grade_level"],
-                "tuition_fees": float(fee["tuition_fees"]),
-                "activity_fees": float(fee["activity_fees"]),
-                "facility_fees": float(fee["facility_fees"]),
-                "other_fees": float(fee["other_fees"]),
-                "total_monthly_fee": float(fee["total_monthly_fee"]),
-                "effective_date": fee["effective_date"]
-            }
-        return None
+        return _get_fee_table()["by_grade"].get(normalize_grade(grade_level))
     except Exception as e:
-        print(f"❌ Error fetching fee for grade {grade_level}: {e}")
+        logger.error(f"❌ Error fetching fee for grade {grade_level}: {e}")
         return None
 
+def get_fees_by_grades(grade_levels: list) -> dict:
+    """
+    Get fee structures for several grade levels at once.
+    Returns a dict keyed by the requested grade_level; grades without an active fee are omitted.
+    """
+    try:
+        return fetch_fees_by_grades(grade_levels)
+    except Exception as e:
+        logger.error(f"❌ Error fetching fees for grades {grade_levels}: {e}")
+        return {}
+
+def fetch_fees_by_grades(grade_levels: list) -> dict:
+    """Like get_fees_by_grades, but raises on database errors"""
+    return _lookup_fees(_get_fee_table(), grade_levels)
+
 def get_all_active_fees() -> list:
     """Get all active fee structures"""
     try:
-        response = supabase.table("fees").select("*").eq("is_active", True).execute()
-        return response.data or []
+        return _get_fee_table()["rows"]
     except Exception as e:
-        print(f"❌ Error fetching all fees: {e}")
+        logger.error(f"❌ Error fetching all fees: {e}")
         return []
 
 def update_fee(grade_level: str, fee_data: dict) -> dict:
     """Update fee structure for a grade level"""
     try:
         response = supabase.table("fees").update(fee_data).eq("grade_level", grade_level).execute()
+        invalidate_fee_cache()
+        from services.dashboard_service import refresh_parent_dashboard_for_grade_in_background  # imports this module
+        refresh_parent_dashboard_for_grade_in_background(grade_level)
         if response.data:
             return response.data[0]
         return None
     except Exception as e:
-        print(f"❌ Error updating fee for {grade_level}: {e}")
+        logger.error(f"❌ Error updating fee for {grade_level}: {e}")
         return None
@@ -0,0 +1,176 @@
+"""
+Grade Promotion Service - school-wide grade promotion for re-registration season.
+
+Every learner's current grade_applied_for becomes their previous_grade and they apply for the
+next grade ("Grade 6" -> previous_grade "Grade 6", grade_applied_for "Grade 7"). The whole
+students table is read in pages, next grades are computed in Python, and learners making the
+same move are updated together: one PATCH ... WHERE id IN (...) per chunk of
+PROMOTION_UPDATE_CHUNK_SIZE ids (PROMOTION_UPDATE_CONCURRENCY at a time), instead of a select
+and two updates per learner.
+
+Each learner is stamped with the academic year they were promoted for (promoted_for_year), and
+learners already stamped for that year are skipped, so the job is safe to rerun - e.g. after
+some chunks failed.
+"""
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from core.supabase_client import supabase, fetch_all_rows, chunked
+from core.projections import Projection
+from core.grades import canonical_grade_label, next_grade, grade_alias_key, GRADE_SEQUENCE
+from services.student_service import clear_student_lists
+from services.dashboard_service import rebuild_parent_dashboard
+
+logger = logging.getLogger(__name__)
+
+# Ids per in_() filter; keeps the PATCH URL well under PostgREST/proxy limits
+PROMOTION_UPDATE_CHUNK_SIZE = int(os.getenv("PROMOTION_UPDATE_CHUNK_SIZE", "200"))
+PROMOTION_UPDATE_CONCURRENCY = int(os.getenv("PROMOTION_UPDATE_CONCURRENCY", "4"))
+PROMOTION_DIFF_LIMIT = int(os.getenv("PROMOTION_DIFF_LIMIT", "100"))
+
+PROMOTION_STUDENT_COLUMNS = Projection(
+    "id", "id_number", "first_name", "surname", "previous_grade", "grade_applied_for", "promoted_for_year",
+)
+
+
+def default_promotion_year() -> int:
+    """Re-registration runs ahead of the year learners are promoted into."""
+    return date.today().year + 1
+
+
+def plan_grade_promotion(students: list) -> Dict:
+    """
+    Work out every learner's move without touching the database.
+
+    Returns:
+        {"moves": {(old grade_applied_for, new previous_grade, new grade_applied_for): [student, ...]},
+         "graduating": [student, ...], "unrecognised": [student, ...]}
+    """
+    moves = defaultdict(list)
+    graduating, unrecognised = [], []
+    for student in students:
+        current = student.get("grade_applied_for")
+        promoted = next_grade(current or "")
+        if promoted is None:
+            if grade_alias_key(current or "") == GRADE_SEQUENCE[-1]:
+                graduating.append(student)
+            else:
+                unrecognised.append(student)
+            continue
+        moves[(current, canonical_grade_label(current), promoted)].append(student)
+    return {"moves": moves, "graduating": graduating, "unrecognised": unrecognised}
+
+
+def _brief(student: dict) -> dict:
+    return {
+        "id_number": student.get("id_number"),
+        "name": f"{student.get('first_name') or ''} {student.get('surname') or ''}".strip(),
+        "grade_applied_for": student.get("grade_applied_for"),
+    }
+
+
+def _apply_move(academic_year: int, current: str, previous_grade: str, promoted: str, ids: list) -> int:
+    """One bulk update for learners making the same move; returns the number of rows changed."""
+    response = (
+        supabase.table("students")
+        .update({"previous_grade": previous_grade, "grade_applied_for": promoted, "promoted_for_year": academic_year})
+        .in_("id", ids)
+        .eq("grade_applied_for", current)
+        .filter("promoted_for_year", "isdistinct", str(academic_year))
+        .execute()
+    )
+    return len(response.data or [])
+
+
+def _try_move(batch: tuple) -> Optional[int]:
+    """_apply_move, logging failures (None) so the other chunks still run; a rerun picks them up."""
+    try:
+        return _apply_move(*batch)
+    except Exception as e:
+        logger.error(f"❌ Grade promotion chunk {batch[1]} -> {batch[3]} ({len(batch[4])} learners) failed: {e}")
+        return None
+
+
+def promote_all_students(
+    dry_run: bool = True,
+    diff_limit: Optional[int] = PROMOTION_DIFF_LIMIT,
+    academic_year: Optional[int] = None,
+) -> Dict:
+    """
+    Promote every learner one grade into academic_year (default: next year). Final-grade
+    learners and unrecognised grade labels are left untouched and reported.
+
+    Each chunked update is guarded with grade_applied_for = <value we read> and
+    promoted_for_year IS DISTINCT FROM academic_year, so a learner edited after the read is not
+    promoted from a stale grade and nobody is promoted twice for the same year. Failed chunks
+    are counted in failed_updates; rerun the job to finish them.
+
+    Returns:
+        {"dry_run", "academic_year", "students", "already_promoted", "promoted", "graduating",
+         "unrecognised", "transitions", "updates", "failed_updates", "diff", "seconds"}
+    """
+    started = time.perf_counter()
+    academic_year = academic_year or default_promotion_year()
+    students = fetch_all_rows(lambda: supabase.table("students").select(PROMOTION_STUDENT_COLUMNS).order("id"))
+    pending = [s for s in students if str(s.get("promoted_for_year")) != str(academic_year)]
+    plan = plan_grade_promotion(pending)
+
+    transitions = {}
+    diff = []
+    for (current, previous_grade, promoted), movers in sorted(plan["moves"].items(), key=lambda m: str(m[0])):
+        label = f"{current} -> {promoted}"
+        transitions[label] = len(movers)
+        for student in movers:
+            if diff_limit is None or len(diff) < diff_limit:
+                diff.append({
+                    "id_number": student.get("id_number"),
+                    "from": {"previous_grade": student.get("previous_grade"), "grade_applied_for": current},
+                    "to": {"previous_grade": previous_grade, "grade_applied_for": promoted},
+                })
+
+    promoted_count, updates, failed_updates = 0, 0, 0
+    if not dry_run:
+        batches = [
+            (academic_year, current, previous_grade, promoted, batch)
+            for (current, previous_grade, promoted), movers in plan["moves"].items()
+            for batch in chunked([student["id"] for student in movers], PROMOTION_UPDATE_CHUNK_SIZE)
+        ]
+        with ThreadPoolExecutor(max_workers=max(1, PROMOTION_UPDATE_CONCURRENCY)) as pool:
+            for updated in pool.map(_try_move, batches):
+                if updated is None:
+                    failed_updates += 1
+                    continue
+                promoted_count += updated
+                updates += 1
+        clear_student_lists()
+        # Every learner's grade (and so fee) may have changed
+        rebuild_parent_dashboard()
+    else:
+        promoted_count = sum(len(movers) for movers in plan["moves"].values())
+
+    report = {
+        "dry_run": dry_run,
+        "academic_year": academic_year,
+        "students": len(students),
+        "already_promoted": len(students) - len(pending),
+        "promoted": promoted_count,
+        "graduating": len(plan["graduating"]),
+        "unrecognised": [_brief(s) for s in plan["unrecognised"][:PROMOTION_DIFF_LIMIT]],
+        "transitions": transitions,
+        "updates": updates,
+        "failed_updates": failed_updates,
+        "diff": diff,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    logger.info(f"✅ Grade promotion {'planned' if dry_run else 'applied'} for {academic_year}: "
+                f"{promoted_count}/{len(students)} learners, {report['already_promoted']} already promoted, "
+                f"{len(plan['graduating'])} graduating, {len(plan['unrecognised'])} unrecognised, "
+                f"{updates} update(s) in {report['seconds']}s")
+    if failed_updates:
+        logger.warning(f"⚠️ {failed_updates} grade promotion update(s) failed - rerun the job to finish them")
+    return report
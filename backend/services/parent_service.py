@@ -1,44 +1,45 @@
+import logging
 from core.supabase_client import supabase
-from passlib.context import CryptContext
+from core.logging_config import log_payload
+from core.passwords import hash_password
 from typing import List, Dict
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
 
 
 def create_parent(parent_data: dict) -> Dict:
     """
-    Create a new parent and their linked address.
+    Create a new parent and their linked address in one transaction
+    (create_parent_with_address RPC, a single round-trip).
+    Pass "password" to have it hashed here, or a precomputed "password_hash"
+    (see core.passwords.hash_password_async).
     """
     try:
-        # ✅ Step 1: Insert address
-        address_response = supabase.table("addresses").insert({
+        # ✅ Step 1: Split out the address
+        address = {
             "street_address": parent_data.pop("street_address"),
             "city": parent_data.pop("city"),
             "state": parent_data.pop("state"),
             "postcode": parent_data.pop("postcode"),
-        }).execute()
-
-        if not address_response.data:
-            raise ValueError("Failed to create address")
-
-        address_id = address_response.data[0]["address_id"]
+        }
 
-        # ✅ Step 2: Hash password
-        parent_data["password_hash"] = pwd_context.hash(parent_data.pop("password"))
+        # ✅ Step 2: Hash password (in the password hashing process pool)
+        if "password" in parent_data:
+            parent_data["password_hash"] = hash_password(parent_data.pop("password"))
 
-        # ✅ Step 3: Link address
-        parent_data["address_id"] = address_id
-
-        # ✅ Step 4: Insert parent
-        response = supabase.table("parents").insert(parent_data).execute()
+        # ✅ Step 3: Insert address + parent atomically
+        response = supabase.rpc("create_parent_with_address", {
+            "p_address": address,
+            "p_parent": parent_data,
+        }).execute()
 
         if not response.data:
             raise ValueError("Failed to create parent")
 
-        return response.data[0]
+        return response.data
 
     except Exception as e:
-        print(f"❌ [create_parent] Error: {e}")
+        logger.error(f"❌ [create_parent] Error: {e}")
         raise e
 
 
@@ -47,7 +48,7 @@ def get_parent_children(parent_id: str) -> List[Dict]:
     Fetch all students (children) linked to a parent_id (South African ID number).
     """
     try:
-        print(f"🔍 Fetching students for parent_id={parent_id}")
+        logger.debug(f"🔍 Fetching students for parent_id={parent_id}")
 
         # Include full student contact/address fields so frontend can display/edit them
         students_response = (
@@ -60,13 +61,13 @@ def get_parent_children(parent_id: str) -> List[Dict]:
         )
 
         if not students_response.data:
-            print("⚠️ No students found for this parent.")
+            logger.warning("⚠️ No students found for this parent.")
             return []
 
         return students_response.data
 
     except Exception as e:
-        print(f"❌ [get_parent_children] Error: {e}")
+        logger.error(f"❌ [get_parent_children] Error: {e}")
         raise e
 
 
@@ -75,7 +76,7 @@ def get_parent_by_application_id(application_id: str) -> Dict:
     Fetch parent information by application_id (primary parent from parents table).
     """
     try:
-        print(f"🔍 Fetching parent for application_id={application_id}")
+        logger.debug(f"🔍 Fetching parent for application_id={application_id}")
 
         # Get the primary parent (is_primary=true) for this application
         response = (
@@ -89,14 +90,14 @@ def get_parent_by_application_id(application_id: str) -> Dict:
 
         if response.data and len(response.data) > 0:
             parent = response.data[0]
-            print(f"✅ Parent found: {parent['first_name']} {parent['surname']}")
+            logger.debug(f"✅ Parent found: {parent['first_name']} {parent['surname']}")
             return parent
 
-        print(f"⚠️ No primary parent found for application_id={application_id}")
+        logger.warning(f"⚠️ No primary parent found for application_id={application_id}")
         return None
 
     except Exception as e:
-        print(f"❌ [get_parent_by_application_id] Error: {e}")
+        logger.error(f"❌ [get_parent_by_application_id] Error: {e}")
         raise e
 
 
@@ -112,10 +113,10 @@ def get_parent_by_user_id(user_id: str) -> Dict:
         Parent record or None if not found
     """
     try:
-        print(f"\n🔍 [get_parent_by_user_id] START - Fetching parent for user_id={user_id}")
+        logger.debug(f"🔍 [get_parent_by_user_id] START - Fetching parent for user_id={user_id}")
 
         # Direct lookup: parents table has user_id column now
-        print(f"📌 [get_parent_by_user_id] Querying parents table for user_id={user_id}")
+        logger.debug(f"📌 [get_parent_by_user_id] Querying parents table for user_id={user_id}")
         parent_response = (
             supabase.table("parents")
             .select("id, first_name, surname, email, mobile, relationship, is_primary, application_id, user_id")
@@ -124,18 +125,16 @@ def get_parent_by_user_id(user_id: str) -> Dict:
             .execute()
         )
         
-        print(f"📌 [get_parent_by_user_id] Parent response: {parent_response.data}")
+        log_payload(logger, "📌 [get_parent_by_user_id] Parent response", parent_response.data)
 
         if parent_response.data and len(parent_response.data) > 0:
             parent = parent_response.data[0]
-            print(f"✅ [get_parent_by_user_id] Parent found: {parent['first_name']} {parent['surname']}")
+            logger.debug(f"✅ [get_parent_by_user_id] Parent found: {parent['first_name']} {parent['surname']}")
             return parent
 
-        print(f"⚠️ [get_parent_by_user_id] No parent found for user_id={user_id}")
+        logger.warning(f"⚠️ [get_parent_by_user_id] No parent found for user_id={user_id}")
         return None
 
     except Exception as e:
-        print(f"❌ [get_parent_by_user_id] ERROR: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ [get_parent_by_user_id] ERROR: {e}")
         raise e
@@ -0,0 +1,114 @@
+"""
+Payment Details Service - bank/learner details shown in the Payment Modal.
+
+By student: one get_payment_details RPC (students joined to fee_responsibility in Postgres).
+By application: one fee_responsibility select. Both responses are cached for
+PAYMENT_DETAILS_CACHE_TTL_SECONDS and dropped as soon as bank or plan data is saved for the
+application (or parent) they belong to.
+"""
+import logging
+import os
+from typing import Optional
+
+from core.cache import TTLCache
+from core.supabase_client import supabase
+from services.plan_service import PAYMENT_DETAILS_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_DETAILS_CACHE_TTL_SECONDS = float(os.getenv("PAYMENT_DETAILS_CACHE_TTL_SECONDS", "30"))
+PAYMENT_DETAILS_CACHE_MAXSIZE = int(os.getenv("PAYMENT_DETAILS_CACHE_MAXSIZE", "10000"))
+
+# parent_id_number is read so cached entries can be dropped when the parent's bank account is saved
+FEE_RESPONSIBILITY_BANK_COLUMNS = PAYMENT_DETAILS_COLUMNS.extend("parent_id_number")
+
+# key -> (details, owners): owners are the ("application", id) / ("parent", id_number) whose rows
+# the details were built from, so saves can drop them; they expire and get evicted with the entry
+_cache = TTLCache(PAYMENT_DETAILS_CACHE_TTL_SECONDS, maxsize=PAYMENT_DETAILS_CACHE_MAXSIZE)
+
+
+def _bank_fields(fee_rec: dict) -> dict:
+    parent_first_name = fee_rec.get("parent_first_name") or ""
+    parent_surname = fee_rec.get("parent_surname") or ""
+    return {
+        "account_holder_name": f"{parent_first_name} {parent_surname}".strip() or "Not provided",
+        "bank_name": fee_rec.get("bank_name") or "Not provided",
+        "account_type": fee_rec.get("account_type") or "Cheque",
+        "account_number": fee_rec.get("account_number") or "Not provided",
+        "branch_code": fee_rec.get("branch_code") or "Not provided",
+    }
+
+
+def _remember(key: tuple, value: dict, application_id: Optional[str], parent_id_number: Optional[str]) -> dict:
+    owners = set()
+    if application_id:
+        owners.add(("application", str(application_id)))
+    if parent_id_number:
+        owners.add(("parent", str(parent_id_number)))
+    _cache.set(key, (value, frozenset(owners)))
+    return value
+
+
+def _cached(key: tuple) -> Optional[dict]:
+    entry = _cache.get(key)
+    return entry[0] if entry is not None else None
+
+
+def invalidate_payment_details(application_id: str = None, parent_id_number: str = None) -> None:
+    """Drop cached payment details for an application and/or a parent (call after bank/plan saves)."""
+    owners = []
+    if application_id:
+        owners.append(("application", str(application_id)))
+    if parent_id_number:
+        owners.append(("parent", str(parent_id_number)))
+    if owners:
+        # ("application", id) is also the key of the by-application entry itself
+        _cache.invalidate_where(lambda key, entry: key in owners or not entry[1].isdisjoint(owners))
+
+
+def get_payment_details(student_id: str) -> Optional[dict]:
+    """
+    Payment Modal details for a student, or None if the student doesn't exist.
+    Bank fields fall back to "Not provided" when the application has no fee_responsibility record.
+    """
+    key = ("student", student_id)
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+
+    response = supabase.rpc("get_payment_details", {"p_student_id": student_id}).execute()
+    if not response.data:
+        return None
+    row = response.data[0]
+
+    details = {
+        "student_id": student_id,
+        "student_name": f"{row.get('first_name')} {row.get('surname')}",
+        **_bank_fields(row if row.get("fee_found") else {}),
+    }
+    if row.get("fee_found"):
+        details["application_id"] = row.get("application_id")
+    else:
+        logger.warning(f"⚠️ No fee_responsibility record for student {student_id} (application {row.get('application_id')})")
+    return _remember(key, details, row.get("application_id"), row.get("parent_id_number"))
+
+
+def get_payment_details_by_app(application_id: str) -> Optional[dict]:
+    """Payment Modal bank details for an application, or None without a fee_responsibility record."""
+    key = ("application", application_id)
+    cached = _cached(key)
+    if cached is not None:
+        return cached
+
+    response = (
+        supabase.table("fee_responsibility")
+        .select(FEE_RESPONSIBILITY_BANK_COLUMNS)
+        .eq("application_id", application_id)
+        .limit(1)
+        .execute()
+    )
+    if not response.data:
+        return None
+    fee_rec = response.data[0]
+    details = {"application_id": application_id, **_bank_fields(fee_rec)}
+    return _remember(key, details, application_id, fee_rec.get("parent_id_number"))
@@ -0,0 +1,248 @@
+"""
+Payment Reminder Service - bulk overdue / upcoming payment reminder campaigns.
+
+Recipients are computed with a handful of set-based queries (all due schedule rows, then the
+fee payers and learners for those rows in chunked in_() lookups), grouped per parent, and sent
+with SendGrid personalizations - up to REMINDER_BATCH_SIZE (max 1000) parents per API call.
+"""
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from html import escape
+from typing import Dict, List, Optional
+
+from python_http_client.exceptions import HTTPError
+from core.supabase_client import supabase, fetch_all_rows, chunked
+from core.projections import Projection
+from services.email_service import get_sendgrid_client, FROM_EMAIL
+
+logger = logging.getLogger(__name__)
+
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+REMINDER_BATCH_SIZE = min(int(os.getenv("REMINDER_BATCH_SIZE", "1000")), SENDGRID_MAX_PERSONALIZATIONS)
+REMINDER_SEND_CONCURRENCY = int(os.getenv("REMINDER_SEND_CONCURRENCY", "4"))
+REMINDER_MAX_ATTEMPTS = int(os.getenv("REMINDER_MAX_ATTEMPTS", "3"))
+REMINDER_UPCOMING_DAYS = int(os.getenv("REMINDER_UPCOMING_DAYS", "7"))
+# Optional SendGrid dynamic template; without one the built-in HTML with substitutions is used
+REMINDER_TEMPLATE_ID = os.getenv("SENDGRID_REMINDER_TEMPLATE_ID")
+REMINDER_KINDS = ("overdue", "upcoming")
+_IN_FILTER_CHUNK_SIZE = 200
+
+REMINDER_SCHEDULE_COLUMNS = Projection("id", "parent_id_number", "student_id", "due_date", "amount_due", "month_due", "status")
+REMINDER_PAYER_COLUMNS = Projection("parent_id_number", "parent_email", "parent_first_name", "parent_surname")
+REMINDER_STUDENT_COLUMNS = Projection("id_number", "first_name", "surname")
+
+_SUBJECTS = {
+    "overdue": "Overdue school fees - action required",
+    "upcoming": "Upcoming school fee payment reminder",
+}
+_INTROS = {
+    "overdue": "Our records show the following school fee payments are overdue:",
+    "upcoming": "This is a friendly reminder that the following school fee payments are due soon:",
+}
+_HTML_TEMPLATE = """
+    <h2>Hello -parent_name-,</h2>
+    <p>-intro-</p>
+    -items_html-
+    <p><strong>Total due: R-total_due-</strong></p>
+    <p>If you have already paid, please ignore this reminder.</p>
+    <br/>
+    <p>Thank you,<br/>School Finance Office</p>
+    """
+
+
+def _due_schedules(kind: str, as_of: date, days_ahead: int) -> List[dict]:
+    """Every unpaid schedule row for the campaign, in pages of 1000 (one query per page)."""
+    def build_query():
+        query = supabase.table("payment_schedule").select(REMINDER_SCHEDULE_COLUMNS).neq("status", "paid")
+        if kind == "overdue":
+            query = query.lt("due_date", as_of.isoformat())
+        else:
+            query = query.gte("due_date", as_of.isoformat()).lte("due_date", (as_of + timedelta(days=days_ahead)).isoformat())
+        return query.order("id")
+    return fetch_all_rows(build_query)
+
+
+def _fetch_in(table: str, columns: Projection, column: str, values: list) -> List[dict]:
+    rows = []
+    for batch in chunked(values, _IN_FILTER_CHUNK_SIZE):
+        rows.extend(supabase.table(table).select(columns).in_(column, batch).execute().data or [])
+    return rows
+
+
+def collect_reminder_recipients(kind: str, as_of: date = None, days_ahead: int = REMINDER_UPCOMING_DAYS) -> Dict:
+    """
+    Group due payment_schedule rows by parent and attach contact details and learner names.
+
+    Returns:
+        {"recipients": [{"parent_id_number", "email", "name", "items": [...], "total_due"}],
+         "schedules": n, "skipped": [parents without an email]}
+    """
+    if kind not in REMINDER_KINDS:
+        raise ValueError(f"kind must be one of {', '.join(REMINDER_KINDS)}")
+    as_of = as_of or date.today()
+
+    schedules = _due_schedules(kind, as_of, days_ahead)
+    parent_ids = sorted({s["parent_id_number"] for s in schedules if s.get("parent_id_number")})
+    student_ids = sorted({s["student_id"] for s in schedules if s.get("student_id")})
+
+    payers = {}
+    for payer in _fetch_in("fee_responsibility", REMINDER_PAYER_COLUMNS, "parent_id_number", parent_ids):
+        if payer.get("parent_email"):
+            payers.setdefault(payer["parent_id_number"], payer)
+    names = {
+        s["id_number"]: f"{s.get('first_name') or ''} {s.get('surname') or ''}".strip()
+        for s in _fetch_in("students", REMINDER_STUDENT_COLUMNS, "id_number", student_ids)
+    }
+
+    grouped: Dict[str, dict] = {}
+    skipped: Dict[str, None] = {}  # insertion-ordered set of parents without an email
+    for schedule in schedules:
+        parent_id = schedule.get("parent_id_number")
+        payer = payers.get(parent_id)
+        if payer is None:
+            skipped.setdefault(parent_id)
+            continue
+        recipient = grouped.get(parent_id)
+        if recipient is None:
+            recipient = grouped[parent_id] = {
+                "parent_id_number": parent_id,
+                "email": payer["parent_email"],
+                "name": f"{payer.get('parent_first_name') or ''} {payer.get('parent_surname') or ''}".strip() or "Parent",
+                "items": [],
+                "total_due": 0.0,
+            }
+        amount = float(schedule.get("amount_due") or 0)
+        recipient["items"].append({
+            "student_name": names.get(schedule["student_id"], schedule["student_id"]),
+            "due_date": schedule["due_date"],
+            "month_due": schedule.get("month_due"),
+            "amount_due": amount,
+            "status": schedule.get("status"),
+        })
+        recipient["total_due"] = round(recipient["total_due"] + amount, 2)
+
+    return {"recipients": list(grouped.values()), "schedules": len(schedules), "skipped": list(skipped)}
+
+
+def _items_html(items: List[dict]) -> str:
+    rows = "".join(
+        f"<tr><td>{escape(item['student_name'])}</td><td>{escape(str(item['due_date']))}</td>"
+        f"<td>R{item['amount_due']:.2f}</td></tr>"
+        for item in items
+    )
+    return f"<table><tr><th>Learner</th><th>Due date</th><th>Amount</th></tr>{rows}</table>"
+
+
+def build_personalization(recipient: dict, kind: str, campaign_id: str) -> dict:
+    """One SendGrid personalization carrying this parent's rendered content."""
+    personalization = {
+        "to": [{"email": recipient["email"], "name": recipient["name"]}],
+        "custom_args": {"campaign_id": campaign_id, "parent_id_number": str(recipient["parent_id_number"])},
+    }
+    if REMINDER_TEMPLATE_ID:
+        personalization["dynamic_template_data"] = {
+            "parent_name": recipient["name"],
+            "kind": kind,
+            "items": recipient["items"],
+            "total_due": f"{recipient['total_due']:.2f}",
+        }
+    else:
+        personalization["substitutions"] = {
+            "-parent_name-": escape(recipient["name"]),
+            "-items_html-": _items_html(recipient["items"]),
+            "-total_due-": f"{recipient['total_due']:.2f}",
+        }
+    return personalization
+
+
+def build_mail_body(personalizations: List[dict], kind: str) -> dict:
+    """v3 mail/send request body for one batch of personalizations."""
+    body = {
+        "from": {"email": FROM_EMAIL},
+        "personalizations": personalizations,
+        "categories": [f"payment-reminder-{kind}"],
+    }
+    if REMINDER_TEMPLATE_ID:
+        body["template_id"] = REMINDER_TEMPLATE_ID
+    else:
+        body["subject"] = _SUBJECTS[kind]
+        body["content"] = [{"type": "text/html", "value": _HTML_TEMPLATE.replace("-intro-", _INTROS[kind])}]
+    return body
+
+
+def _send_batch(body: dict) -> int:
+    """POST one mail/send call, retrying 429/5xx with backoff. Returns the number of recipients."""
+    client = get_sendgrid_client()
+    for attempt in range(1, REMINDER_MAX_ATTEMPTS + 1):
+        try:
+            client.client.mail.send.post(request_body=body)
+            return len(body["personalizations"])
+        except HTTPError as e:
+            status_code = getattr(e, "status_code", 0) or 0
+            if attempt == REMINDER_MAX_ATTEMPTS or (status_code < 500 and status_code != 429):
+                raise
+            time.sleep(2 ** (attempt - 1))
+
+
+def run_reminder_campaign(
+    kind: str,
+    as_of: date = None,
+    days_ahead: int = REMINDER_UPCOMING_DAYS,
+    batch_size: int = REMINDER_BATCH_SIZE,
+    dry_run: bool = False,
+) -> Dict:
+    """
+    Email every parent with overdue (or upcoming) payments.
+
+    Returns a report with recipient/batch counts and throughput:
+        {"campaign_id", "kind", "recipients", "schedules", "batches", "sent", "failed",
+         "skipped_no_email", "query_seconds", "send_seconds", "recipients_per_second", "dry_run"}
+    """
+    batch_size = max(1, min(batch_size, SENDGRID_MAX_PERSONALIZATIONS))
+    campaign_id = uuid.uuid4().hex
+    started = time.perf_counter()
+    collected = collect_reminder_recipients(kind, as_of, days_ahead)
+    recipients = collected["recipients"]
+    query_seconds = time.perf_counter() - started
+
+    bodies = [
+        build_mail_body([build_personalization(r, kind, campaign_id) for r in batch], kind)
+        for batch in chunked(recipients, batch_size)
+    ]
+
+    sent, failed, errors = 0, 0, []
+    send_started = time.perf_counter()
+    if not dry_run and bodies:
+        with ThreadPoolExecutor(max_workers=max(1, REMINDER_SEND_CONCURRENCY)) as pool:
+            futures = [pool.submit(_send_batch, body) for body in bodies]
+            for body, future in zip(bodies, futures):
+                try:
+                    sent += future.result()
+                except Exception as e:
+                    failed += len(body["personalizations"])
+                    errors.append(f"{type(e).__name__}: {getattr(e, 'body', e)}")
+                    logger.error(f"❌ Reminder batch of {len(body['personalizations'])} failed: {e}")
+    send_seconds = time.perf_counter() - send_started
+
+    report = {
+        "campaign_id": campaign_id,
+        "kind": kind,
+        "recipients": len(recipients),
+        "schedules": collected["schedules"],
+        "batches": len(bodies),
+        "sent": sent,
+        "failed": failed,
+        "errors": errors[:10],
+        "skipped_no_email": len(collected["skipped"]),
+        "query_seconds": round(query_seconds, 3),
+        "send_seconds": round(send_seconds, 3),
+        "recipients_per_second": round(sent / send_seconds, 1) if sent and send_seconds else None,
+        "dry_run": dry_run,
+    }
+    logger.info(f"✅ Reminder campaign {campaign_id} ({kind}): {sent}/{len(recipients)} parents in {len(bodies)} batch(es), "
+                f"{report['recipients_per_second']} recipients/s")
+    return report
@@ -1,8 +1,45 @@
 """
 Service layer for payment schedule management
 """
+import logging
+import os
 from datetime import datetime, date, timedelta
-from core.supabase_client import supabase
+from postgrest.types import ReturnMethod
+from core.supabase_client import supabase, fetch_all_rows, chunked
+from core.projections import Projection
+from services.fee_service import fetch_fees_by_grades
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_UPSERT_CHUNK_SIZE = int(os.getenv("SCHEDULE_UPSERT_CHUNK_SIZE", "1000"))
+SCHEDULE_DUE_DAY = int(os.getenv("SCHEDULE_DUE_DAY", "15"))
+# Monthly plans are spread over 10, 11 or 12 instalments (January onwards)
+SCHEDULE_MONTHLY_INSTALMENTS = int(os.getenv("SCHEDULE_MONTHLY_INSTALMENTS", "12"))
+_IN_FILTER_CHUNK_SIZE = 200
+# Instalments with money against them survive a plan change; every other stale row is removed
+SCHEDULE_KEPT_STATUSES = ("paid", "partial")
+
+# Column projections: full schedule rows, and the slim variant for the dashboard/reminders
+SCHEDULE_ROW_COLUMNS = Projection(
+    "id", "parent_id_number", "student_id", "application_id", "due_date", "amount_due",
+    "month_due", "status", "created_at", "updated_at",
+)
+SCHEDULE_SUMMARY_COLUMNS = Projection("id", "student_id", "due_date", "amount_due", "month_due", "status")
+
+# selected_plan -> (due months, multiplier on the annual fee); None = monthly instalments.
+# Multipliers match the plan pricing shown on the frontend review page.
+PLAN_SCHEDULES = {
+    "pay-monthly": (None, 1.0),
+    "monthly-installment": (None, 1.0),
+    "sibling-benefit": (None, 0.9),
+    "buy-now-pay-later": (None, 1.12),
+    "forward-funding": (None, 1.15),
+    "pay-term": ((1, 4, 7), 0.97),
+    "termly-payment": ((1, 4, 7, 10), 1.0),
+    "pay-once": ((1,), 0.95),
+    "annual-payment": ((1,), 1.0),
+    "pay-via-eft": ((1,), 1.0),
+}
 
 def create_payment_schedule(schedule_data: dict) -> dict:
     """
@@ -12,13 +49,16 @@ def create_payment_schedule(schedule_data: dict) -> dict:
     try:
         response = supabase.table("payment_schedule").insert(schedule_data).execute()
         if response.data:
-            return response.data[0]
+            schedule = response.data[0]
+            from services.dashboard_service import refresh_parent_dashboard  # imports this module
+            refresh_parent_dashboard([schedule.get("student_id")], schedule.get("month_due"))
+            return schedule
         return None
     except Exception as e:
-        print(f"❌ Error creating payment schedule: {e}")
+        logger.error(f"❌ Error creating payment schedule: {e}")
         return None
 
-def get_schedule_by_student_month(student_id: str, month_due: str) -> dict:
+def get_schedule_by_student_month(student_id: str, month_due: str, columns: Projection = SCHEDULE_ROW_COLUMNS) -> dict:
     """
     Get payment schedule for a student in a specific month.
     month_due format: "2025-11"
@@ -26,7 +66,7 @@ def get_schedule_by_student_month(student_id: str, month_due: str) -> dict:
     try:
         response = (
             supabase.table("payment_schedule")
-            .select("*")
+            .select(columns)
             .eq("student_id", student_id)
             .eq("month_due", month_due)
             .execute()
@@ -35,10 +75,39 @@ def get_schedule_by_student_month(student_id: str, month_due: str) -> dict:
             return response.data[0]
         return None
     except Exception as e:
-        print(f"❌ Error fetching schedule for student {student_id}: {e}")
+        logger.error(f"❌ Error fetching schedule for student {student_id}: {e}")
         return None
 
-def get_upcoming_payments(parent_id_number: str, days_ahead: int = 30) -> list:
+def get_schedules_by_students_month(student_ids: list, month_due: str, columns: Projection = SCHEDULE_SUMMARY_COLUMNS) -> dict:
+    """
+    Get payment schedules for several students in a specific month with a single query.
+    Returns a dict of student_id -> schedule; students without a schedule are omitted.
+    Defaults to the slim projection - the dashboard only reads due_date.
+    """
+    try:
+        return fetch_schedules_by_students_month(student_ids, month_due, columns)
+    except Exception as e:
+        logger.error(f"❌ Error fetching schedules for students ({month_due}): {e}")
+        return {}
+
+def fetch_schedules_by_students_month(student_ids: list, month_due: str, columns: Projection = SCHEDULE_SUMMARY_COLUMNS) -> dict:
+    """Like get_schedules_by_students_month, but raises on database errors"""
+    student_ids = [student_id for student_id in student_ids if student_id]
+    if not student_ids:
+        return {}
+    response = (
+        supabase.table("payment_schedule")
+        .select(columns)
+        .in_("student_id", student_ids)
+        .eq("month_due", month_due)
+        .execute()
+    )
+    schedules = {}
+    for schedule in response.data or []:
+        schedules.setdefault(schedule["student_id"], schedule)
+    return schedules
+
+def get_upcoming_payments(parent_id_number: str, days_ahead: int = 30, columns: Projection = SCHEDULE_ROW_COLUMNS) -> list:
     """
     Get upcoming payments due within X days.
     """
@@ -48,7 +117,7 @@ def get_upcoming_payments(parent_id_number: str, days_ahead: int = 30) -> list:
         
         response = (
             supabase.table("payment_schedule")
-            .select("*")
+            .select(columns)
             .eq("parent_id_number", parent_id_number)
             .gte("due_date", today)
             .lte("due_date", future_date)
@@ -57,10 +126,10 @@ def get_upcoming_payments(parent_id_number: str, days_ahead: int = 30) -> list:
         )
         return response.data or []
     except Exception as e:
-        print(f"❌ Error fetching upcoming payments: {e}")
+        logger.error(f"❌ Error fetching upcoming payments: {e}")
         return []
 
-def get_overdue_payments(parent_id_number: str) -> list:
+def get_overdue_payments(parent_id_number: str, columns: Projection = SCHEDULE_ROW_COLUMNS) -> list:
     """
     Get all overdue payments for a parent.
     """
@@ -69,7 +138,7 @@ def get_overdue_payments(parent_id_number: str) -> list:
         
         response = (
             supabase.table("payment_schedule")
-            .select("*")
+            .select(columns)
             .eq("parent_id_number", parent_id_number)
             .lt("due_date", today)
             .neq("status", "paid")
@@ -78,7 +147,7 @@ def get_overdue_payments(parent_id_number: str) -> list:
         )
         return response.data or []
     except Exception as e:
-        print(f"❌ Error fetching overdue payments: {e}")
+        logger.error(f"❌ Error fetching overdue payments: {e}")
         return []
 
 def update_payment_schedule_status(schedule_id: int, status: str) -> dict:
@@ -94,25 +163,151 @@ def update_payment_schedule_status(schedule_id: int, status: str) -> dict:
             .execute()
         )
         if response.data:
-            return response.data[0]
+            schedule = response.data[0]
+            from services.dashboard_service import refresh_parent_dashboard  # imports this module
+            refresh_parent_dashboard([schedule.get("student_id")], schedule.get("month_due"))
+            return schedule
         return None
     except Exception as e:
-        print(f"❌ Error updating schedule status: {e}")
+        logger.error(f"❌ Error updating schedule status: {e}")
         return None
 
-def get_all_schedules_by_parent(parent_id_number: str) -> list:
+def get_all_schedules_by_parent(parent_id_number: str, columns: Projection = SCHEDULE_ROW_COLUMNS) -> list:
     """
     Get all payment schedules for a parent.
     """
     try:
         response = (
             supabase.table("payment_schedule")
-            .select("*")
+            .select(columns)
             .eq("parent_id_number", parent_id_number)
             .order("due_date", desc=False)
             .execute()
         )
         return response.data or []
     except Exception as e:
-        print(f"❌ Error fetching all schedules: {e}")
+        logger.error(f"❌ Error fetching all schedules: {e}")
         return []
+
+def build_plan_schedule(selected_plan: str, annual_fee: float, academic_year: int, instalments: int = SCHEDULE_MONTHLY_INSTALMENTS) -> list:
+    """
+    Compute the instalments for one learner's plan for the academic year.
+    Returns [{"due_date", "month_due", "amount_due"}]; an unknown plan is treated as pay-monthly.
+    The final instalment absorbs rounding so instalments add up to the plan total.
+    """
+    if instalments not in (10, 11, 12):
+        raise ValueError("instalments must be 10, 11 or 12")
+    months, multiplier = PLAN_SCHEDULES.get(selected_plan, PLAN_SCHEDULES["pay-monthly"])
+    months = months or tuple(range(1, instalments + 1))
+    total = round(annual_fee * multiplier, 2)
+    amount = round(total / len(months), 2)
+    schedule = []
+    for i, month in enumerate(months):
+        amount_due = amount if i < len(months) - 1 else round(total - amount * (len(months) - 1), 2)
+        schedule.append({
+            "due_date": date(academic_year, month, SCHEDULE_DUE_DAY).isoformat(),
+            "month_due": f"{academic_year}-{month:02d}",
+            "amount_due": amount_due,
+        })
+    return schedule
+
+def _stale_instalments(academic_year: int, rows: list) -> list:
+    """
+    Existing schedule rows for the year, of learners in rows, whose month is no longer in
+    their generated plan and that have no payment against them.
+    """
+    planned = {(row["student_id"], row["month_due"]) for row in rows}
+    learners = sorted({row["student_id"] for row in rows})
+    stale = []
+    for batch in chunked(learners, _IN_FILTER_CHUNK_SIZE):
+        existing = fetch_all_rows(
+            lambda: supabase.table("payment_schedule")
+            .select("id, student_id, month_due, status")
+            .in_("student_id", batch)
+            .like("month_due", f"{academic_year}-%")
+            .order("id")
+        )
+        stale.extend(
+            row for row in existing
+            if (row["student_id"], row["month_due"]) not in planned and row.get("status") not in SCHEDULE_KEPT_STATUSES
+        )
+    return stale
+
+def generate_payment_schedules(
+    academic_year: int,
+    instalments: int = SCHEDULE_MONTHLY_INSTALMENTS,
+    chunk_size: int = SCHEDULE_UPSERT_CHUNK_SIZE,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Generate the full payment_schedule for every application with a selected plan.
+
+    Reads fee_responsibility.selected_plan and each learner's grade fee (fees table,
+    annual fee = total_monthly_fee * 12), computes every instalment for the year and upserts
+    them chunk_size rows at a time on (student_id, month_due), so reruns just rewrite the
+    same rows. Existing schedule status is left untouched.
+
+    A learner's rows for the year in months their plan no longer has (e.g. after switching
+    from pay-monthly to pay-once) are deleted, unless they are already paid or partial.
+    """
+    plans = fetch_all_rows(
+        lambda: supabase.table("fee_responsibility")
+        .select("application_id, selected_plan, parent_id_number")
+        .not_.is_("selected_plan", "null")
+        .order("application_id")
+    )
+    plan_by_app = {p["application_id"]: p for p in plans}
+
+    students = []
+    for app_ids in chunked(list(plan_by_app), _IN_FILTER_CHUNK_SIZE):
+        students.extend(
+            supabase.table("students")
+            .select("id_number, application_id, grade_applied_for, parent_id")
+            .in_("application_id", app_ids)
+            .execute()
+            .data or []
+        )
+
+    fees = fetch_fees_by_grades([s.get("grade_applied_for") for s in students])
+
+    rows = []
+    skipped = []
+    for student in students:
+        fee = fees.get(student.get("grade_applied_for"))
+        if not fee:
+            skipped.append({"student_id": student.get("id_number"), "reason": f"No active fee for grade {student.get('grade_applied_for')}"})
+            continue
+        plan = plan_by_app[student["application_id"]]
+        for instalment in build_plan_schedule(plan["selected_plan"], fee["total_monthly_fee"] * 12, academic_year, instalments):
+            rows.append({
+                "parent_id_number": student.get("parent_id") or plan.get("parent_id_number"),
+                "student_id": student["id_number"],
+                "application_id": student["application_id"],
+                **instalment,
+            })
+
+    stale = _stale_instalments(academic_year, rows)
+
+    if not dry_run:
+        for batch in chunked(rows, chunk_size):
+            supabase.table("payment_schedule").upsert(batch, on_conflict="student_id,month_due", returning=ReturnMethod.minimal).execute()
+        for batch in chunked([row["id"] for row in stale], _IN_FILTER_CHUNK_SIZE):
+            supabase.table("payment_schedule").delete(returning=ReturnMethod.minimal).in_("id", batch).execute()
+        # Only the current month is on the dashboard
+        from services.dashboard_service import refresh_parent_dashboard, get_current_month_str  # imports this module
+        current_month = get_current_month_str()
+        refresh_parent_dashboard(
+            [row["student_id"] for row in rows + stale if row.get("month_due") == current_month], current_month,
+        )
+
+    logger.info(f"✅ Payment schedules {'computed' if dry_run else 'upserted'}: {len(rows)} rows for {len(students) - len(skipped)} learners, "
+                f"{len(stale)} stale instalment(s) {'found' if dry_run else 'removed'} ({academic_year})")
+    return {
+        "academic_year": academic_year,
+        "applications": len(plan_by_app),
+        "learners": len(students) - len(skipped),
+        "rows": len(rows),
+        "removed": len(stale),
+        "skipped": skipped,
+        "dry_run": dry_run,
+    }
@@ -1,8 +1,26 @@
 """
 Service layer for payments management
 """
+import logging
+import os
 from datetime import datetime, date
 from core.supabase_client import supabase
+from core.projections import Projection
+
+logger = logging.getLogger(__name__)
+
+# Rows per multi-row upsert when ingesting bank statement files
+PAYMENT_BULK_CHUNK_SIZE = int(os.getenv("PAYMENT_BULK_CHUNK_SIZE", "1000"))
+PAYMENT_REQUIRED_FIELDS = ("parent_id_number", "student_id", "application_id", "payment_amount", "payment_date", "receipt_number")
+PAYMENT_COLUMNS = PAYMENT_REQUIRED_FIELDS + ("payment_method", "month_covered", "status", "notes")
+PAYMENT_STATUSES = ("pending", "completed", "failed", "cancelled")
+
+# Column projections: full payment rows, and the slim variant for listings/summaries
+PAYMENT_ROW_COLUMNS = Projection(
+    "id", "parent_id_number", "student_id", "application_id", "payment_amount", "payment_date",
+    "payment_method", "receipt_number", "month_covered", "status", "notes", "created_at", "updated_at",
+)
+PAYMENT_SUMMARY_COLUMNS = Projection("id", "student_id", "payment_amount", "payment_date", "month_covered", "status", "receipt_number")
 
 def create_payment(payment_data: dict) -> dict:
     """
@@ -12,58 +30,204 @@ def create_payment(payment_data: dict) -> dict:
     try:
         response = supabase.table("payments").insert(payment_data).execute()
         if response.data:
-            return response.data[0]
+            payment = response.data[0]
+            from services.dashboard_service import refresh_parent_dashboard  # imports this module
+            refresh_parent_dashboard([payment.get("student_id")], _payment_month(payment))
+            return payment
         return None
     except Exception as e:
-        print(f"❌ Error creating payment: {e}")
+        logger.error(f"❌ Error creating payment: {e}")
         return None
 
-def get_payments_by_parent_month(parent_id_number: str, month_due: str) -> list:
+def _payment_month(payment: dict) -> str:
+    """The month a payment counts towards (month_covered, else its payment_date month)"""
+    return payment.get("month_covered") or str(payment.get("payment_date") or "")[:7] or None
+
+def validate_payment_row(row: dict) -> tuple:
+    """
+    Validate and normalize one incoming payment row (CSV or JSON).
+    Returns (payment, errors): payment is None when errors is non-empty.
+    Unknown columns are dropped; month_covered defaults to the payment_date month.
+    """
+    payment = {}
+    errors = []
+    for column in PAYMENT_COLUMNS:
+        value = row.get(column)
+        if isinstance(value, str):
+            value = value.strip()
+        if value not in (None, ""):
+            payment[column] = value
+
+    missing = [f for f in PAYMENT_REQUIRED_FIELDS if f not in payment]
+    if missing:
+        errors.append(f"Missing required fields: {', '.join(missing)}")
+
+    if "payment_amount" in payment:
+        try:
+            payment["payment_amount"] = round(float(payment["payment_amount"]), 2)
+            if payment["payment_amount"] <= 0:
+                errors.append("payment_amount must be greater than 0")
+        except (TypeError, ValueError):
+            errors.append(f"Invalid payment_amount: {payment['payment_amount']}")
+
+    if "payment_date" in payment:
+        try:
+            payment["payment_date"] = date.fromisoformat(str(payment["payment_date"])[:10]).isoformat()
+            payment.setdefault("month_covered", payment["payment_date"][:7])
+        except ValueError:
+            errors.append(f"Invalid payment_date (expected YYYY-MM-DD): {payment['payment_date']}")
+
+    if "status" in payment and payment["status"] not in PAYMENT_STATUSES:
+        errors.append(f"Invalid status: {payment['status']}")
+
+    return (None if errors else payment), errors
+
+class PaymentBulkIngestor:
+    """
+    Incremental bulk payment loader.
+    Rows are validated and deduped on receipt_number as they arrive, buffered, and written
+    in chunks as multi-row upserts (on_conflict=receipt_number, existing receipts ignored).
+    Keeps a per-row result report: inserted | duplicate | invalid | failed.
+    """
+
+    def __init__(self, chunk_size: int = PAYMENT_BULK_CHUNK_SIZE):
+        self.chunk_size = max(1, chunk_size)
+        self.results = []
+        self._buffer = []
+        self._seen_receipts = set()
+
+    def add(self, row: dict, line: int = None) -> bool:
+        """
+        Validate and buffer one row (line = its line in the upload, when known).
+        Returns True when a full chunk is ready to flush().
+        """
+        index = len(self.results)
+        payment, errors = validate_payment_row(row)
+        receipt = payment.get("receipt_number") if payment else row.get("receipt_number")
+        result = {"row": index, "receipt_number": receipt, "status": "pending"}
+        if line is not None:
+            result["line"] = line
+        if errors:
+            result.update(status="invalid", errors=errors)
+        elif receipt in self._seen_receipts:
+            result.update(status="duplicate", errors=["Duplicate receipt_number in upload"])
+        else:
+            self._seen_receipts.add(receipt)
+            self._buffer.append((result, payment))
+        self.results.append(result)
+        return len(self._buffer) >= self.chunk_size
+
+    def add_invalid(self, error: str, line: int = None) -> None:
+        """Record a row that could not even be parsed (bad JSON / CSV line) as invalid."""
+        result = {"row": len(self.results), "receipt_number": None, "status": "invalid", "errors": [error]}
+        if line is not None:
+            result["line"] = line
+        self.results.append(result)
+
+    def flush(self) -> None:
+        """Write buffered rows as one multi-row upsert and record per-row outcomes."""
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        try:
+            response = (
+                supabase.table("payments")
+                .upsert([payment for _, payment in batch], on_conflict="receipt_number", ignore_duplicates=True)
+                .execute()
+            )
+            inserted = {p.get("receipt_number") for p in response.data or []}
+            for result, payment in batch:
+                if payment["receipt_number"] in inserted:
+                    result["status"] = "inserted"
+                else:
+                    result.update(status="duplicate", errors=["receipt_number already exists"])
+            self._refresh_dashboard(response.data or [])
+        except Exception as e:
+            logger.error(f"❌ Error inserting payment chunk of {len(batch)} rows: {e}")
+            for result, _ in batch:
+                result.update(status="failed", errors=[str(e)])
+
+    @staticmethod
+    def _refresh_dashboard(payments: list) -> None:
+        """Refresh the read-model rows of the learners paid for, one refresh per month covered"""
+        from services.dashboard_service import refresh_parent_dashboard  # imports this module
+        student_ids_by_month = {}
+        for payment in payments:
+            student_ids_by_month.setdefault(_payment_month(payment), set()).add(payment.get("student_id"))
+        for month, student_ids in student_ids_by_month.items():
+            refresh_parent_dashboard(list(student_ids), month)
+
+    def report(self) -> dict:
+        """Flush any remaining rows and return the summary plus per-row results."""
+        self.flush()
+        summary = {"total": len(self.results), "inserted": 0, "duplicate": 0, "invalid": 0, "failed": 0}
+        for result in self.results:
+            summary[result["status"]] = summary.get(result["status"], 0) + 1
+        return {"summary": summary, "results": self.results}
+
+def bulk_create_payments(rows, chunk_size: int = PAYMENT_BULK_CHUNK_SIZE) -> dict:
+    """
+    Bulk-insert payment rows from any iterable (e.g. csv.DictReader or a parsed JSON list).
+    Rows are validated, deduped on receipt_number and upserted chunk_size at a time.
+    Returns {"summary": {...counts...}, "results": [per-row status]}.
+    """
+    ingestor = PaymentBulkIngestor(chunk_size)
+    for row in rows:
+        if ingestor.add(row):
+            ingestor.flush()
+    return ingestor.report()
+
+def get_payments_by_parent_month(parent_id_number: str, month_due: str, columns: Projection = PAYMENT_ROW_COLUMNS) -> list:
     """
     Get all payments for a parent in a specific month.
     month_due format: "2025-11"
+    Pass columns=PAYMENT_SUMMARY_COLUMNS for the slim variant.
     """
     try:
         response = (
             supabase.table("payments")
-            .select("*")
+            .select(columns)
             .eq("parent_id_number", parent_id_number)
             .eq("month_covered", month_due)
             .execute()
         )
         return response.data or []
     except Exception as e:
-        print(f"❌ Error fetching payments for {parent_id_number} ({month_due}): {e}")
+        logger.error(f"❌ Error fetching payments for {parent_id_number} ({month_due}): {e}")
         return []
 
-def get_payments_by_student_month(student_id: str, month_due: str) -> list:
+def get_payments_by_student_month(student_id: str, month_due: str, columns: Projection = PAYMENT_ROW_COLUMNS) -> list:
     """
     Get all payments for a student in a specific month.
     month_due format: "2025-11"
+    Pass columns=PAYMENT_SUMMARY_COLUMNS for the slim variant.
     """
     try:
         response = (
             supabase.table("payments")
-            .select("*")
+            .select(columns)
             .eq("student_id", student_id)
             .eq("month_covered", month_due)
             .execute()
         )
         return response.data or []
     except Exception as e:
-        print(f"❌ Error fetching payments for student {student_id} ({month_due}): {e}")
+        logger.error(f"❌ Error fetching payments for student {student_id} ({month_due}): {e}")
         return []
 
 def get_total_paid_by_parent_month(parent_id_number: str, month_due: str) -> float:
     """
     Get total amount paid by a parent in a specific month.
+    Summed in Postgres by the payment_totals_by_parent RPC (completed payments only).
     """
     try:
-        payments = get_payments_by_parent_month(parent_id_number, month_due)
-        total = sum(float(p.get("payment_amount", 0)) for p in payments if p.get("status") == "completed")
-        return total
+        response = supabase.rpc(
+            "payment_totals_by_parent",
+            {"p_parent_id_number": parent_id_number, "p_month": month_due},
+        ).execute()
+        return sum(float(row.get("total_paid") or 0) for row in response.data or [])
     except Exception as e:
-        print(f"❌ Error calculating total paid: {e}")
+        logger.error(f"❌ Error calculating total paid: {e}")
         return 0.0
 
 def get_total_paid_by_student_month(student_id: str, month_due: str) -> float:
@@ -71,21 +235,51 @@ def get_total_paid_by_student_month(student_id: str, month_due: str) -> float:
     Get total amount paid for a student in a specific month.
     """
     try:
-        payments = get_payments_by_student_month(student_id, month_due)
-        total = sum(float(p.get("payment_amount", 0)) for p in payments if p.get("status") == "completed")
-        return total
+        return get_total_paid_by_students_month([student_id], month_due).get(student_id, 0.0)
     except Exception as e:
-        print(f"❌ Error calculating total paid for student: {e}")
+        logger.error(f"❌ Error calculating total paid for student: {e}")
         return 0.0
 
-def get_payment_history(parent_id_number: str, limit: int = 10) -> list:
+def get_total_paid_by_students_month(student_ids: list, month_due: str) -> dict:
+    """
+    Get total amount paid per student in a specific month with a single query.
+    Summed in Postgres by the payment_totals_by_students RPC (completed payments only),
+    so the payload is one row per student regardless of how many payments exist.
+    Returns a dict of student_id -> total; every requested student is present.
+    """
+    try:
+        return fetch_total_paid_by_students_month(student_ids, month_due)
+    except Exception as e:
+        logger.error(f"❌ Error calculating totals paid for students ({month_due}): {e}")
+        return {student_id: 0.0 for student_id in student_ids if student_id}
+
+def fetch_total_paid_by_students_month(student_ids: list, month_due: str) -> dict:
+    """Like get_total_paid_by_students_month, but raises on database errors"""
+    totals = {student_id: 0.0 for student_id in student_ids if student_id}
+    if not totals:
+        return totals
+    response = supabase.rpc(
+        "payment_totals_by_students",
+        {"p_student_ids": list(totals), "p_month": month_due},
+    ).execute()
+    return _apply_student_totals(response.data, totals)
+
+def _apply_student_totals(rows: list, totals: dict) -> dict:
+    """Copy payment_totals_by_students rows onto the per-student totals dict"""
+    for row in rows or []:
+        if row.get("student_id") in totals:
+            totals[row["student_id"]] += float(row.get("total_paid") or 0)
+    return totals
+
+def get_payment_history(parent_id_number: str, limit: int = 10, columns: Projection = PAYMENT_ROW_COLUMNS) -> list:
     """
     Get payment history for a parent (last N payments).
+    Pass columns=PAYMENT_SUMMARY_COLUMNS for the slim variant.
     """
     try:
         response = (
             supabase.table("payments")
-            .select("*")
+            .select(columns)
             .eq("parent_id_number", parent_id_number)
             .order("payment_date", desc=True)
             .limit(limit)
@@ -93,18 +287,18 @@ def get_payment_history(parent_id_number: str, limit: int = 10) -> list:
         )
         return response.data or []
     except Exception as e:
-        print(f"❌ Error fetching payment history: {e}")
+        logger.error(f"❌ Error fetching payment history: {e}")
         return []
 
-def get_payment_by_receipt(receipt_number: str) -> dict:
+def get_payment_by_receipt(receipt_number: str, columns: Projection = PAYMENT_ROW_COLUMNS) -> dict:
     """
     Get a specific payment by receipt number.
     """
     try:
-        response = supabase.table("payments").select("*").eq("receipt_number", receipt_number).execute()
+        response = supabase.table("payments").select(columns).eq("receipt_number", receipt_number).execute()
         if response.data and len(response.data) > 0:
             return response.data[0]
         return None
     except Exception as e:
-        print(f"❌ Error fetching payment by receipt: {e}")
+        logger.error(f"❌ Error fetching payment by receipt: {e}")
         return None
@@ -5,9 +5,23 @@ Service for plan selection business logic.
 from typing import Dict, Any, Optional
 import logging
 from core.supabase_client import supabase
+from core.projections import Projection
 
 logger = logging.getLogger(__name__)
 
+# Column projections over fee_responsibility: the full row, the plan-only variant,
+# and the bank/account-holder fields the Payment Modal reads
+FEE_RESPONSIBILITY_COLUMNS = Projection(
+    "id", "application_id", "fee_person", "relationship", "fee_terms_accepted", "selected_plan",
+    "created_at", "updated_at", "parent_id_number", "parent_first_name", "parent_surname",
+    "parent_email", "parent_mobile", "bank_name", "branch_code", "account_number", "account_type",
+)
+SELECTED_PLAN_COLUMNS = Projection("id", "application_id", "selected_plan", "updated_at")
+PAYMENT_DETAILS_COLUMNS = Projection(
+    "application_id", "parent_first_name", "parent_surname",
+    "bank_name", "branch_code", "account_number", "account_type",
+)
+
 
 class PlanService:
     """Service for plan selection business logic"""
@@ -18,7 +32,8 @@ class PlanService:
     def save_selected_plan(self, application_id: str, selected_plan: str) -> Dict[str, Any]:
         """
         Save the selected plan for an application to the fee_responsibility table.
-        Updates or creates the fee_responsibility record with the selected_plan.
+        Updates or creates the fee_responsibility record with the selected_plan in one
+        round-trip (save_selected_plan RPC).
         
         Args:
             application_id: UUID of the application
@@ -45,34 +60,19 @@ class PlanService:
             
             logger.info(f"Attempting to save plan '{selected_plan}' for application {application_id}")
             
-            # Check if fee_responsibility record exists
-            existing_record = self.db.table("fee_responsibility").select("id").eq("application_id", application_id).limit(1).execute()
-            
-            if existing_record.data and len(existing_record.data) > 0:
-                # Update existing record
-                logger.info(f"Updating existing fee_responsibility record for application {application_id}")
-                response = (
-                    self.db.table("fee_responsibility")
-                    .update({"selected_plan": selected_plan})
-                    .eq("application_id", application_id)
-                    .execute()
-                )
-            else:
-                # Create new record with required fields
-                logger.info(f"Creating new fee_responsibility record for application {application_id}")
-                insert_data = {
-                    "application_id": application_id,
-                    "selected_plan": selected_plan,
-                    "fee_person": "Parent",
-                    "relationship": "Parent",
-                    "fee_terms_accepted": False
-                }
-                response = self.db.table("fee_responsibility").insert(insert_data).execute()
+            # One atomic INSERT ... ON CONFLICT (application_id) DO UPDATE SET selected_plan, via RPC:
+            # a plain upsert would also overwrite fee_person/relationship on existing records
+            response = self.db.rpc("save_selected_plan", {
+                "p_application_id": application_id,
+                "p_selected_plan": selected_plan,
+            }).execute()
             
             if not response.data or len(response.data) == 0:
                 raise ValueError(f"Failed to save plan: database returned no records")
             
             saved_record = response.data[0]
+            from services.payment_details_service import invalidate_payment_details  # imports this module
+            invalidate_payment_details(application_id=application_id)
             logger.info(f"Successfully saved plan '{selected_plan}' for application {application_id}")
             return saved_record
 
@@ -83,12 +83,13 @@ class PlanService:
             logger.error(f"Failed to save selected plan for application {application_id}: {str(e)}")
             raise e
 
-    def get_selected_plan(self, application_id: str) -> Optional[Dict[str, Any]]:
+    def get_selected_plan(self, application_id: str, columns: Projection = FEE_RESPONSIBILITY_COLUMNS) -> Optional[Dict[str, Any]]:
         """
         Get the selected plan for an application from the fee_responsibility table.
         
         Args:
             application_id: UUID of the application
+            columns: Columns to return (SELECTED_PLAN_COLUMNS for the slim variant)
             
         Returns:
             Dict containing the fee_responsibility record or None if not found
@@ -103,7 +104,7 @@ class PlanService:
             
             response = (
                 self.db.table("fee_responsibility")
-                .select("*")
+                .select(columns)
                 .eq("application_id", application_id)
                 .limit(1)
                 .execute()
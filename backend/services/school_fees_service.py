@@ -1,29 +1,80 @@
-from typing import Optional, Dict
-from core.supabase_client import get_supabase_client
+import logging
+import os
+from typing import Optional, Dict, List
+from core.supabase_client import get_async_supabase_client
+from core.cache import TTLCache
+from core.grades import grade_alias_key, build_grade_alias_index
+
+logger = logging.getLogger(__name__)
+
+# school_fees rows change about once a year, so the whole table is served from memory
+SCHOOL_FEES_CACHE_TTL_SECONDS = int(os.getenv("SCHOOL_FEES_CACHE_TTL_SECONDS", "3600"))
+_SCHOOL_FEES_KEY = "school_fees"
+_school_fees_cache = TTLCache(ttl_seconds=SCHOOL_FEES_CACHE_TTL_SECONDS)
 
 
 class SchoolFeesService:
     """Service for handling school fees operations"""
 
+    @staticmethod
+    async def get_fee_table() -> Dict:
+        """
+        Read-through cache over the school_fees table.
+
+        Returns:
+            {
+                "rows": [...all rows...],
+                "aliases": {grade_alias_key: row},  # "12", "gr12", "GR_12" -> Grade 12 row
+                "available": ["Grade R", "Grade 1", ...]
+            }
+
+        Raises:
+            Exception: If the database query fails (nothing is cached)
+        """
+        fee_table = _school_fees_cache.get(_SCHOOL_FEES_KEY)
+        if fee_table is None:
+            supabase = await get_async_supabase_client()
+            response = await supabase.table('school_fees').select('*').execute()
+            rows = response.data or []
+            fee_table = {
+                'rows': rows,
+                'aliases': build_grade_alias_index(rows, 'grade'),
+                'available': [row.get('grade') for row in rows],
+            }
+            # An empty table is not cached so freshly seeded fees show up immediately
+            if rows:
+                _school_fees_cache.set(_SCHOOL_FEES_KEY, fee_table)
+        return fee_table
+
+    @staticmethod
+    def invalidate_cache() -> None:
+        """Drop cached school_fees rows so the next read reloads them"""
+        _school_fees_cache.invalidate()
+
+    @staticmethod
+    async def find_fee_row(grade: str) -> Optional[Dict]:
+        """
+        Find the raw school_fees row for a grade via the alias index, so "12", "gr12",
+        "Grade12", "GR_12" and "Grade 12" all resolve to the same row.
+        """
+        fee_table = await SchoolFeesService.get_fee_table()
+        return fee_table['aliases'].get(grade_alias_key(grade))
+
     @staticmethod
     async def get_fee_by_grade(grade: str) -> Optional[Dict]:
         """
         Fetch school fees for a specific grade
-        
+
         Args:
             grade: Grade identifier (e.g., 'GR_R', 'GR_1-6', 'GR_7-9', 'GR_10-11', 'GR_12')
-            
+
         Returns:
             Dictionary with fee data or None if not found
         """
         try:
-            supabase = get_supabase_client()
-            
-            # Query without .single() to avoid errors when no rows found
-            response = supabase.table('school_fees').select('*').eq('grade', grade).execute()
-            
-            if response.data and len(response.data) > 0:
-                data = response.data[0]
+            data = await SchoolFeesService.find_fee_row(grade)
+
+            if data:
                 return {
                     'grade': data.get('grade'),
                     'annual_fee': data.get('annual_fee'),
@@ -33,26 +84,23 @@ class SchoolFeesService:
                     'sport_fee': data.get('sport_fee', 0)
                 }
             return None
-            
+
         except Exception as e:
-            print(f"Error fetching fees for grade {grade}: {str(e)}")
+            logger.error(f"Error fetching fees for grade {grade}: {str(e)}")
             return None
 
     @staticmethod
-    async def get_all_fees() -> list:
+    async def get_all_fees() -> List[Dict]:
         """
         Fetch all school fees
-        
+
         Returns:
             List of fee dictionaries
         """
         try:
-            supabase = get_supabase_client()
-            
-            response = supabase.table('school_fees').select('*').execute()
-            
-            return response.data if response.data else []
-            
+            fee_table = await SchoolFeesService.get_fee_table()
+            return fee_table['rows']
+
         except Exception as e:
-            print(f"Error fetching all fees: {str(e)}")
+            logger.error(f"Error fetching all fees: {str(e)}")
             return []
@@ -1,43 +1,100 @@
+import logging
+import os
+from postgrest.exceptions import APIError
+from core.cache import TTLCache
+from core.projections import Projection
 from core.supabase_client import supabase
-from passlib.context import CryptContext
+from core.logging_config import log_payload
+from core.passwords import hash_password, hash_passwords
+from services.dashboard_service import refresh_parent_dashboard
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
 
-# ✅ Create a new student
-def create_student(student: dict):
-    print("📥 Incoming student data:", student)
-
-    # 1️⃣ Check parent exists by SA ID (linked through id_number)
-    parent_check = supabase.table("parents").select("*").eq("id_number", student["parent_id"]).execute()
-    if not parent_check.data or len(parent_check.data) == 0:
-        raise ValueError(f"Parent with ID {student['parent_id']} does not exist")
-
-    # 2️⃣ Insert address
-    address_data = {
-        "street_address": student["street_address"],
-        "city": student["city"],
-        "state": student["state"],
-        "postcode": student["postcode"],
-    }
-    address_res = supabase.table("addresses").insert(address_data).execute()
-    if not address_res.data:
-        raise ValueError("Failed to insert address")
+ADDRESS_FIELDS = ("street_address", "city", "state", "postcode")
+STUDENT_BULK_MAX = int(os.getenv("STUDENT_BULK_MAX", "500"))
+# SQLSTATE raised by the create RPCs when the parent (by SA ID) does not exist
+_MISSING_PARENT_SQLSTATE = "23503"
+
+STUDENT_LIST_CACHE_TTL_SECONDS = float(os.getenv("STUDENT_LIST_CACHE_TTL_SECONDS", "60"))
+STUDENT_LIST_CACHE_MAXSIZE = int(os.getenv("STUDENT_LIST_CACHE_MAXSIZE", "10000"))
+
+# parent_id is read only to index cached lists for invalidation; it is not returned
+USER_STUDENT_COLUMNS = Projection(
+    "parent_id", "application_id", "first_name", "surname", "grade_applied_for", "id_number", "gender",
+    "date_of_birth", "street_address", "city", "state", "postcode", "phone_number", "email", "status",
+    "monthly_fee", "previous_grade",
+)
+
+# user_id -> (student list, parent_ids of the students in it); the parent_ids let writes drop the
+# lists holding their students, and expire and get evicted with the entry
+_student_lists = TTLCache(STUDENT_LIST_CACHE_TTL_SECONDS, maxsize=STUDENT_LIST_CACHE_MAXSIZE)
 
-    address_id = address_res.data[0]["address_id"]
-    student["address_id"] = address_id  # add foreign key
 
-    # 3️⃣ Hash password
-    student["password_hash"] = pwd_context.hash(student.pop("password"))
+def _address_of(student: dict) -> dict:
+    return {field: student[field] for field in ADDRESS_FIELDS}
 
-    # 4️⃣ Insert student
-    student_to_insert = student.copy()
-    res = supabase.table("students").insert(student_to_insert).execute()
 
+def _rpc_error_to_value_error(e: APIError) -> Exception:
+    return ValueError(e.message) if e.code == _MISSING_PARENT_SQLSTATE else e
+
+
+# ✅ Create a new student
+def create_student(student: dict):
+    """
+    Check the parent exists, insert the address and insert the student in one transaction
+    (create_student_with_address RPC, a single round-trip). Returns [student_row].
+    """
+    log_payload(logger, "📥 Incoming student data", student)
+
+    # 1️⃣ Hash password (in the password hashing process pool) unless the route already did
+    if "password" in student:
+        student["password_hash"] = hash_password(student.pop("password"))
+
+    # 2️⃣ Check parent, insert address, insert student - one transaction
+    try:
+        res = supabase.rpc("create_student_with_address", {
+            "p_address": _address_of(student),
+            "p_student": student,
+        }).execute()
+    except APIError as e:
+        raise _rpc_error_to_value_error(e)
     if not res.data:
         raise ValueError("Failed to insert student")
 
-    print("🎓 Student inserted:", res.data)
-    return res.data
+    log_payload(logger, "🎓 Student inserted", res.data)
+    invalidate_student_lists(student.get("parent_id"))
+    refresh_parent_dashboard([res.data.get("id_number")])
+    return [res.data]
+
+
+# ✅ Create a class worth of students at once
+def create_students_bulk(students: list) -> list:
+    """
+    Create up to STUDENT_BULK_MAX students (each with an address) in one transaction and one
+    round-trip (create_students_with_addresses RPC). All or nothing: an unknown parent ID
+    rejects the whole batch. Returns the created rows in input order.
+    """
+    if not students:
+        return []
+    if len(students) > STUDENT_BULK_MAX:
+        raise ValueError(f"At most {STUDENT_BULK_MAX} students per bulk import")
+
+    to_hash = [student for student in students if "password" in student]
+    for student, password_hash in zip(to_hash, hash_passwords([student.pop("password") for student in to_hash])):
+        student["password_hash"] = password_hash
+
+    try:
+        res = supabase.rpc("create_students_with_addresses", {
+            "p_rows": [{"address": _address_of(student), "student": student} for student in students],
+        }).execute()
+    except APIError as e:
+        raise _rpc_error_to_value_error(e)
+
+    for parent_id in {student.get("parent_id") for student in students}:
+        invalidate_student_lists(parent_id)
+    refresh_parent_dashboard([row.get("id_number") for row in res.data or []])
+    logger.info(f"🎓 Bulk-created {len(res.data or [])} students")
+    return res.data or []
 
 
 # ✅ Fetch all students for a parent (Parent Dashboard)
@@ -46,7 +103,7 @@ def get_students_by_parent_id(parent_id: str):
     Fetch all students linked to a parent by their ID number.
     """
     try:
-        print(f"🔍 Fetching students for parent_id={parent_id}")
+        logger.debug(f"🔍 Fetching students for parent_id={parent_id}")
 
         # Return additional fields (address/contact/date_of_birth) so frontend can show and edit them
         students_response = (
@@ -59,64 +116,64 @@ def get_students_by_parent_id(parent_id: str):
         )
 
         if not students_response.data:
-            print("⚠️ No students found for this parent.")
+            logger.warning("⚠️ No students found for this parent.")
             return []
 
-        print(f"✅ Found {len(students_response.data)} students")
+        logger.debug(f"✅ Found {len(students_response.data)} students")
         return students_response.data
 
     except Exception as e:
-        print(f"❌ [get_students_by_parent_id] Error: {e}")
+        logger.error(f"❌ [get_students_by_parent_id] Error: {e}")
         raise e
 
 # ✅ Fetch all students for a user (via user_id from auth)
 def get_students_by_user_id(user_id: str):
     """
     Fetch all students linked to a user by their user_id from auth.users.
-    This queries the applications table to find the parent's id, then gets students.
+    One select on the user_students view (applications joined to students by parent ID).
+    Non-empty lists are cached per user for STUDENT_LIST_CACHE_TTL_SECONDS and dropped when
+    one of the parent's students is created or updated.
     """
+    cached = _student_lists.get(user_id)
+    if cached is not None:
+        return cached[0]
+
     try:
-        print(f"🔍 Fetching students for user_id={user_id}")
+        logger.debug(f"🔍 Fetching students for user_id={user_id}")
+        response = supabase.table("user_students").select(USER_STUDENT_COLUMNS).eq("user_id", user_id).execute()
+    except Exception as e:
+        logger.error(f"❌ [get_students_by_user_id] Error: {e}")
+        raise e
 
-        # First, get the application linked to this user_id
-        app_response = (
-            supabase.table("applications")
-            .select("parent_id_number")
-            .eq("user_id", user_id)
-            .execute()
-        )
+    if not response.data:
+        logger.warning(f"⚠️ No students found for user_id={user_id}")
+        return []
 
-        if not app_response.data or len(app_response.data) == 0:
-            print(f"⚠️ No applications found for user_id={user_id}")
-            return []
+    parent_ids = frozenset(str(row.pop("parent_id")) for row in response.data)
+    _student_lists.set(user_id, (response.data, parent_ids))
+    logger.debug(f"✅ Found {len(response.data)} students")
+    return response.data
 
-        parent_id_number = app_response.data[0]["parent_id_number"]
-        print(f"Found parent_id_number: {parent_id_number}")
 
-        # Now get students for this parent
-        students_response = (
-            supabase.table("students")
-            .select(
-                "application_id, first_name, surname, grade_applied_for, id_number, gender, date_of_birth, street_address, city, state, postcode, phone_number, email, status, monthly_fee, previous_grade"
-            )
-            .eq("parent_id", parent_id_number)
-            .execute()
-        )
+def invalidate_student_lists(parent_id: str) -> None:
+    """Drop cached student lists of the users whose students belong to this parent (by SA ID)."""
+    parent_id = str(parent_id)
+    _student_lists.invalidate_where(lambda user_id, entry: parent_id in entry[1])
 
-        if not students_response.data:
-            print("⚠️ No students found for this parent.")
-            return []
 
-        print(f"✅ Found {len(students_response.data)} students")
-        return students_response.data
+def clear_student_lists() -> None:
+    """Drop every cached student list (after school-wide changes such as grade promotion)."""
+    _student_lists.invalidate()
+
 
-    except Exception as e:
-        print(f"❌ [get_students_by_user_id] Error: {e}")
-        raise e
-    
 def update_student_by_id_number(id_number: str, student_data: dict):
     # Fetch student first
-    existing = supabase.table("students").select("*").eq("id_number", id_number).execute()
+    existing = (
+        supabase.table("students")
+        .select("address_id, parent_id, grade_applied_for, street_address, city, state, postcode, phone_number, email")
+        .eq("id_number", id_number)
+        .execute()
+    )
     if not existing.data or len(existing.data) == 0:
         return None
 
@@ -143,5 +200,7 @@ def update_student_by_id_number(id_number: str, student_data: dict):
     }
 
     res = supabase.table("students").update(student_update).eq("id_number", id_number).execute()
+    invalidate_student_lists(student_record["parent_id"])
+    refresh_parent_dashboard([id_number])
     return res.data
 
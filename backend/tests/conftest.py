@@ -0,0 +1,37 @@
+"""
+Shared fixtures: services run against the in-process fake Supabase from benchmarks/, so the
+tests exercise the real supabase-py request paths without a network or a hosted project.
+"""
+import os
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("SUPABASE_URL", "https://tests.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "tests-anon-key")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "benchmark-jwt-secret")
+
+import pytest
+
+from benchmarks.fake_postgrest import FakeSupabase, install
+from benchmarks.seed import seed
+
+
+@pytest.fixture
+def fake():
+    """A small seeded FakeSupabase wired into the shared client, with in-process caches cleared."""
+    from services.fee_service import invalidate_fee_cache
+    from services.student_service import clear_student_lists
+
+    fake = FakeSupabase()
+    fake.keys = seed(fake, parents=6, students=12, payments=30)
+    install(fake)
+    invalidate_fee_cache()
+    clear_student_lists()
+    return fake
+
+
+def family_of(fake, size: int = 2) -> list:
+    """The students of the first parent with at least size learners."""
+    by_parent = {}
+    for student in fake.table("students").rows:
+        by_parent.setdefault(student["parent_id"], []).append(student)
+    return next(students for students in by_parent.values() if len(students) >= size)
@@ -0,0 +1,35 @@
+import time
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+SECRET = "benchmark-jwt-secret"
+
+
+def _token(**claims) -> str:
+    return jwt.encode({"exp": int(time.time()) + 600, **claims}, SECRET, algorithm="HS256")
+
+
+SERVICE_ROLE = {"Authorization": f"Bearer {_token(role='service_role', iss='supabase')}"}
+PARENT = {"Authorization": f"Bearer {_token(sub='parent-user', aud='authenticated', role='authenticated')}"}
+
+
+@pytest.fixture
+def client(fake):
+    import main
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("path", [
+    "/api/students/promote-grades",
+    "/api/payments/bulk",
+    "/api/payments/schedules/generate",
+    "/api/payments/reminders",
+    "/api/payments/dashboard/rebuild",
+])
+def test_admin_endpoints_require_the_service_role_key(client, path):
+    assert client.post(path).status_code == 401
+    assert client.post(path, headers=PARENT).status_code == 403
+    # dry_run keeps the reminder campaign from emailing anyone
+    assert client.post(path, params={"dry_run": "true"}, headers=SERVICE_ROLE).status_code not in (401, 403)
@@ -0,0 +1,29 @@
+import asyncio
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def test_login_runs_supabase_auth_off_the_event_loop(fake, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+    from benchmarks.seed import BENCHMARK_PASSWORD
+    from services.auth_service import auth_service
+
+    loops = []
+    sign_in = auth_service.supabase.auth.sign_in_with_password
+
+    def recording_sign_in(credentials):
+        loops.append(_running_loop())
+        return sign_in(credentials)
+
+    monkeypatch.setattr(auth_service.supabase.auth, "sign_in_with_password", recording_sign_in)
+    email = fake.table("parents").rows[0]["email"]
+    response = TestClient(main.app).post("/auth/login", json={"email": email, "password": BENCHMARK_PASSWORD})
+
+    assert response.status_code == 200 and response.json()["access_token"]
+    assert loops == [None]
@@ -0,0 +1,47 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from tests.test_admin_auth import SERVICE_ROLE
+
+
+@pytest.fixture
+def client(fake):
+    import main
+    return TestClient(main.app)
+
+
+def _payment(fake, receipt: str, **overrides) -> dict:
+    student = fake.table("students").rows[0]
+    return {
+        "parent_id_number": student["parent_id"], "student_id": student["id_number"],
+        "application_id": student["application_id"], "payment_amount": "4500.00",
+        "payment_date": "2026-03-01", "receipt_number": receipt, "status": "completed", **overrides,
+    }
+
+
+def test_malformed_ndjson_line_is_reported_and_other_rows_are_written(fake, client):
+    import json
+    lines = [json.dumps(_payment(fake, "BULK-1")), "{not json", json.dumps(_payment(fake, "BULK-2"))]
+    response = client.post("/api/payments/bulk", params={"chunk_size": 1}, content="\n".join(lines),
+                           headers={"content-type": "application/x-ndjson", **SERVICE_ROLE})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["summary"] == {"total": 3, "inserted": 2, "duplicate": 0, "invalid": 1, "failed": 0}
+    invalid = [r for r in body["results"] if r["status"] == "invalid"]
+    assert invalid[0]["line"] == 2
+    receipts = {p["receipt_number"] for p in fake.table("payments").rows}
+    assert {"BULK-1", "BULK-2"} <= receipts
+
+
+def test_csv_quoted_field_with_newline_stays_one_row(fake, client):
+    row = _payment(fake, "BULK-CSV-1")
+    columns = list(row) + ["notes"]
+    values = [str(row[c]) for c in row] + ['"paid at branch\nsecond line"']
+    body = ",".join(columns) + "\n" + ",".join(values) + "\n"
+    response = client.post("/api/payments/bulk", content=body, headers={"content-type": "text/csv", **SERVICE_ROLE})
+
+    assert response.status_code == 200
+    assert response.json()["summary"]["inserted"] == 1
+    payment = next(p for p in fake.table("payments").rows if p["receipt_number"] == "BULK-CSV-1")
+    assert payment["notes"] == "paid at branch\nsecond line"
@@ -0,0 +1,53 @@
+from tests.conftest import family_of
+
+
+def test_payment_for_one_learner_materializes_the_whole_family(fake):
+    from services.dashboard_service import get_current_month_str, get_parent_dashboard
+    from services.payment_service import create_payment
+
+    family = family_of(fake)
+    first = family[0]
+    month = get_current_month_str()
+    assert fake.table("parent_dashboard").rows == []
+
+    create_payment({
+        "parent_id_number": first["parent_id"], "student_id": first["id_number"], "application_id": first["application_id"],
+        "payment_amount": 100.0, "payment_date": f"{month}-05", "month_covered": month,
+        "receipt_number": "TEST-0001", "status": "completed",
+    })
+
+    dashboard = get_parent_dashboard(first["parent_id"])
+    assert {learner["student_id"] for learner in dashboard["learners"]} == {s["id_number"] for s in family}
+    paid = next(l for l in dashboard["learners"] if l["student_id"] == first["id_number"])["paid_this_month"]
+    assert paid >= 100.0
+
+
+def test_next_payment_date_without_schedule_is_not_frozen(fake):
+    from services.dashboard_service import get_parent_dashboard, _default_next_payment_date
+
+    student = family_of(fake, 1)[0]
+    fake.table("payment_schedule").rows = [r for r in fake.table("payment_schedule").rows if r["student_id"] != student["id_number"]]
+    fake.table("payment_schedule").invalidate()
+
+    get_parent_dashboard(student["parent_id"])
+    row = next(r for r in fake.table("parent_dashboard").rows if r["student_id"] == student["id_number"])
+    assert row["next_payment_date"] is None
+
+    learner = next(l for l in get_parent_dashboard(student["parent_id"])["learners"] if l["student_id"] == student["id_number"])
+    assert learner["next_payment_date"] == _default_next_payment_date()
+
+
+def test_fee_update_refreshes_the_grade_in_the_background(fake):
+    import services.dashboard_service as dashboard
+    from services.fee_service import update_fee
+
+    student = family_of(fake, 1)[0]
+    dashboard.get_parent_dashboard(student["parent_id"])
+    grade = next(f["grade_level"] for f in fake.table("fees").rows
+                 if dashboard.normalize_grade(f["grade_level"]) == dashboard.normalize_grade(student["grade_applied_for"]))
+
+    update_fee(grade, {"total_monthly_fee": 12345.0})
+    dashboard._grade_refresh_pool.submit(lambda: None).result(timeout=10)
+
+    row = next(r for r in fake.table("parent_dashboard").rows if r["student_id"] == student["id_number"])
+    assert row["monthly_fee"] == 12345.0
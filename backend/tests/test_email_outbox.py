@@ -0,0 +1,31 @@
+import asyncio
+
+
+def test_enqueue_during_an_empty_claim_wakes_the_worker(tmp_path, monkeypatch):
+    import services.email_outbox as email_outbox
+
+    monkeypatch.setattr(email_outbox, "EMAIL_POLL_SECONDS", 30)
+    outbox = email_outbox.EmailOutbox(str(tmp_path / "outbox.sqlite3"), concurrency=1)
+    calls = []
+
+    def deliver_one():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            # Nothing was due when claimed, but a request queues an email before the worker waits
+            outbox.enqueue("parent@example.com", "Welcome", "<p>Hi</p>")
+        return False
+
+    monkeypatch.setattr(outbox, "deliver_one", deliver_one)
+
+    async def run():
+        outbox.start()
+        try:
+            for _ in range(100):
+                if len(calls) >= 2:
+                    return
+                await asyncio.sleep(0.02)
+        finally:
+            await outbox.stop()
+
+    asyncio.run(run())
+    assert len(calls) >= 2
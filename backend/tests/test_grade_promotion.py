@@ -0,0 +1,29 @@
+def test_rerun_after_partial_failure_promotes_each_learner_once(fake, monkeypatch):
+    from core.grades import next_grade
+    import services.grade_promotion_service as promotion
+
+    before = {s["id"]: s["grade_applied_for"] for s in fake.table("students").rows}
+    monkeypatch.setattr(promotion, "PROMOTION_UPDATE_CHUNK_SIZE", 2)
+    apply_move = promotion._apply_move
+    failing = next(iter(sorted({grade for grade in before.values() if next_grade(grade)})))
+
+    def flaky(academic_year, current, *args):
+        if current == failing:
+            raise RuntimeError("connection reset")
+        return apply_move(academic_year, current, *args)
+
+    monkeypatch.setattr(promotion, "_apply_move", flaky)
+    first = promotion.promote_all_students(dry_run=False, academic_year=2031)
+    assert first["failed_updates"] >= 1
+
+    monkeypatch.setattr(promotion, "_apply_move", apply_move)
+    second = promotion.promote_all_students(dry_run=False, academic_year=2031)
+    assert second["failed_updates"] == 0
+    assert second["already_promoted"] == first["promoted"]
+
+    for student in fake.table("students").rows:
+        expected = next_grade(before[student["id"]]) or before[student["id"]]
+        assert student["grade_applied_for"] == expected
+
+    third = promotion.promote_all_students(dry_run=False, academic_year=2031)
+    assert third["promoted"] == 0
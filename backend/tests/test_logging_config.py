@@ -0,0 +1,15 @@
+import logging
+
+
+def test_log_payload_redacts_passwords(caplog):
+    from core.logging_config import log_payload
+
+    logger = logging.getLogger("tests.payload")
+    student = {"first_name": "Lerato", "password": "hunter2", "parent": {"password_hash": "$2b$12$abc"}}
+    with caplog.at_level(logging.DEBUG, logger="tests.payload"):
+        log_payload(logger, "📥 Incoming student data", student)
+
+    (record,) = caplog.records
+    assert "Lerato" in record.payload
+    assert "hunter2" not in record.payload and "$2b$12$abc" not in record.payload
+    assert student["password"] == "hunter2"
@@ -0,0 +1,39 @@
+def test_parent_bank_save_drops_cached_student_details(fake, monkeypatch):
+    import services.payment_details_service as details
+
+    monkeypatch.setattr(details, "_cache", details.TTLCache(60, maxsize=3))
+    students = fake.table("students").rows
+    for student in students[:5]:
+        assert details.get_payment_details(student["id"])
+    assert len(details._cache._entries) == 3
+
+    student = students[4]
+    plan = next(p for p in fake.table("fee_responsibility").rows if p["application_id"] == student["application_id"])
+    plan["bank_name"] = "Renamed Bank"
+    assert details.get_payment_details(student["id"])["bank_name"] != "Renamed Bank"
+
+    details.invalidate_payment_details(parent_id_number=plan["parent_id_number"])
+    assert details.get_payment_details(student["id"])["bank_name"] == "Renamed Bank"
+
+
+def test_bank_details_saved_through_the_api_reach_the_payment_modal(fake):
+    from fastapi.testclient import TestClient
+    import main
+    from tests.test_admin_auth import _token
+
+    client = TestClient(main.app)
+    application = fake.table("applications").rows[0]
+    owner = {"Authorization": f"Bearer {_token(sub=application['user_id'], aud='authenticated', role='authenticated')}"}
+    stranger = {"Authorization": f"Bearer {_token(sub='someone-else', aud='authenticated', role='authenticated')}"}
+    url = f"/api/parents/{application['id']}/bank-details"
+
+    before = client.get(f"/api/parents/payment-details-by-app/{application['id']}").json()
+    assert client.put(url, json={"bank_name": "Renamed Bank"}, headers=stranger).status_code == 403
+
+    response = client.put(url, json={"bank_name": "Renamed Bank", "account_number": "123"}, headers=owner)
+    assert response.status_code == 200
+    assert response.json()["fee_responsibility"]["bank_name"] == "Renamed Bank"
+
+    after = client.get(f"/api/parents/payment-details-by-app/{application['id']}").json()
+    assert after != before
+    assert "Renamed Bank" in str(after)
@@ -0,0 +1,43 @@
+def test_plan_change_removes_instalments_no_longer_due(fake):
+    from services.payment_schedule_service import generate_payment_schedules
+
+    plans = fake.table("fee_responsibility").rows
+    for plan in plans:
+        plan["selected_plan"] = "pay-monthly"
+    first = generate_payment_schedules(2032, dry_run=False)
+    assert first["removed"] == 0
+
+    application_id = plans[0]["application_id"]
+    learners = {s["id_number"] for s in fake.table("students").rows if s["application_id"] == application_id}
+    schedules = fake.table("payment_schedule").rows
+    for row in schedules:
+        if row["student_id"] in learners and row["month_due"] == "2032-05":
+            row["status"] = "paid"
+
+    plans[0]["selected_plan"] = "pay-once"
+    second = generate_payment_schedules(2032, dry_run=False)
+    assert second["removed"] == 10 * len(learners)
+
+    remaining = {}
+    for row in fake.table("payment_schedule").rows:
+        if row["month_due"].startswith("2032-"):
+            remaining.setdefault(row["student_id"], set()).add(row["month_due"])
+    for learner in learners:
+        assert remaining[learner] == {"2032-01", "2032-05"}
+    others = set(remaining) - learners
+    assert others and all(len(remaining[learner]) == 12 for learner in others)
+
+
+def test_fee_lookup_failure_fails_the_run(fake, monkeypatch):
+    from fastapi.testclient import TestClient
+    import main
+    import services.fee_service as fee_service
+    from tests.test_admin_auth import SERVICE_ROLE
+
+    def unavailable():
+        raise RuntimeError("fees table unavailable")
+
+    monkeypatch.setattr(fee_service, "_get_fee_table", unavailable)
+    response = TestClient(main.app).post("/api/payments/schedules/generate", params={"academic_year": 2032}, headers=SERVICE_ROLE)
+    assert response.status_code == 500
+    assert not any(row["month_due"].startswith("2032-") for row in fake.table("payment_schedule").rows)
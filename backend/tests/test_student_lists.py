@@ -0,0 +1,22 @@
+from tests.conftest import family_of
+
+
+def test_parent_write_drops_cached_student_lists(fake):
+    from services.student_service import get_students_by_user_id, invalidate_student_lists
+
+    family = family_of(fake, 1)
+    parent_id = family[0]["parent_id"]
+    user_id = next(a["user_id"] for a in fake.table("applications").rows if a["parent_id_number"] == parent_id)
+    other = next(a["user_id"] for a in fake.table("applications").rows if a["parent_id_number"] != parent_id)
+
+    assert {s["id_number"] for s in get_students_by_user_id(user_id)} == {s["id_number"] for s in family}
+    assert "parent_id" not in get_students_by_user_id(user_id)[0]
+    other_list = get_students_by_user_id(other)
+
+    family[0]["first_name"] = "Renamed"
+    fake._writes += 1
+    assert all(s["first_name"] != "Renamed" for s in get_students_by_user_id(user_id))
+
+    invalidate_student_lists(parent_id)
+    assert any(s["first_name"] == "Renamed" for s in get_students_by_user_id(user_id))
+    assert get_students_by_user_id(other) is other_list
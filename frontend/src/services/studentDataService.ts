@@ -1,4 +1,5 @@
 import { supabase } from './supabase';
+import { API_BASE_URL } from '@/config/apiConfig';
 
 export interface StudentData {
   id: string;
@@ -352,43 +353,32 @@ class StudentDataService {
   }
 
   /**
-   * Save or update fee responsibility data (bank account details)
+   * Save or update fee responsibility data (bank account details).
+   * Goes through the backend so the cached Payment Modal details are refreshed.
    */
   async saveFeeResponsibility(feeData: Partial<FeeResponsibilityData>): Promise<FeeResponsibilityData | null> {
     try {
-      // Check if fee responsibility exists for this application
-      const existing = await this.getFeeResponsibilityByApplicationId(feeData.application_id || '');
-
-      if (existing) {
-        // Update existing fee responsibility
-        const { data, error } = await supabase
-          .from('fee_responsibility')
-          .update({
-            bank_name: feeData.bank_name,
-            branch_code: feeData.branch_code,
-            account_number: feeData.account_number,
-            account_type: feeData.account_type,
-            selected_plan: feeData.selected_plan,
-            parent_first_name: feeData.parent_first_name,
-            parent_surname: feeData.parent_surname,
-          })
-          .eq('id', existing.id)
-          .select()
-          .single();
-
-        if (error) throw error;
-        return data;
-      } else {
-        // Create new fee responsibility
-        const { data, error } = await supabase
-          .from('fee_responsibility')
-          .insert([feeData])
-          .select()
-          .single();
-
-        if (error) throw error;
-        return data;
-      }
+      const { data: { session } } = await supabase.auth.getSession();
+      const response = await fetch(`${API_BASE_URL}/parents/${feeData.application_id}/bank-details`, {
+        method: 'PUT',
+        headers: {
+          'Content-Type': 'application/json',
+          ...(session?.access_token ? { Authorization: `Bearer ${session.access_token}` } : {}),
+        },
+        body: JSON.stringify({
+          bank_name: feeData.bank_name,
+          branch_code: feeData.branch_code,
+          account_number: feeData.account_number,
+          account_type: feeData.account_type,
+          selected_plan: feeData.selected_plan,
+          parent_first_name: feeData.parent_first_name,
+          parent_surname: feeData.parent_surname,
+        }),
+      });
+
+      if (!response.ok) throw new Error(`Failed to save bank details: ${response.status}`);
+      const data = await response.json();
+      return data.fee_responsibility || null;
     } catch (error) {
       console.error('Error saving fee responsibility:', error);
       return null;